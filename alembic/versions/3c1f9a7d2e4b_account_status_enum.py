@@ -0,0 +1,51 @@
+"""Store account_status as a native enum
+
+Revision ID: 3c1f9a7d2e4b
+Revises: ffbdbeb947f7
+Create Date: 2026-10-18 09:12:41.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f9a7d2e4b'
+down_revision: Union[str, None] = 'ffbdbeb947f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+account_status = postgresql.ENUM('pending', 'verified', name='account_status')
+
+
+def upgrade() -> None:
+    account_status.create(op.get_bind(), checkfirst=True)
+    for table in ('users', 'staffs'):
+        # Verification used to assign a boolean to the string column, stored as 'true'.
+        op.execute(
+            f"UPDATE {table} SET account_status = 'verified' "
+            "WHERE account_status NOT IN ('pending', 'verified')"
+        )
+        op.alter_column(
+            table,
+            'account_status',
+            type_=account_status,
+            existing_type=sa.VARCHAR(),
+            existing_nullable=False,
+            postgresql_using='account_status::account_status',
+        )
+
+
+def downgrade() -> None:
+    for table in ('users', 'staffs'):
+        op.alter_column(
+            table,
+            'account_status',
+            type_=sa.VARCHAR(),
+            existing_type=account_status,
+            existing_nullable=False,
+            postgresql_using='account_status::text',
+        )
+    account_status.drop(op.get_bind(), checkfirst=True)
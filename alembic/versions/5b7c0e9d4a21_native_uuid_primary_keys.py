@@ -0,0 +1,61 @@
+"""Store primary keys as native UUIDs
+
+Revision ID: 5b7c0e9d4a21
+Revises: 8d4e2b6a1f03
+Create Date: 2026-10-18 11:26:52.310478
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7c0e9d4a21'
+down_revision: Union[str, None] = '8d4e2b6a1f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Existing ids are 32-character hex strings, which Postgres parses as UUIDs
+# as they are. They keep their values; new rows get time-ordered UUIDv7 ids.
+# Changing the column types rewrites the tables and their indexes under an
+# ACCESS EXCLUSIVE lock, so large tables should be migrated in a maintenance window.
+ID_COLUMNS = (
+    ('users', 'id'),
+    ('staffs', 'id'),
+    ('access_codes', 'id'),
+    ('access_codes', 'user_id'),
+)
+
+
+def upgrade() -> None:
+    op.drop_constraint('access_codes_user_id_fkey', 'access_codes', type_='foreignkey')
+    for table, column in ID_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=postgresql.UUID(),
+            existing_type=sa.VARCHAR(),
+            existing_nullable=False,
+            postgresql_using=f'{column}::uuid',
+        )
+    op.create_foreign_key(
+        'access_codes_user_id_fkey', 'access_codes', 'users', ['user_id'], ['id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('access_codes_user_id_fkey', 'access_codes', type_='foreignkey')
+    for table, column in ID_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.VARCHAR(),
+            existing_type=postgresql.UUID(),
+            existing_nullable=False,
+            postgresql_using=f"replace({column}::text, '-', '')",
+        )
+    op.create_foreign_key(
+        'access_codes_user_id_fkey', 'access_codes', 'users', ['user_id'], ['id']
+    )
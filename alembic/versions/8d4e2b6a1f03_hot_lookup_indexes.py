@@ -0,0 +1,60 @@
+"""Indexes for access code, email and pending account lookups
+
+Revision ID: 8d4e2b6a1f03
+Revises: 3c1f9a7d2e4b
+Create Date: 2026-10-18 10:03:17.554920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e2b6a1f03'
+down_revision: Union[str, None] = '3c1f9a7d2e4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and does not
+    # block writes to the tables while the indexes are built.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_access_codes_user_id_code',
+            'access_codes',
+            ['user_id', 'code'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ux_users_email_lower',
+            'users',
+            [sa.text('lower(email)')],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_users_pending_created_at',
+            'users',
+            ['created_at'],
+            postgresql_where=sa.text("account_status = 'pending'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    # Case-insensitive uniqueness replaces the exact-match constraint.
+    op.drop_constraint('users_email_key', 'users', type_='unique')
+
+
+def downgrade() -> None:
+    op.create_unique_constraint('users_email_key', 'users', ['email'])
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_users_pending_created_at', 'users', postgresql_concurrently=True
+        )
+        op.drop_index('ux_users_email_lower', 'users', postgresql_concurrently=True)
+        op.drop_index(
+            'ix_access_codes_user_id_code', 'access_codes', postgresql_concurrently=True
+        )
@@ -0,0 +1,62 @@
+"""Indexes for keyset listings of users and staffs
+
+Revision ID: a3c6f8d2e197
+Revises: f4b9e3a1c725
+Create Date: 2026-10-19 11:02:57.419306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c6f8d2e197'
+down_revision: Union[str, None] = 'f4b9e3a1c725'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, access method) of each index.
+INDEXES = (
+    ('ix_users_status_created_at_id', 'users', ['account_status', 'created_at', 'id'], None),
+    ('ix_users_roles', 'users', ['roles'], 'gin'),
+    ('ix_staffs_created_at_id', 'staffs', ['created_at', 'id'], None),
+    ('ix_staffs_status_created_at_id', 'staffs', ['account_status', 'created_at', 'id'], None),
+    ('ix_staffs_roles', 'staffs', ['roles'], 'gin'),
+)
+
+
+def upgrade() -> None:
+    # Staffs are listed in keyset order too, so they get the same NOT NULL
+    # created_at as users.
+    op.execute("UPDATE staffs SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column(
+        'staffs',
+        'created_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=False,
+    )
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_using=using,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table, postgresql_concurrently=True)
+    op.alter_column(
+        'staffs',
+        'created_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=True,
+    )
@@ -0,0 +1,35 @@
+"""Add expires_at to access_codes
+
+Revision ID: c5d2a8e7f410
+Revises: e2b84c6f1d93
+Create Date: 2026-10-18 22:07:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d2a8e7f410'
+down_revision: Union[str, None] = 'e2b84c6f1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'access_codes', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    # Existing codes get the default time to live, counted from their creation.
+    op.execute(
+        "UPDATE access_codes"
+        " SET expires_at = coalesce(created_at, now()) + interval '1 day'"
+    )
+    op.alter_column('access_codes', 'expires_at', nullable=False)
+    op.create_index('ix_access_codes_expires_at', 'access_codes', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_access_codes_expires_at', table_name='access_codes')
+    op.drop_column('access_codes', 'expires_at')
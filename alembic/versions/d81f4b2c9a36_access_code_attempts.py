@@ -0,0 +1,28 @@
+"""Add attempts to access_codes
+
+Revision ID: d81f4b2c9a36
+Revises: c5d2a8e7f410
+Create Date: 2026-10-18 22:49:12.306518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b2c9a36'
+down_revision: Union[str, None] = 'c5d2a8e7f410'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'access_codes',
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('access_codes', 'attempts')
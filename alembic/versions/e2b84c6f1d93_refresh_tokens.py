@@ -0,0 +1,48 @@
+"""Add the refresh_tokens table
+
+Revision ID: e2b84c6f1d93
+Revises: a7f3d91c4e58
+Create Date: 2026-10-18 20:41:15.902364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b84c6f1d93'
+down_revision: Union[str, None] = 'a7f3d91c4e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'refresh_tokens',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('token_hash', sa.LargeBinary(), nullable=False),
+        sa.Column('family_id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('used_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ux_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'], unique=True
+    )
+    op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    op.drop_index('ux_refresh_tokens_token_hash', table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
@@ -0,0 +1,50 @@
+"""Index users by (created_at, id) for keyset exports
+
+Revision ID: f4b9e3a1c725
+Revises: d81f4b2c9a36
+Create Date: 2026-10-19 09:14:41.802613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b9e3a1c725'
+down_revision: Union[str, None] = 'd81f4b2c9a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A user without created_at would fall outside every keyset page, so the rare
+    # rows written before the column had a default are dated now.
+    op.execute("UPDATE users SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column(
+        'users',
+        'created_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=False,
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_created_at_id',
+            'users',
+            ['created_at', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_created_at_id', 'users', postgresql_concurrently=True)
+    op.alter_column(
+        'users',
+        'created_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=True,
+    )
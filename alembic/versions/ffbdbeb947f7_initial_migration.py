@@ -19,14 +19,10 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
+    # The tables were originally created by Base.metadata.create_all. Databases
+    # created that way should be stamped at this revision rather than upgraded to it.
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_table('access_codes')
-    op.drop_table('users')
-    # ### end Alembic commands ###
 
-
-def downgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('users',
     sa.Column('id', sa.VARCHAR(), autoincrement=False, nullable=False),
     sa.Column('email', sa.VARCHAR(), autoincrement=False, nullable=False),
@@ -49,4 +45,25 @@ def downgrade() -> None:
     sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='access_codes_user_id_fkey'),
     sa.PrimaryKeyConstraint('id', name='access_codes_pkey')
     )
+    op.create_table('staffs',
+    sa.Column('id', sa.VARCHAR(), autoincrement=False, nullable=False),
+    sa.Column('email', sa.VARCHAR(), autoincrement=False, nullable=False),
+    sa.Column('username', sa.VARCHAR(), autoincrement=False, nullable=False),
+    sa.Column('hashed_password', sa.VARCHAR(), autoincrement=False, nullable=False),
+    sa.Column('account_status', sa.VARCHAR(), autoincrement=False, nullable=False),
+    sa.Column('roles', postgresql.ARRAY(sa.VARCHAR()), autoincrement=False, nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), autoincrement=False, nullable=True),
+    sa.Column('updated_at', postgresql.TIMESTAMP(timezone=True), autoincrement=False, nullable=True),
+    sa.PrimaryKeyConstraint('id', name='staffs_pkey'),
+    sa.UniqueConstraint('email', name='staffs_email_key'),
+    sa.UniqueConstraint('username', name='staffs_username_key')
+    )
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('access_codes')
+    op.drop_table('staffs')
+    op.drop_table('users')
     # ### end Alembic commands ###
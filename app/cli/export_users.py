@@ -0,0 +1,122 @@
+"""
+Exports users to a CSV or JSONL file, in creation order.
+
+Rows are read from a server-side cursor a batch at a time, so tables of any size
+are exported in constant memory. CSV files use the format read by import_users.
+
+Usage:
+    python -m app.cli.export_users users.jsonl
+    python -m app.cli.export_users --status verified --role Staff users.csv
+    python -m app.cli.export_users --format jsonl - > users.jsonl
+
+With `--checkpoint`, the cursor of the last exported row is saved after each batch.
+Running the same command again after an interruption appends the remaining users
+to the file, and the checkpoint is removed once the export completes.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+from app.config.database import session_scope
+from app.controllers.export_controller import (
+    EXPORT_FORMATS,
+    export_statement,
+    export_users,
+    format_records,
+)
+from app.models.admin_model import AccountStatus
+
+
+def save_checkpoint(path: str, cursor: str, size: int):
+    """Replaces the checkpoint file atomically, so a crash never leaves it half written."""
+    with open(path + ".tmp", "w") as file:
+        file.write(f"{cursor}\n{size}\n")
+    os.replace(path + ".tmp", path)
+
+
+def load_checkpoint(path: str) -> tuple:
+    """Returns the cursor and output size saved in a checkpoint, or (None, 0) without one."""
+    if not os.path.exists(path):
+        return None, 0
+    with open(path) as file:
+        cursor, size = file.read().split()
+    return cursor, int(size)
+
+
+async def run(output, statement, format: str, header: bool, checkpoint: str = None) -> int:
+    """Writes the users selected by a query to a binary file, and returns their number."""
+    count = 0
+    async with session_scope() as db:
+        async for records, cursor in export_users(db, statement):
+            output.write(format_records(records, format, header))
+            output.flush()
+            header = False
+            count += len(records)
+            if checkpoint:
+                os.fsync(output.fileno())
+                save_checkpoint(checkpoint, cursor, output.tell())
+    if header:
+        output.write(format_records([], format, header))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="The file to write, or - for standard output.")
+    parser.add_argument(
+        "--format", choices=EXPORT_FORMATS, help="By default, from the file extension."
+    )
+    parser.add_argument(
+        "--status",
+        choices=[status.value for status in AccountStatus],
+        help="Only users with this status.",
+    )
+    parser.add_argument("--role", help="Only users with this role.")
+    parser.add_argument(
+        "--created-after",
+        type=datetime.fromisoformat,
+        help="Only users created at or after this ISO 8601 time.",
+    )
+    parser.add_argument(
+        "--created-before",
+        type=datetime.fromisoformat,
+        help="Only users created before this ISO 8601 time.",
+    )
+    parser.add_argument(
+        "--checkpoint", help="File keeping the position of a resumable export."
+    )
+    args = parser.parse_args()
+    if args.checkpoint and args.path == "-":
+        parser.error("--checkpoint needs an output file")
+
+    format = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+    after, size = load_checkpoint(args.checkpoint) if args.checkpoint else (None, 0)
+    statement = export_statement(
+        AccountStatus(args.status) if args.status else None,
+        args.role,
+        args.created_after,
+        args.created_before,
+        after,
+    )
+
+    if args.path == "-":
+        count = asyncio.run(run(sys.stdout.buffer, statement, format, format == "csv"))
+    else:
+        # A resumed export drops whatever was written after the checkpointed row,
+        # such as part of a batch, and appends the users after it.
+        with open(args.path, "r+b" if after else "wb") as output:
+            output.truncate(size)
+            output.seek(size)
+            count = asyncio.run(
+                run(output, statement, format, format == "csv" and not after, args.checkpoint)
+            )
+        if args.checkpoint and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+    print(f"Exported {count} users", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
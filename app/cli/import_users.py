@@ -0,0 +1,71 @@
+"""
+Imports users in bulk from a CSV or JSONL file.
+
+Each row has an email, a username, and either a plaintext `password` or an existing
+bcrypt `hashed_password`, plus optional `roles` (semicolon-separated in CSV) and
+`account_status`. Rows are read, hashed and inserted in chunks, so files of any size
+are imported in constant memory.
+
+Usage:
+    python -m app.cli.import_users users.csv
+    python -m app.cli.import_users --format jsonl - < users.jsonl
+
+A line is printed to stdout for each rejected row and after each chunk, as
+newline-delimited JSON. The exit status is 1 if any row was rejected.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.config.database import session_scope
+from app.controllers.import_controller import (
+    IMPORT_FORMATS,
+    import_users,
+    read_records,
+)
+from app.helpers.ndjson import dumps
+
+# Bytes read from the input at a time.
+READ_SIZE = 65536
+
+
+async def read_chunks(source):
+    """Yields the chunks of a binary file."""
+    while True:
+        chunk = source.read(READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def run(source, format: str) -> dict:
+    """Imports the users of a file, printing each report line, and returns the totals."""
+    counts = {}
+    async with session_scope() as db:
+        async for event in import_users(db, read_records(read_chunks(source), format)):
+            sys.stdout.buffer.write(dumps(event))
+            sys.stdout.flush()
+            counts = event.get("done", counts)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="The file to import, or - for standard input.")
+    parser.add_argument(
+        "--format", choices=IMPORT_FORMATS, help="By default, from the file extension."
+    )
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+    if args.path == "-":
+        counts = asyncio.run(run(sys.stdin.buffer, format))
+    else:
+        with open(args.path, "rb") as source:
+            counts = asyncio.run(run(source, format))
+    sys.exit(1 if counts.get("failed") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# pool.py
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.helpers.metrics import counter, gauge, histogram
+
+POOL_CHECKOUT_SECONDS = histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled connection, including opening a new one.",
+)
+POOL_CONNECT_SECONDS = histogram(
+    "db_pool_connect_seconds",
+    "Time spent opening a new database connection.",
+)
+POOL_CHECKED_OUT = gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pools of this worker.",
+)
+POOL_TIMEOUTS = counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after waiting pool_timeout seconds.",
+)
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout of a queue pool.
+
+    The measured time covers waiting for a connection to be returned to the pool
+    and, when the pool may still grow, opening a new connection.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool for the sync engine, exporting checkout metrics."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool for the async engine, exporting checkout metrics."""
+
+
+def instrument_engine(engine):
+    """
+    Attaches connect-latency and checked-out tracking to an engine.
+
+    Args:
+        engine (Engine): A sync engine, or the `sync_engine` of an AsyncEngine.
+    """
+
+    @event.listens_for(engine, "do_connect")
+    def time_connect(dialect, conn_rec, cargs, cparams):
+        started = time.perf_counter()
+        try:
+            return dialect.connect(*cargs, **cparams)
+        finally:
+            POOL_CONNECT_SECONDS.observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "checkout")
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def count_checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec()
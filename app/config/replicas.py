@@ -0,0 +1,242 @@
+# replicas.py
+
+import asyncio
+import itertools
+import logging
+from typing import List, Optional
+
+from sqlalchemy import Select, Table, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.dml import UpdateBase
+from starlette.concurrency import run_in_threadpool
+
+from app.helpers.metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+REPLICA_POLICIES = ("round_robin", "least_connections")
+
+REPLICA_READS = counter(
+    "db_replica_reads_total", "Statements routed to a read replica."
+)
+PRIMARY_READS = counter(
+    "db_primary_reads_total",
+    "Reads sent to the primary: pinned sessions, fallbacks and no healthy replica.",
+)
+REPLICAS_HEALTHY = gauge(
+    "db_replicas_healthy", "Read replicas receiving reads, as of the last health check."
+)
+
+# Replication lag in seconds of a Postgres standby. A standby that has replayed all
+# the WAL it received is caught up, however long ago its last transaction was.
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery()"
+    " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def is_read(clause) -> bool:
+    """
+    Tells whether a statement only reads, so that a replica may run it.
+
+    Args:
+        clause: The statement being executed.
+
+    Returns:
+        bool: True for a SELECT without FOR UPDATE and without data-modifying CTEs,
+        such as the `INSERT ... RETURNING` CTE of a signup.
+    """
+    if not isinstance(clause, Select) or clause._for_update_arg is not None:
+        return False
+    if not clause._independent_ctes and all(
+        isinstance(table, Table) for table in clause.get_final_froms()
+    ):
+        return True
+    # Postgres only allows data-modifying statements in top-level CTEs, which can
+    # be selected from or attached to the statement.
+    return not any(isinstance(element, UpdateBase) for element in visitors.iterate(clause))
+
+
+class Replica:
+    """
+    A read replica of the primary database.
+
+    Attributes:
+        name (str): The replica's URL, without its password.
+        engine (Engine): The sync engine connected to it.
+        async_engine (AsyncEngine, optional): The async engine connected to it.
+        healthy (bool): Whether reads may be sent to it.
+        lag (float): Its replication lag in seconds, as of the last health check.
+    """
+
+    def __init__(self, name: str, engine: Engine, async_engine=None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.healthy = True
+        self.lag = 0.0
+        for bind in self.binds():
+            event.listen(bind, "handle_error", self._on_error)
+
+    def binds(self) -> list:
+        """Returns the sync engines routed to, including that of the async engine."""
+        binds = [self.engine]
+        if self.async_engine is not None:
+            binds.append(self.async_engine.sync_engine)
+        return binds
+
+    def bind(self, is_async: bool) -> Engine:
+        return self.async_engine.sync_engine if is_async else self.engine
+
+    def in_use(self, is_async: bool) -> int:
+        """Returns the number of connections checked out of the pool used by sessions of a kind."""
+        pool = self.bind(is_async).pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    def _on_error(self, context):
+        # A lost or refused connection takes the replica out of rotation until the
+        # next health check succeeds, instead of failing request after request.
+        if context.is_disconnect or context.connection is None:
+            if self.healthy:
+                logger.warning("Read replica %s is unreachable", self.name)
+            self.healthy = False
+
+    def check(self, max_lag: float):
+        """Connects to the replica and updates its health and lag."""
+        try:
+            with self.engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    self.lag = float(connection.execute(LAG_QUERY).scalar() or 0)
+                else:
+                    connection.execute(text("SELECT 1"))
+                    self.lag = 0.0
+            healthy = max_lag <= 0 or self.lag <= max_lag
+        except Exception:
+            healthy = False
+        if healthy != self.healthy:
+            logger.warning(
+                "Read replica %s is %s (lag %.1f s)",
+                self.name,
+                "healthy" if healthy else "unhealthy",
+                self.lag,
+            )
+        self.healthy = healthy
+
+
+class ReplicaSet:
+    """
+    The read replicas reads are balanced across.
+
+    Attributes:
+        replicas (list): The replicas.
+        policy (str): "round_robin" takes the healthy replicas in turn, and
+            "least_connections" the one with the fewest connections in use.
+        max_lag (float): Replicas lagging more than this many seconds behind the
+            primary are unhealthy; 0 disables the lag check.
+    """
+
+    def __init__(self, replicas: List[Replica], policy: str = "round_robin", max_lag: float = 0):
+        if policy not in REPLICA_POLICIES:
+            raise ValueError(f"Unknown replica policy: {policy}")
+        self.replicas = replicas
+        self.policy = policy
+        self.max_lag = max_lag
+        self._turn = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def choose(self, is_async: bool) -> Optional[Engine]:
+        """
+        Picks the replica for the next session that reads.
+
+        Args:
+            is_async (bool): Whether the session runs on the async engines.
+
+        Returns:
+            Engine: The sync engine of the chosen replica, or None if none is healthy.
+        """
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        start = next(self._turn) % len(healthy)
+        # Starting from the next replica in turn also spreads ties evenly.
+        healthy = healthy[start:] + healthy[:start]
+        if self.policy == "least_connections":
+            return min(healthy, key=lambda replica: replica.in_use(is_async)).bind(is_async)
+        return healthy[0].bind(is_async)
+
+    async def check(self, timeout: float):
+        """Checks every replica concurrently; one that does not answer in time is unhealthy."""
+
+        async def check_one(replica):
+            try:
+                await asyncio.wait_for(run_in_threadpool(replica.check, self.max_lag), timeout)
+            except asyncio.TimeoutError:
+                replica.healthy = False
+
+        await asyncio.gather(*(check_one(replica) for replica in self.replicas))
+        REPLICAS_HEALTHY.set(sum(replica.healthy for replica in self.replicas))
+
+    async def monitor(self, interval: float):
+        """Checks the replicas every `interval` seconds, until cancelled."""
+        while True:
+            await self.check(timeout=interval)
+            await asyncio.sleep(interval)
+
+
+class RoutingSession(Session):
+    """
+    Session sending reads to a replica and everything else to the primary.
+
+    Attributes:
+        replicas (ReplicaSet, optional): The replicas; without them, or when none is
+            healthy, every statement runs on the primary.
+        pinned (bool): Whether the remaining statements all run on the primary.
+
+    A session reads from one replica for its whole life. It is pinned to the
+    primary by its first write, so it reads its own writes, and by
+    `pin_to_primary`. A statement executed with the `use_primary` execution option
+    runs on the primary without pinning the session.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.pinned = False
+        self._replica = None
+
+    @property
+    def reads_replica(self) -> bool:
+        """Whether the next read may run on a replica, and so miss recent writes."""
+        return bool(self.replicas) and not self.pinned
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+        if not self.reads_replica:
+            return primary
+        if clause is None:
+            # Flushes ask for the bind of a mapper; `db.get_bind()` asks for the
+            # primary to inspect its dialect.
+            if mapper is not None:
+                self.pinned = True
+            return primary
+        if not is_read(clause):
+            self.pinned = True
+            return primary
+        if clause.get_execution_options().get("use_primary"):
+            PRIMARY_READS.inc()
+            return primary
+        if self._replica is None or not self._healthy(self._replica):
+            self._replica = self.replicas.choose(primary.dialect.is_async)
+        if self._replica is None:
+            PRIMARY_READS.inc()
+            return primary
+        REPLICA_READS.inc()
+        return self._replica
+
+    def _healthy(self, bind: Engine) -> bool:
+        return any(bind in replica.binds() and replica.healthy for replica in self.replicas.replicas)
@@ -0,0 +1,46 @@
+# settings.py
+
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Startup configuration of the application, see app/main.py.
+# Open the database pools, load the signing keys and start the password hashing
+# workers before serving, so the first requests do not pay for them.
+STARTUP_PREWARM = os.getenv("STARTUP_PREWARM", "true").lower() == "true"
+# Create missing tables at startup, for development databases not managed with
+# Alembic. Production schemas are created with `alembic upgrade head`.
+DATABASE_CREATE_TABLES = os.getenv("DATABASE_CREATE_TABLES", "false").lower() == "true"
+# Directory served at /static, holding the OpenAPI document shown at /docs/.
+STATIC_DIRECTORY = os.getenv(
+    "STATIC_DIRECTORY", str(Path(__file__).resolve().parents[2] / "static")
+)
+
+
+class Settings:
+    """
+    Options of an application built by `create_app`. Defaults come from the environment.
+
+    Attributes:
+        prewarm (bool): Whether startup prewarms the pools, keys and hashing workers.
+        create_tables (bool): Whether startup creates missing tables.
+        background_tasks (bool): Whether the revocation refresh, the access code
+            sweeper and the replica monitor run, which tests may not want.
+        static_directory (str): Directory served at /static.
+    """
+
+    def __init__(
+        self,
+        prewarm: bool = STARTUP_PREWARM,
+        create_tables: bool = DATABASE_CREATE_TABLES,
+        background_tasks: bool = True,
+        static_directory: str = STATIC_DIRECTORY,
+    ):
+        self.prewarm = prewarm
+        self.create_tables = create_tables
+        self.background_tasks = background_tasks
+        self.static_directory = static_directory
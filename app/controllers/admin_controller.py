@@ -1,16 +1,267 @@
+import os
+from typing import NamedTuple, Tuple
+from uuid import UUID
+
 from fastapi import HTTPException
+from sqlalchemy import String, Uuid, any_, cast, func, literal, or_, select, update
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
-from ..models.admin_model import User
-from ..helpers.auth import decode_access_token, hash_password, verify_token
+from ..config.database import (
+    INSERT_CONSTRUCTS,
+    commit,
+    execute,
+    on_primary,
+    reads_replica,
+    session_scope,
+)
+from ..models.admin_model import AccountStatus, User
 from ..schemas.admin_schema import UserCreate, UserVerify
 import random
-from ..helpers.access_code import AccessCode
-from ..helpers.access_code import generate_code, save_access_code
-from ..helpers.auth import hash_password, create_access_token, verify_password
-from ..schemas.admin_schema import UserLogin, Token, UserExistQuery
+from ..helpers.access_code import access_code_store, generate_code, insert_access_code_from
+from ..helpers.uuid import generate_uuid, parse_uuid
+from ..helpers.auth import hash_password_async, verify_password_async
+from ..helpers.cache import MISSING, TTLCache
+from ..helpers.ndjson import NDJSONError, dumps
+from ..helpers.single_flight import SingleFlight
+from ..schemas.admin_schema import UserLogin, Token, UserExistQuery, UsersExistQuery
+from .token_controller import issue_tokens
+
+
+# Configuration for the in-process user lookup cache.
+# Maximum number of cached lookups, by id and by email, per worker process.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+# Seconds a found user is served from the cache. Other workers only see writes
+# once their entry expires, so this bounds how stale a lookup can be.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+# Seconds an unknown id or email is remembered as not existing.
+USER_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", 5))
+
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS, name="user")
+# Concurrent cache misses for the same user share one query.
+user_lookups = SingleFlight(name="user")
+
+# Configuration for bulk existence checks.
+# Maximum number of ids and emails, together, in one POST /users/exists request.
+USERS_EXIST_MAX_KEYS = int(os.getenv("USERS_EXIST_MAX_KEYS", 1000))
+# Maximum number of keys in one streamed request.
+USERS_EXIST_STREAM_MAX_KEYS = int(os.getenv("USERS_EXIST_STREAM_MAX_KEYS", 1_000_000))
+# Number of streamed keys resolved by each query.
+USERS_EXIST_BATCH_SIZE = int(os.getenv("USERS_EXIST_BATCH_SIZE", 1000))
+
+
+class CachedUser(NamedTuple):
+    """
+    Immutable snapshot of a user row, safe to share between requests and sessions.
+
+    Attributes:
+        id (UUID): The user's id.
+        email (str): The user's email address.
+        hashed_password (str): The bcrypt hash of the user's password.
+        account_status (AccountStatus): Whether the account is pending or verified.
+        roles (tuple): The roles assigned to the user.
+    """
+
+    id: UUID
+    email: str
+    hashed_password: str
+    account_status: AccountStatus
+    roles: Tuple[str, ...]
+
+
+def _select_cached_user():
+    return select(User.id, User.email, User.hashed_password, User.account_status, User.roles)
+
+
+def _cache_user(row) -> CachedUser:
+    user = CachedUser(
+        row.id, row.email, row.hashed_password, row.account_status, tuple(row.roles or ())
+    )
+    user_cache.set(("id", user.id), user)
+    user_cache.set(("email", user.email.lower()), user)
+    return user
+
+
+async def _get_user(db: Session, key: tuple, condition):
+    """
+    Cache-aside lookup of a single user.
+
+    Args:
+        db (Session): The database session.
+        key (tuple): The cache key, ("id", user_id) or ("email", lowercased email).
+        condition: The WHERE clause selecting the user on a cache miss.
+
+    Returns:
+        CachedUser: The user, or None if no user matches.
+
+    Concurrent misses for the same key, such as many pods logging in with one
+    service account at once, are collapsed into the query of the first one with
+    the same routing, on a replica or on the primary. A user not found on a read
+    replica is looked up again on the primary, so a login right after signup does
+    not depend on replication lag.
+    """
+    cached = user_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    async def load():
+        statement = _select_cached_user().where(condition)
+        row = (await execute(db, statement)).first()
+        if row is None and reads_replica(db):
+            row = (await execute(db, on_primary(statement))).first()
+        if row is None:
+            user_cache.set(key, None, ttl=USER_CACHE_NEGATIVE_TTL_SECONDS)
+            return None
+        return _cache_user(row)
+
+    # Sessions pinned to the primary, e.g. by `X-Consistency: strong`, only share
+    # lookups with each other, never the possibly stale read of a replica.
+    return await user_lookups.do((key, reads_replica(db)), load)
 
 
-def create_user(db: Session, user_data: UserCreate):
+async def get_user_by_id(db: Session, user_id: UUID):
+    """
+    Looks up a user by id through the user cache.
+
+    Args:
+        db (Session): The database session.
+        user_id (UUID): The user's id.
+
+    Returns:
+        CachedUser: The user, or None if the id is unknown.
+    """
+    return await _get_user(db, ("id", user_id), User.id == user_id)
+
+
+async def get_users_by_ids(db: Session, user_ids) -> dict:
+    """
+    Looks up many users by id through the user cache.
+
+    Args:
+        db (Session): The database session.
+        user_ids: The users' ids.
+
+    Returns:
+        dict: The found users, as CachedUser by id. Unknown ids are left out.
+
+    Ids missing from the cache are loaded with a single `id IN (...)` query, and
+    those a read replica did not find with a second one on the primary.
+    """
+    users, missing = {}, []
+    for user_id in set(user_ids):
+        cached = user_cache.get(("id", user_id))
+        if cached is MISSING:
+            missing.append(user_id)
+        elif cached is not None:
+            users[user_id] = cached
+
+    if missing:
+        statement = _select_cached_user().where(User.id.in_(missing))
+        for row in await execute(db, statement):
+            users[row.id] = _cache_user(row)
+        unseen = [user_id for user_id in missing if user_id not in users]
+        if unseen and reads_replica(db):
+            # Users created since the replica last caught up.
+            statement = _select_cached_user().where(User.id.in_(unseen))
+            for row in await execute(db, on_primary(statement)):
+                users[row.id] = _cache_user(row)
+        for user_id in missing:
+            if user_id not in users:
+                user_cache.set(("id", user_id), None, ttl=USER_CACHE_NEGATIVE_TTL_SECONDS)
+    return users
+
+
+async def get_user_by_email(db: Session, email: str):
+    """
+    Looks up a user by email, ignoring case, through the user cache.
+
+    Args:
+        db (Session): The database session.
+        email (str): The user's email address.
+
+    Returns:
+        CachedUser: The user, or None if the email is unknown.
+    """
+    email = email.lower()
+    return await _get_user(db, ("email", email), func.lower(User.email) == email)
+
+
+def invalidate_user(user_id: UUID = None, email: str = None):
+    """
+    Drops cached lookups of a user after it was written.
+
+    Args:
+        user_id (UUID, optional): The id of the user that changed.
+        email (str, optional): The email of the user that changed.
+    """
+    keys = []
+    if user_id is not None:
+        keys.append(("id", user_id))
+    if email is not None:
+        keys.append(("email", email.lower()))
+    for key in keys:
+        user_cache.pop(key)
+        # Lookups are in flight per key and routing, see `_get_user`.
+        for on_replica in (False, True):
+            user_lookups.forget((key, on_replica))
+
+
+async def insert_user_with_access_code(
+    db: Session, email: str, username: str, hashed_password: str, code: str
+):
+    """
+    Inserts a user and its access code in a single transaction.
+
+    Args:
+        db (Session): The database session.
+        email (str): The email address of the new user.
+        username (str): The username of the new user.
+        hashed_password (str): The bcrypt hash of the user's password.
+        code (str): The access code to save for the new user.
+
+    Returns:
+        Row: The id, email, username and account_status of the new user, or None
+        if the email is already registered.
+
+    When codes are kept in the database on Postgres, both rows are written by one
+    statement: the user INSERT is a data-modifying CTE with ON CONFLICT (lower(email))
+    DO NOTHING RETURNING, and the access code is inserted from its result, so nothing
+    is written for a duplicate email. Otherwise the same INSERT runs first, and the
+    code is saved to the access code store.
+    Duplicates are detected by the unique index on lower(email), so concurrent
+    signups with the same email, in any case, cannot both succeed.
+    """
+    dialect = db.get_bind().dialect.name
+    new_user = (
+        INSERT_CONSTRUCTS[dialect](User)
+        .values(
+            id=generate_uuid(),
+            email=email,
+            username=username,
+            hashed_password=hashed_password,
+        )
+        .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+        .returning(User.id, User.email, User.username, User.account_status)
+    )
+
+    if dialect == "postgresql" and access_code_store.in_database:
+        new_user = new_user.cte("new_user")
+        new_code = insert_access_code_from(new_user, code).cte("new_code")
+        result = await execute(db, select(new_user).add_cte(new_code))
+        user = result.first()
+    else:
+        result = await execute(db, new_user)
+        user = result.first()
+        if user is not None:
+            await access_code_store.save(db, user.id, code)
+
+    await commit(db)
+    if user is not None:
+        # The email may be cached as unknown from a lookup before the signup.
+        invalidate_user(user.id, user.email)
+    return user
+
+
+async def create_user(db: Session, user_data: UserCreate):
     """
     Creates a new user in the database.
 
@@ -19,33 +270,23 @@ def create_user(db: Session, user_data: UserCreate):
         user_data (UserCreate): The data for the new user.
 
     Returns:
-        User: The created user object, or None if the email is already registered.
+        Row: The created user's id, email, username and account_status, or None
+        if the email is already registered.
 
-    This function checks if a user with the given email already exists. If not,
-    it hashes the provided password, creates a new User record, and saves it in the database.
-    It also generates and saves an access code for the new user.
+    This function hashes the provided password on the hashing executor, then creates
+    the User record together with a generated access code in one transaction.
     """
-    db_user = db.query(User).filter(User.email == user_data.email).first()
-    if db_user:
-        return None  # Email already exists
-
-    hashed_password = hash_password(user_data.password)
-    new_user = User(
+    hashed_password = await hash_password_async(user_data.password)
+    return await insert_user_with_access_code(
+        db,
         email=user_data.email,
         username=user_data.username,
         hashed_password=hashed_password,
+        code=generate_code(),
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
-    access_code = generate_code()
-    save_access_code(db, new_user.id, access_code)
 
-    return new_user
 
-
-def verify_user_account(db: Session, user_verify: UserVerify) -> bool:
+async def verify_user_account(db: Session, user_verify: UserVerify) -> bool:
     """
     Verifies a user's account using an access code.
 
@@ -56,34 +297,54 @@ def verify_user_account(db: Session, user_verify: UserVerify) -> bool:
     Returns:
         bool: True if the account is successfully verified, False otherwise.
 
-    This function checks if the provided access code matches the one stored for the user.
-    If it matches, the user's account is marked as verified, and the function returns True.
-    The access code record is then deleted. If the code does not match, the function returns False.
+    This function consumes the user's access code, and marks the user as verified
+    only if the code was valid. Consuming a code is atomic, so two concurrent
+    requests with the same code cannot both succeed, and a wrong code counts as an
+    attempt against the user's code. When codes are kept in the database on
+    Postgres, a valid code is consumed and the user updated by one statement: a
+    DELETE ... RETURNING CTE feeding an UPDATE of users. Otherwise the code is
+    consumed first, then the user is updated.
     """
-    user_id = user_verify.user_id
-    code = user_verify.code
+    user_id = parse_uuid(user_verify.user_id)
+    if user_id is None:
+        return False
 
-    access_code_record = (
-        db.query(AccessCode)
-        .filter(AccessCode.user_id == user_id, AccessCode.code == code)
-        .first()
-    )
-    if access_code_record:
-        # Update the user's verification status
-        user = db.query(User).filter(User.id == user_id).first()
-        if user:
-            user.account_status = True
-            db.add(user)
-
-        # Delete the access code record
-        db.delete(access_code_record)
-        db.commit()
-        return True
+    if db.get_bind().dialect.name == "postgresql" and access_code_store.in_database:
+        consumed = access_code_store.consume_statement(user_id, user_verify.code)
+        consumed = consumed.cte("consumed")
+        result = await execute(
+            db,
+            update(User)
+            .where(User.id == consumed.c.user_id)
+            .values(account_status=AccountStatus.VERIFIED)
+            .returning(User.id, User.email)
+            .add_cte(consumed)
+            .execution_options(synchronize_session=False),
+        )
+        user = result.first()
+        if user is None:
+            await access_code_store.record_failure(db, user_id)
     else:
+        user = None
+        if await access_code_store.consume(db, user_id, user_verify.code):
+            result = await execute(
+                db,
+                update(User)
+                .where(User.id == user_id)
+                .values(account_status=AccountStatus.VERIFIED)
+                .returning(User.id, User.email)
+                .execution_options(synchronize_session=False),
+            )
+            user = result.first()
+
+    await commit(db)
+    if user is None:
         return False
+    invalidate_user(user.id, user.email)
+    return True
 
 
-def login_user(db: Session, user_login: UserLogin) -> Token:
+async def login_user(db: Session, user_login: UserLogin) -> Token:
     """
     Authenticates a user and generates a JWT token.
 
@@ -92,20 +353,20 @@ def login_user(db: Session, user_login: UserLogin) -> Token:
         user_login (UserLogin): The login credentials of the user.
 
     Returns:
-        Token: The JWT token for the authenticated user.
+        Token: The short-lived JWT access token for the authenticated user, and the
+        refresh token starting a new token family.
 
     Raises:
         HTTPException: An exception with status code 401 if authentication fails.
     """
-    user = db.query(User).filter(User.email == user_login.email).first()
-    if user and verify_password(user_login.password, user.hashed_password):
-        access_token = create_access_token(data={"sub": user.id})
-        return Token(access_token=access_token, token_type="bearer")
+    user = await get_user_by_email(db, user_login.email)
+    if user and await verify_password_async(user_login.password, user.hashed_password):
+        return await issue_tokens(db, user.id, user.roles)
     else:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
 
-def check_user_exists(db: Session, query: UserExistQuery) -> bool:
+async def check_user_exists(db: Session, query: UserExistQuery) -> bool:
     """
     Checks if a user exists in the database.
 
@@ -117,29 +378,141 @@ def check_user_exists(db: Session, query: UserExistQuery) -> bool:
         bool: True if the user exists, False otherwise.
     """
     if query.user_id:
-        return db.query(User).filter(User.id == query.user_id).first() is not None
+        user_id = parse_uuid(query.user_id)
+        if user_id is None:
+            return False
+        return await get_user_by_id(db, user_id) is not None
     elif query.email:
-        return db.query(User).filter(User.email == query.email).first() is not None
+        return await get_user_by_email(db, query.email) is not None
     return False
 
 
-def refresh_access_token(token: str) -> dict:
+def _any_of(db: Session, column, values: list, item_type):
+    # Postgres receives the values as one array parameter, so the statement is the
+    # same for any number of them; other dialects get one parameter per value.
+    if db.get_bind().dialect.name == "postgresql":
+        array_type = postgresql.ARRAY(item_type)
+        return column == any_(cast(literal(values, array_type), array_type))
+    return column.in_(values)
+
+
+async def find_existing_users(db: Session, user_ids, emails):
+    """
+    Finds which of the given ids and emails belong to users, in one query.
+
+    Args:
+        db (Session): The database session.
+        user_ids: The ids to look for, as UUIDs.
+        emails: The emails to look for, lowercased.
+
+    Returns:
+        tuple: The set of ids found and the set of lowercased emails found.
+
+    Only the key columns are selected, and the ids and emails are matched through
+    the primary key and the lower(email) index.
     """
-    Refreshes an access token using a refresh token.
+    conditions = []
+    if user_ids:
+        conditions.append(_any_of(db, User.id, list(user_ids), Uuid))
+    if emails:
+        conditions.append(_any_of(db, func.lower(User.email), list(emails), String))
+    if not conditions:
+        return set(), set()
+
+    result = await execute(
+        db, select(User.id, func.lower(User.email).label("email")).where(or_(*conditions))
+    )
+    rows = result.all()
+    return {row.id for row in rows}, {row.email for row in rows}
+
+
+async def check_users_exist(db: Session, query: UsersExistQuery) -> dict:
+    """
+    Checks which of many users exist.
 
     Args:
-        refresh_token (str): The refresh token provided by the user.
+        db (Session): The database session.
+        query (UsersExistQuery): The ids and emails to check.
 
     Returns:
-        dict: Contains the new access token if the refresh token is valid.
+        dict: Maps of each given id and email to whether a user has it.
 
     Raises:
-        HTTPException: If the refresh token is invalid or expired.
+        HTTPException: An exception with status code 413 if more than
+        USERS_EXIST_MAX_KEYS ids and emails are given.
+    """
+    if len(query.ids) + len(query.emails) > USERS_EXIST_MAX_KEYS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {USERS_EXIST_MAX_KEYS} ids and emails per request",
+        )
+    user_ids = {value: parse_uuid(value) for value in query.ids}
+    emails = {value: value.lower() for value in query.emails}
+    found_ids, found_emails = await find_existing_users(
+        db, {user_id for user_id in user_ids.values() if user_id}, set(emails.values())
+    )
+    return {
+        "ids": {value: user_id in found_ids for value, user_id in user_ids.items()},
+        "emails": {value: email in found_emails for value, email in emails.items()},
+    }
+
+
+async def _resolve_batch(db: Session, batch: list):
+    user_ids = {parse_uuid(value) for kind, value in batch if kind == "id"} - {None}
+    emails = {value.lower() for kind, value in batch if kind == "email"}
+    found_ids, found_emails = await find_existing_users(db, user_ids, emails)
+    # Release the connection while the next batch is read from the client.
+    await commit(db)
+    for kind, value in batch:
+        if kind == "id":
+            yield dumps({"id": value, "exists": parse_uuid(value) in found_ids})
+        elif kind == "email":
+            yield dumps({"email": value, "exists": value.lower() in found_emails})
+        else:
+            yield dumps({"line": value, "error": "Expected an id or an email"})
+
+
+def _stream_key(item, number: int) -> tuple:
+    if isinstance(item, dict) and len(item) == 1:
+        kind, value = next(iter(item.items()))
+        if kind in ("id", "email") and isinstance(value, str):
+            return kind, value
+    return "invalid", number
+
+
+async def stream_users_exist(lines):
+    """
+    Checks which of many users exist, as the keys arrive.
+
+    Args:
+        lines: Async iterable of decoded request lines, each {"id": ...} or {"email": ...}.
+
+    Yields:
+        bytes: One newline-delimited JSON line per key, {"id" or "email": key,
+        "exists": bool}, in request order. Keys are resolved USERS_EXIST_BATCH_SIZE
+        at a time, so memory use does not grow with the request.
+
+    Invalid lines are answered with an error line giving their line number. A
+    malformed body, or more than USERS_EXIST_STREAM_MAX_KEYS keys, ends the response
+    with an error line, since the status code has already been sent.
     """
-    if not verify_token(token):
-        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    async with session_scope() as db:
+        batch, number, error = [], 0, None
+        try:
+            async for item in lines:
+                number += 1
+                if number > USERS_EXIST_STREAM_MAX_KEYS:
+                    error = f"At most {USERS_EXIST_STREAM_MAX_KEYS} keys per request"
+                    break
+                batch.append(_stream_key(item, number))
+                if len(batch) >= USERS_EXIST_BATCH_SIZE:
+                    async for line in _resolve_batch(db, batch):
+                        yield line
+                    batch = []
+        except NDJSONError as exc:
+            error = str(exc)
 
-    user_id = decode_access_token(token)
-    print(user_id)
-    new_access_token = create_access_token(data={"sub": user_id})
-    return {"access_token": new_access_token, "token_type": "bearer"}
+        async for line in _resolve_batch(db, batch):
+            yield line
+        if error:
+            yield dumps({"error": error})
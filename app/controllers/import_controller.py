@@ -0,0 +1,350 @@
+import asyncio
+import csv
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional
+
+from email_validator import EmailNotValidError, validate_email
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config.database import INSERT_CONSTRUCTS, commit, execute, session_scope
+from ..helpers.auth import hash_password
+from ..helpers.ndjson import NDJSONError, dumps, loads, split_lines
+from ..helpers.uuid import generate_uuid
+from ..models.admin_model import AccountStatus, User
+from .admin_controller import invalidate_user
+
+# Configuration for bulk user imports.
+# Rows hashed and inserted together. Each chunk is one multi-row INSERT and one commit.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+# Processes hashing plaintext passwords. They compete with the rest of the service
+# for CPU, so imports into a live service should use fewer than the number of cores.
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", os.cpu_count() or 1))
+# Longest input line accepted, bounding the memory held per row.
+IMPORT_MAX_LINE_BYTES = 16384
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# A bcrypt hash in the modular crypt format, as stored by passlib.
+BCRYPT_HASH = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+# The dot-atom local part of an email address, allowing internationalized characters.
+EMAIL_LOCAL_PART = re.compile(r'^[^\s@"(),:;<>\[\\\].]+(\.[^\s@"(),:;<>\[\\\].]+)*$')
+
+_hash_pool = None
+
+
+class UserImport(BaseModel):
+    """
+    One imported user.
+
+    Attributes:
+        email (str): The user's email address, unique ignoring case.
+        username (str): The user's username, unique.
+        password (str, optional): A plaintext password, hashed during the import.
+        hashed_password (str, optional): An existing bcrypt hash, stored as is.
+        roles (list, optional): The user's roles; the same default as signup if omitted.
+        account_status (AccountStatus): Imported accounts are verified unless stated.
+    """
+
+    email: str
+    username: str
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    roles: Optional[List[str]] = None
+    account_status: AccountStatus = AccountStatus.VERIFIED
+
+    @field_validator("email")
+    @classmethod
+    def check_email(cls, email: str) -> str:
+        # Validating a domain is most of the cost of validating an address, and an
+        # import has few distinct domains, so they are validated once each.
+        local, _, domain = email.rpartition("@")
+        if len(local) > 64 or not EMAIL_LOCAL_PART.match(local):
+            raise ValueError("value is not a valid email address")
+        return f"{local}@{_validate_domain(domain)}"
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("Exactly one of password and hashed_password is required")
+        if self.hashed_password is not None and not BCRYPT_HASH.match(self.hashed_password):
+            raise ValueError("hashed_password is not a bcrypt hash")
+        return self
+
+
+@lru_cache(maxsize=1024)
+def _validate_domain(domain: str) -> str:
+    """Returns the normalized domain of an email address, as signup would accept it."""
+    try:
+        return validate_email(f"postmaster@{domain}", check_deliverability=False).domain
+    except EmailNotValidError as error:
+        raise ValueError(f"value is not a valid email address: {error}")
+
+
+def hash_passwords(passwords: list) -> list:
+    """
+    Hashes a batch of passwords in a worker process.
+
+    Args:
+        passwords (list): Plaintext passwords.
+
+    Returns:
+        list: Their bcrypt hashes, in order.
+    """
+    return [hash_password(password) for password in passwords]
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # The pool is started by a request, in a process running an event loop,
+        # database pools and threads. A forked worker would inherit their state,
+        # such as locks held by other threads, so workers start from a fresh
+        # interpreter instead.
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=IMPORT_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    """Shuts the hashing pool down, waiting for running batches to finish."""
+    global _hash_pool
+    pool, _hash_pool = _hash_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def _hash_chunk(users: list):
+    """Replaces the plaintext passwords of a chunk with hashes, split across the pool."""
+    plain = [user for user in users if user.password is not None]
+    if not plain:
+        return
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    size = -(-len(plain) // IMPORT_HASH_WORKERS)
+    batches = [plain[start:start + size] for start in range(0, len(plain), size)]
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, hash_passwords, [user.password for user in batch])
+            for batch in batches
+        )
+    )
+    for batch, hashes in zip(batches, results):
+        for user, hashed_password in zip(batch, hashes):
+            user.hashed_password, user.password = hashed_password, None
+
+
+def _csv_record(header: list, row: list) -> dict:
+    record = {name: value for name, value in zip(header, row) if value != ""}
+    if "roles" in record:
+        record["roles"] = [role for role in record["roles"].split(";") if role]
+    return record
+
+
+async def read_records(chunks, format: str):
+    """
+    Parses CSV or JSONL users as the input arrives.
+
+    Args:
+        chunks: Async iterable of input chunks, such as `Request.stream()`.
+        format (str): "csv", whose first row names the columns, or "jsonl".
+
+    Yields:
+        tuple: The line number of each record, and its fields as a dict, or the
+        NDJSONError describing why the line could not be parsed.
+
+    Raises:
+        NDJSONError: If a line is longer than IMPORT_MAX_LINE_BYTES.
+
+    In CSV, `roles` are separated by semicolons, and quoted fields may span lines.
+    """
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {format}")
+    header = None
+    pending, start = "", 0
+    number = 0
+    async for line in split_lines(chunks, IMPORT_MAX_LINE_BYTES):
+        number += 1
+        if format == "jsonl":
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+            except NDJSONError as error:
+                yield number, error
+                continue
+            if not isinstance(record, dict):
+                record = NDJSONError("Line is not a JSON object")
+            yield number, record
+            continue
+
+        text = line.decode("utf-8", errors="replace").rstrip("\r")
+        if pending:
+            text = pending + "\n" + text
+        elif not text.strip():
+            continue
+        else:
+            start = number
+        if text.count('"') % 2:
+            # A quoted field continues on the next line.
+            if len(text) > IMPORT_MAX_LINE_BYTES:
+                raise NDJSONError(f"Row longer than {IMPORT_MAX_LINE_BYTES} bytes")
+            pending = text
+            continue
+        pending = ""
+        row = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in row]
+            continue
+        yield start, _csv_record(header, row)
+    if pending:
+        yield start, NDJSONError("Unterminated quoted field")
+
+
+async def _insert_chunk(db: Session, chunk: list):
+    """
+    Inserts a chunk of users, skipping those whose email or username exists.
+
+    Returns:
+        set: The lowercased emails of the users inserted.
+
+    Rows with a plaintext password whose email is already registered are dropped
+    before hashing, so running an interrupted import again does not spend CPU on
+    the rows it already imported.
+    """
+    users = [user for _, user in chunk]
+    plain = [user.email.lower() for user in users if user.password is not None]
+    if plain:
+        result = await execute(
+            db, select(func.lower(User.email)).where(func.lower(User.email).in_(plain))
+        )
+        existing = set(result.scalars())
+        users = [
+            user
+            for user in users
+            if user.password is None or user.email.lower() not in existing
+        ]
+    if not users:
+        await commit(db)
+        return set()
+
+    await _hash_chunk(users)
+    dialect = db.get_bind().dialect.name
+    rows = []
+    for user in users:
+        row = {
+            "id": generate_uuid(),
+            "email": user.email,
+            "username": user.username,
+            "hashed_password": user.hashed_password,
+            "account_status": user.account_status,
+            "roles": user.roles,
+        }
+        if row["roles"] is None:
+            row["roles"] = User.roles.default.arg(None)
+        rows.append(row)
+    result = await execute(
+        db,
+        INSERT_CONSTRUCTS[dialect](User).on_conflict_do_nothing().returning(User.email),
+        rows,
+    )
+    inserted = {email.lower() for email in result.scalars()}
+    await commit(db)
+    for email in inserted:
+        # The email may be cached as unknown from a lookup before the import.
+        invalidate_user(email=email)
+    return inserted
+
+
+async def import_users(db: Session, records):
+    """
+    Imports users in chunks, reporting progress and per-row errors as it goes.
+
+    Args:
+        db (Session): The database session.
+        records: Async iterable of (line number, dict or error), as from `read_records`.
+
+    Yields:
+        dict: `{"line": n, "error": ...}` for each row that was not imported, then
+        `{"progress": counts}` after each chunk, and `{"done": counts}` at the end,
+        where counts has the `rows`, `imported` and `failed` totals so far.
+
+    Only one chunk is held in memory at a time. Plaintext passwords are hashed on a
+    pool of IMPORT_HASH_WORKERS processes, then the chunk is written by one
+    multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING and committed, so rows
+    already imported stay imported if a later chunk fails. Rows whose email or
+    username already exists are reported as errors, so an interrupted import can
+    be run again from the start.
+    """
+    counts = {"rows": 0, "imported": 0, "failed": 0}
+    chunk, emails = [], set()
+
+    async def flush():
+        inserted = await _insert_chunk(db, chunk)
+        for number, user in chunk:
+            if user.email.lower() in inserted:
+                counts["imported"] += 1
+            else:
+                counts["failed"] += 1
+                yield {"line": number, "error": "Email or username already registered"}
+        chunk.clear()
+        emails.clear()
+        yield {"progress": dict(counts)}
+
+    async for number, record in records:
+        counts["rows"] += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            user = UserImport.model_validate(record)
+            if user.email.lower() in emails:
+                raise ValueError("Email appears twice in the same chunk")
+        except (ValueError, ValidationError) as error:
+            counts["failed"] += 1
+            message = str(error)
+            if isinstance(error, ValidationError):
+                message = "; ".join(
+                    f"{'.'.join(map(str, detail['loc'])) or 'row'}: {detail['msg']}"
+                    for detail in error.errors()
+                )
+            yield {"line": number, "error": message}
+            continue
+        chunk.append((number, user))
+        emails.add(user.email.lower())
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            async for event in flush():
+                yield event
+
+    if chunk:
+        async for event in flush():
+            yield event
+    yield {"done": counts}
+
+
+async def stream_import(chunks, format: str):
+    """
+    Imports users from a request body, as newline-delimited JSON report lines.
+
+    Args:
+        chunks: Async iterable of body chunks, such as `Request.stream()`.
+        format (str): "csv" or "jsonl".
+
+    Yields:
+        bytes: One line per event of `import_users`. An input line that is too long
+        ends the import with an `{"error": ...}` line.
+
+    The session is opened here rather than by a request dependency, since the body
+    is read while the response streams, after dependencies have been closed.
+    """
+    async with session_scope() as db:
+        try:
+            async for event in import_users(db, read_records(chunks, format)):
+                yield dumps(event)
+        except NDJSONError as error:
+            yield dumps({"error": str(error)})
@@ -0,0 +1,148 @@
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import String, cast, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from ..config.database import execute
+from ..helpers.uuid import parse_uuid
+from ..models.admin_model import AccountStatus
+
+# Configuration for account listings.
+# Accounts per page when the client does not ask for a size.
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", 50))
+# Largest page a client may ask for.
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", 500))
+
+
+def encode_cursor(created_at: datetime, account_id) -> str:
+    """
+    Encodes the position of an account in creation order.
+
+    Args:
+        created_at (datetime): The account's creation time.
+        account_id (UUID): The account's id.
+
+    Returns:
+        str: `<created_at>,<id>`, so the cursor of the last account received can
+        also be rebuilt from the account itself.
+    """
+    return f"{created_at.isoformat()},{account_id}"
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decodes a cursor made by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        tuple: The (created_at, id) pair to resume after.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    created_at, _, account_id = cursor.rpartition(",")
+    account_id = parse_uuid(account_id)
+    if account_id is None:
+        raise ValueError("Invalid cursor")
+    try:
+        return datetime.fromisoformat(created_at), account_id
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def account_statement(
+    model,
+    account_status: Optional[AccountStatus] = None,
+    roles: Optional[List[str]] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    after: Optional[str] = None,
+):
+    """
+    Builds the query selecting accounts of the users or staffs table in creation order.
+
+    Args:
+        model: User or Staff.
+        account_status (AccountStatus, optional): Only accounts with this status.
+        roles (list, optional): Only accounts having all of these roles.
+        created_after (datetime, optional): Only accounts created at or after this time.
+        created_before (datetime, optional): Only accounts created before this time.
+        after (str, optional): A cursor from `encode_cursor`; only the accounts after it.
+
+    Returns:
+        Select: The columns of the accounts, ordered by (created_at, id).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+
+    Pages are sought rather than offset: the `(created_at, id) > cursor` condition
+    starts an index scan at the cursor, so a page deep in the table costs the same
+    as the first. With a status filter the scan runs on the (account_status,
+    created_at, id) index instead, and the roles filter, `roles @> ARRAY[...]`, may
+    be answered by the GIN index on roles when few accounts match it.
+    """
+    statement = select(
+        model.id,
+        model.email,
+        model.username,
+        model.account_status,
+        model.roles,
+        model.created_at,
+    ).order_by(model.created_at, model.id)
+    if account_status is not None:
+        statement = statement.where(model.account_status == account_status)
+    if roles:
+        # Cast to the column's varchar[], for which the GIN operator class exists.
+        roles = cast(literal(list(roles), ARRAY(String)), ARRAY(String))
+        statement = statement.where(model.roles.contains(roles))
+    if created_after is not None:
+        statement = statement.where(model.created_at >= created_after)
+    if created_before is not None:
+        statement = statement.where(model.created_at < created_before)
+    if after is not None:
+        statement = statement.where(
+            tuple_(model.created_at, model.id) > tuple_(*decode_cursor(after))
+        )
+    return statement
+
+
+def account_record(row) -> dict:
+    """Converts a row of `account_statement` to JSON-serializable values."""
+    return {
+        "id": str(row.id),
+        "email": row.email,
+        "username": row.username,
+        "account_status": AccountStatus(row.account_status).value,
+        "roles": list(row.roles or []),
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+async def list_accounts(db: Session, statement, limit: int = LIST_DEFAULT_LIMIT) -> dict:
+    """
+    Reads one page of accounts.
+
+    Args:
+        db (Session): The database session.
+        statement: The query from `account_statement`.
+        limit (int): The page size.
+
+    Returns:
+        dict: `items`, the accounts of the page, and `next`, the cursor of the next
+        page, or None on the last page.
+
+    One more row than the page is fetched to tell whether a next page exists,
+    without counting the matching accounts.
+    """
+    result = await execute(db, statement.limit(limit + 1))
+    rows = result.all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
+    return {"items": [account_record(row) for row in page], "next": next_cursor}
@@ -0,0 +1,404 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+from uuid import UUID
+
+from fastapi import HTTPException
+from jose import JWTError
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..config.database import INSERT_CONSTRUCTS, commit, execute, pin_to_primary, session_scope
+from ..helpers.auth import (
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS,
+    create_access_token,
+    hash_refresh_token,
+    new_refresh_token,
+    successor_refresh_token,
+    verify_and_decode,
+)
+from ..helpers.metrics import histogram
+from ..helpers.rbac import role_table
+from ..helpers.revocation import revocation_list
+from ..helpers.uuid import generate_uuid, parse_uuid
+from ..models.admin_model import User
+from ..models.token_model import RefreshToken, RevokedToken
+from ..schemas.admin_schema import Token
+from ..schemas.token_schema import TokenIntrospection
+
+logger = logging.getLogger(__name__)
+
+# Configuration for refreshing the revocation list of each worker.
+# Seconds between loads of the tokens revoked by other workers. A token revoked on
+# one worker is accepted by the others for at most this long.
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", 5))
+# Seconds between full reloads, which rebuild the Bloom filter without expired tokens.
+REVOCATION_RELOAD_SECONDS = float(os.getenv("REVOCATION_RELOAD_SECONDS", 3600))
+# Incremental loads re-read revocations this far before the watermark, to catch
+# transactions that committed after a later revocation had already been loaded.
+REVOCATION_REFRESH_OVERLAP_SECONDS = 30
+
+# Maximum number of tokens accepted by one introspection request.
+INTROSPECT_MAX_TOKENS = int(os.getenv("INTROSPECT_MAX_TOKENS", 100))
+
+revocation_refresh_seconds = histogram(
+    "auth_revocation_refresh_seconds",
+    "Time spent loading revoked tokens from the database.",
+)
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite returns naive datetimes, which are stored in UTC.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _timestamp(value: datetime) -> float:
+    return _aware(value).timestamp()
+
+
+def _insert_refresh_token(db: Session, token: str, family_id: UUID, user_id: UUID):
+    """
+    Builds the statement storing a refresh token, ignoring one already stored.
+    """
+    dialect = db.get_bind().dialect.name
+    return (
+        INSERT_CONSTRUCTS[dialect](RefreshToken)
+        .values(
+            id=generate_uuid(),
+            token_hash=hash_refresh_token(token),
+            family_id=family_id,
+            user_id=user_id,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        .on_conflict_do_nothing(index_elements=[RefreshToken.token_hash])
+    )
+
+
+def _access_token(user_id: UUID, roles) -> str:
+    # Roles and their compiled permissions let endpoints authorize from the token alone.
+    return create_access_token(data={"sub": str(user_id), **role_table.claims_for(roles or ())})
+
+
+async def issue_tokens(db: Session, user_id: UUID, roles) -> Token:
+    """
+    Issues an access token and the refresh token of a new token family, e.g. on login.
+
+    Args:
+        db (Session): The database session.
+        user_id (UUID): The authenticated user's id.
+        roles: The user's roles, embedded in the access token with their permissions.
+
+    Returns:
+        Token: The access token and refresh token.
+    """
+    refresh_token = new_refresh_token()
+    await execute(db, _insert_refresh_token(db, refresh_token, generate_uuid(), user_id))
+    await commit(db)
+    return Token(
+        access_token=_access_token(user_id, roles),
+        refresh_token=refresh_token,
+    )
+
+
+async def refresh_access_token(db: Session, token: str) -> Token:
+    """
+    Exchanges a refresh token for a new access token and a rotated refresh token.
+
+    Args:
+        db (Session): The database session.
+        token (str): The refresh token provided by the user.
+
+    Returns:
+        Token: A new access token and the successor of the refresh token.
+
+    Raises:
+        HTTPException: If the refresh token is unknown, expired, revoked, or reused.
+
+    Each refresh token can be rotated once. The first request to mark it used stores
+    its successor, derived from the token itself, with ON CONFLICT DO NOTHING.
+    Requests presenting it again within REFRESH_TOKEN_REUSE_GRACE_SECONDS, such as
+    concurrent refreshes from the same client, are answered with the same successor
+    without writing anything. Presenting it after the grace window means the token
+    leaked, and revokes its whole family, including the current successor.
+
+    The token is read on the primary: a read replica may not have the token of a
+    login made a moment ago yet, nor the revocation of its family.
+    """
+    invalid = HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    pin_to_primary(db)
+    result = await execute(
+        db,
+        select(
+            RefreshToken.id,
+            RefreshToken.family_id,
+            RefreshToken.user_id,
+            RefreshToken.expires_at,
+            RefreshToken.used_at,
+            RefreshToken.revoked_at,
+            User.roles,
+        )
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == hash_refresh_token(token)),
+    )
+    stored = result.first()
+    now = datetime.now(timezone.utc)
+    if stored is None or stored.revoked_at is not None or _aware(stored.expires_at) <= now:
+        await commit(db)
+        raise invalid
+
+    successor = successor_refresh_token(token)
+    used_at = stored.used_at
+    if used_at is None:
+        # Only one request can mark the token used; Postgres makes concurrent
+        # ones wait for it to commit, then find the token already used. A family
+        # revoked in the meantime is not rotated either.
+        result = await execute(
+            db,
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == stored.id,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(used_at=now)
+            .returning(RefreshToken.id)
+            .execution_options(synchronize_session=False),
+        )
+        if result.first() is not None:
+            await execute(
+                db, _insert_refresh_token(db, successor, stored.family_id, stored.user_id)
+            )
+            await commit(db)
+            return Token(
+                access_token=_access_token(stored.user_id, stored.roles),
+                refresh_token=successor,
+            )
+        result = await execute(
+            db,
+            select(RefreshToken.used_at, RefreshToken.revoked_at).where(
+                RefreshToken.id == stored.id
+            ),
+        )
+        used_at, revoked_at = result.one()
+        if revoked_at is not None:
+            # Its family was revoked since it was read.
+            await commit(db)
+            raise invalid
+
+    if now - _aware(used_at) <= timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+        await commit(db)
+        return Token(
+            access_token=_access_token(stored.user_id, stored.roles),
+            refresh_token=successor,
+        )
+
+    await revoke_token_family(db, stored.family_id)
+    raise invalid
+
+
+async def revoke_token_family(db: Session, family_id: UUID):
+    """
+    Revokes every refresh token of a family, ending the session it belongs to.
+
+    Args:
+        db (Session): The database session.
+        family_id (UUID): The family of the refresh tokens.
+    """
+    await execute(
+        db,
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False),
+    )
+    await commit(db)
+
+
+async def revoke_refresh_token(db: Session, token: str) -> bool:
+    """
+    Revokes a refresh token together with its family.
+
+    Args:
+        db (Session): The database session.
+        token (str): The refresh token to revoke.
+
+    Returns:
+        bool: True if the token was known and not revoked yet.
+
+    Like a refresh, this reads the token on the primary, so a logout right after
+    login finds it.
+    """
+    pin_to_primary(db)
+    result = await execute(
+        db,
+        select(RefreshToken.family_id).where(
+            RefreshToken.token_hash == hash_refresh_token(token),
+            RefreshToken.revoked_at.is_(None),
+        ),
+    )
+    family_id = result.scalar()
+    if family_id is None:
+        await commit(db)
+        return False
+    await revoke_token_family(db, family_id)
+    return True
+
+
+async def revoke_token(db: Session, token: str) -> bool:
+    """
+    Revokes an access token or a refresh token.
+
+    Args:
+        db (Session): The database session.
+        token (str): The access token or refresh token to revoke.
+
+    Returns:
+        bool: True if the token was revoked, False if it was invalid, expired,
+        already revoked, or issued without a `jti` claim.
+
+    Access token revocations are stored so every worker picks them up on its next
+    refresh, and apply to this worker at once. Anything that is not a JWT is
+    treated as a refresh token, whose whole family is revoked.
+    """
+    try:
+        claims = verify_and_decode(token)
+    except JWTError:
+        if token.count(".") != 2:
+            return await revoke_refresh_token(db, token)
+        return False
+    jti = parse_uuid(claims.get("jti"))
+    if jti is None or "exp" not in claims:
+        return False
+
+    dialect = db.get_bind().dialect.name
+    await execute(
+        db,
+        INSERT_CONSTRUCTS[dialect](RevokedToken)
+        .values(jti=jti, expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc))
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti]),
+    )
+    await commit(db)
+    revocation_list.add(str(jti), claims["exp"])
+    return True
+
+
+async def introspect_tokens(db: Session, tokens: List[str]) -> List[TokenIntrospection]:
+    """
+    Checks many access tokens at once.
+
+    Args:
+        db (Session): The database session.
+        tokens (List[str]): The access tokens to check.
+
+    Returns:
+        List[TokenIntrospection]: The state of each token, in the order given.
+
+    Raises:
+        HTTPException: An exception with status code 413 if more than
+        INTROSPECT_MAX_TOKENS tokens are given.
+
+    Tokens are verified by `verify_and_decode`, so repeated tokens are answered from
+    the claims cache. The accounts behind the valid tokens are then loaded through
+    the user cache, with a single `id IN (...)` query for those it does not hold.
+    A token whose account no longer exists is inactive.
+    """
+    # admin_controller imports this module to issue tokens on login.
+    from .admin_controller import get_users_by_ids
+
+    if len(tokens) > INTROSPECT_MAX_TOKENS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {INTROSPECT_MAX_TOKENS} tokens per request"
+        )
+
+    verified = []
+    for token in tokens:
+        try:
+            claims = verify_and_decode(token)
+        except JWTError:
+            claims = None
+        user_id = parse_uuid(claims["sub"]) if claims else None
+        verified.append((claims, user_id))
+
+    users = await get_users_by_ids(db, [user_id for _, user_id in verified if user_id])
+
+    results = []
+    for claims, user_id in verified:
+        user = users.get(user_id)
+        if user is None:
+            results.append(TokenIntrospection(active=False))
+            continue
+        results.append(
+            TokenIntrospection(
+                active=True,
+                sub=claims["sub"],
+                roles=list(user.roles),
+                account_status=user.account_status.value,
+                exp=claims.get("exp"),
+            )
+        )
+    return results
+
+
+async def load_revocations(db: Session, full: bool = False) -> int:
+    """
+    Loads revoked tokens into the revocation list of this worker.
+
+    Args:
+        db (Session): The database session.
+        full (bool): Reload every unexpired revocation and rebuild the Bloom filter,
+            instead of loading only those since the last load.
+
+    Returns:
+        int: The number of revocations loaded.
+    """
+    started = time.perf_counter()
+    query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+        RevokedToken.expires_at > datetime.now(timezone.utc)
+    )
+    watermark = revocation_list.watermark
+    if not full and watermark is not None:
+        query = query.where(
+            RevokedToken.revoked_at
+            > watermark - timedelta(seconds=REVOCATION_REFRESH_OVERLAP_SECONDS)
+        )
+
+    result = await execute(db, query)
+    rows = result.all()
+    entries = [(str(row.jti), _timestamp(row.expires_at)) for row in rows]
+    watermark = max((row.revoked_at for row in rows), default=None if full else watermark)
+
+    if full:
+        # Rebuilding the Bloom filter for a large list takes seconds; keep it off the event loop.
+        await run_in_threadpool(revocation_list.replace, entries, watermark)
+    else:
+        revocation_list.update(entries, watermark)
+    revocation_refresh_seconds.observe(time.perf_counter() - started)
+    return len(entries)
+
+
+async def refresh_revocations():
+    """
+    Background task keeping the revocation list of this worker up to date.
+
+    Loads new revocations every REVOCATION_REFRESH_SECONDS and reloads all of them
+    every REVOCATION_RELOAD_SECONDS. Failures are logged and retried on the next round.
+    """
+    last_reload = time.monotonic()
+    while True:
+        await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+        full = time.monotonic() - last_reload >= REVOCATION_RELOAD_SECONDS
+        try:
+            async with session_scope() as db:
+                await load_revocations(db, full=full)
+        except Exception:
+            logger.exception("Failed to refresh the revocation list")
+            continue
+        if full:
+            last_reload = time.monotonic()
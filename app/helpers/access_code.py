@@ -1,9 +1,50 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, create_engine
-from sqlalchemy import func
+import asyncio
+import hmac
+from abc import ABC, abstractmethod
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Uuid
+from sqlalchemy import delete, func, insert, literal, select, update
 import random
+from uuid import UUID
+from app.helpers.kv import KeyValueStore, MemoryKeyValueStore, kv_store
+from app.helpers.metrics import counter, histogram
 from app.helpers.uuid import generate_uuid
 from app.config.database import Base
 from sqlalchemy.orm import Session
+from app.config.database import commit, execute, session_scope
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration for access code expiry.
+# Seconds an access code can be used after it was sent.
+ACCESS_CODE_TTL_SECONDS = float(os.getenv("ACCESS_CODE_TTL_SECONDS", 86400))
+# Seconds between sweeps deleting expired codes.
+ACCESS_CODE_SWEEP_INTERVAL_SECONDS = float(
+    os.getenv("ACCESS_CODE_SWEEP_INTERVAL_SECONDS", 60)
+)
+# Codes deleted per statement. Each batch commits on its own, so locks are held briefly.
+ACCESS_CODE_SWEEP_BATCH_SIZE = int(os.getenv("ACCESS_CODE_SWEEP_BATCH_SIZE", 1000))
+# Where codes are kept: "sql" in the access_codes table, "memory" in each worker, or
+# "kv" in the key-value store configured by KV_URL.
+ACCESS_CODE_STORE = os.getenv("ACCESS_CODE_STORE", "sql")
+# Wrong codes tried against a user's code before it stops being accepted.
+ACCESS_CODE_MAX_ATTEMPTS = int(os.getenv("ACCESS_CODE_MAX_ATTEMPTS", 5))
+
+access_codes_swept = counter(
+    "auth_access_codes_swept_total",
+    "Expired access codes deleted by the sweeper.",
+)
+access_code_sweep_seconds = histogram(
+    "auth_access_code_sweep_seconds",
+    "Time spent deleting expired access codes, per sweep.",
+)
 
 
 class AccessCode(Base):
@@ -11,17 +52,36 @@ class AccessCode(Base):
     AccessCode model representing the 'access_codes' table in the database.
 
     Attributes:
-        id (String): Unique identifier for the access code record, generated using UUID.
-        user_id (String): Foreign key reference to the associated user's ID.
+        id (Uuid): Unique time-ordered identifier for the access code record.
+        user_id (Uuid): Foreign key reference to the associated user's ID.
         code (String): The actual access code.
         created_at (DateTime): Timestamp indicating when the access code was created.
+        expires_at (DateTime): Timestamp after which the code is rejected and swept.
+        attempts (Integer): Number of wrong codes tried for the user while this one was valid.
     """
 
     __tablename__ = "access_codes"
-    id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=generate_uuid)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
     code = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    attempts = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_access_codes_user_id_code", user_id, code),
+        Index("ix_access_codes_expires_at", expires_at),
+    )
+
+
+def code_expiry() -> datetime:
+    """
+    Returns the expiry of an access code created now.
+
+    Returns:
+        datetime: The current time plus ACCESS_CODE_TTL_SECONDS, in UTC.
+    """
+    return datetime.now(timezone.utc) + timedelta(seconds=ACCESS_CODE_TTL_SECONDS)
 
 
 def generate_code():
@@ -37,18 +97,277 @@ def generate_code():
     return "".join([str(random.randint(0, 9)) for _ in range(6)])
 
 
-def save_access_code(db: Session, user_id: str, code: str):
+async def save_access_code(db: Session, user_id: UUID, code: str):
     """
     Saves an access code to the database.
 
     Args:
         db (Session): The database session.
-        user_id (str): The ID of the user for whom the code is generated.
+        user_id (UUID): The ID of the user for whom the code is generated.
         code (str): The access code to be saved.
 
-    This function creates a new access code record and associates it with a user.
-    It then saves this record in the database.
+    This function inserts a new access code record associated with a user.
+    The caller commits, so the code can share a transaction with the user it belongs to.
+    """
+    await execute(
+        db, insert(AccessCode).values(user_id=user_id, code=code, expires_at=code_expiry())
+    )
+
+
+def insert_access_code_from(users, code: str):
+    """
+    Builds an INSERT of an access code for the users selected by a subquery.
+
+    Args:
+        users: A selectable with an `id` column, such as the RETURNING CTE of a user INSERT.
+        code (str): The access code to be saved.
+
+    Returns:
+        Insert: An INSERT ... SELECT statement adding one access code per selected user.
+    """
+    return insert(AccessCode).from_select(
+        [AccessCode.id, AccessCode.user_id, AccessCode.code, AccessCode.expires_at],
+        select(
+            literal(generate_uuid()),
+            users.c.id,
+            literal(code),
+            literal(code_expiry(), AccessCode.expires_at.type),
+        ),
+    )
+
+
+class AccessCodeStore(ABC):
+    """
+    Interface of the stores keeping the access codes sent to users.
+
+    Attributes:
+        in_database (bool): Whether codes are rows of the access_codes table, so that
+            they can be written and consumed by the statements changing the user.
+
+    A code is accepted once, before it expires and while fewer than
+    ACCESS_CODE_MAX_ATTEMPTS wrong codes were tried for the user. Consuming it is
+    atomic, so two concurrent requests with the same code cannot both succeed.
+    """
+
+    in_database = False
+
+    @abstractmethod
+    async def save(self, db: Session, user_id: UUID, code: str):
+        """
+        Stores the code sent to a user.
+
+        Args:
+            db (Session): The database session. The caller commits.
+            user_id (UUID): The ID of the user for whom the code is generated.
+            code (str): The access code to be saved.
+        """
+
+    @abstractmethod
+    async def consume(self, db: Session, user_id: UUID, code: str) -> bool:
+        """
+        Consumes a user's code, counting the attempt if it is wrong.
+
+        Args:
+            db (Session): The database session. The caller commits.
+            user_id (UUID): The ID of the user.
+            code (str): The code provided by the user.
+
+        Returns:
+            bool: True if the code was valid and is now used up, False otherwise.
+        """
+
+
+class SqlAccessCodeStore(AccessCodeStore):
+    """
+    Access codes kept in the access_codes table.
+
+    Codes share the transaction of the user they belong to, and expired codes are
+    deleted by `sweep_access_codes`.
+    """
+
+    in_database = True
+
+    def consume_statement(self, user_id: UUID, code: str):
+        """
+        Builds the DELETE ... RETURNING user_id claiming a valid code.
+
+        Args:
+            user_id (UUID): The ID of the user.
+            code (str): The code provided by the user.
+
+        Returns:
+            Delete: The statement, returning a row only if the code was consumed.
+        """
+        return (
+            delete(AccessCode)
+            .where(
+                AccessCode.user_id == user_id,
+                AccessCode.code == code,
+                AccessCode.expires_at > datetime.now(timezone.utc),
+                AccessCode.attempts < ACCESS_CODE_MAX_ATTEMPTS,
+            )
+            .returning(AccessCode.user_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def record_failure(self, db: Session, user_id: UUID):
+        """
+        Counts a wrong code against every valid code of a user.
+
+        Args:
+            db (Session): The database session. The caller commits.
+            user_id (UUID): The ID of the user.
+        """
+        await execute(
+            db,
+            update(AccessCode)
+            .where(
+                AccessCode.user_id == user_id,
+                AccessCode.expires_at > datetime.now(timezone.utc),
+            )
+            .values(attempts=AccessCode.attempts + 1)
+            .execution_options(synchronize_session=False),
+        )
+
+    async def save(self, db: Session, user_id: UUID, code: str):
+        await save_access_code(db, user_id, code)
+
+    async def consume(self, db: Session, user_id: UUID, code: str) -> bool:
+        result = await execute(db, self.consume_statement(user_id, code))
+        if result.first() is not None:
+            return True
+        await self.record_failure(db, user_id)
+        return False
+
+
+class KeyValueAccessCodeStore(AccessCodeStore):
+    """
+    Access codes kept in a key-value store, so verifying one never reads the database.
+
+    Args:
+        store (KeyValueStore): The key-value store, such as the shared `kv_store`.
+
+    Each user has at most one code, replaced when a new one is saved, and a counter
+    of wrong attempts. Both expire with the code, so nothing needs sweeping. The
+    code is consumed with a compare-and-delete, which only one request can win.
+    """
+
+    def __init__(self, store: KeyValueStore):
+        self.store = store
+
+    async def save(self, db: Session, user_id: UUID, code: str):
+        await self.store.set(f"access-code:{user_id}", code.encode(), ACCESS_CODE_TTL_SECONDS)
+        await self.store.pop(f"access-code-attempts:{user_id}")
+
+    async def consume(self, db: Session, user_id: UUID, code: str) -> bool:
+        key = f"access-code:{user_id}"
+        stored = await self.store.get(key)
+        if stored is None:
+            return False
+        if not hmac.compare_digest(stored, code.encode()):
+            attempts = await self.store.incr(
+                f"access-code-attempts:{user_id}", ACCESS_CODE_TTL_SECONDS
+            )
+            if attempts >= ACCESS_CODE_MAX_ATTEMPTS:
+                await self.store.compare_and_set(key, stored, None, 0)
+            return False
+        return await self.store.compare_and_set(key, stored, None, 0)
+
+
+class MemoryAccessCodeStore(KeyValueAccessCodeStore):
+    """
+    Access codes kept in the memory of the current process.
+
+    Only suitable when a single worker serves both signup and verification.
+    """
+
+    def __init__(self):
+        super().__init__(MemoryKeyValueStore())
+
+
+def open_access_code_store(kind: str) -> AccessCodeStore:
+    """
+    Opens the access code store of a kind.
+
+    Args:
+        kind (str): "sql", "memory" or "kv".
+
+    Returns:
+        AccessCodeStore: The store.
+
+    Raises:
+        ValueError: If the kind is unknown.
+    """
+    if kind == "sql":
+        return SqlAccessCodeStore()
+    if kind == "memory":
+        return MemoryAccessCodeStore()
+    if kind == "kv":
+        return KeyValueAccessCodeStore(kv_store)
+    raise ValueError(f"Unknown access code store: {kind}")
+
+
+access_code_store = open_access_code_store(ACCESS_CODE_STORE)
+
+
+async def purge_expired_access_codes(db: Session, batch_size: int) -> int:
+    """
+    Deletes expired access codes in bounded batches.
+
+    Args:
+        db (Session): The database session.
+        batch_size (int): Maximum number of codes deleted by each statement.
+
+    Returns:
+        int: The number of codes deleted.
+
+    Each batch is a `DELETE ... WHERE id IN (SELECT id ... LIMIT n)` committed on its
+    own, so no statement locks more than `batch_size` rows, or holds them for long.
+    On Postgres the subquery uses FOR UPDATE SKIP LOCKED, so workers sweeping at the
+    same time, and verifications in progress, do not wait for each other.
+    """
+    deleted = 0
+    while True:
+        now = datetime.now(timezone.utc)
+        expired = (
+            select(AccessCode.id)
+            .where(AccessCode.expires_at <= now)
+            .order_by(AccessCode.expires_at)
+            .limit(batch_size)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            expired = expired.with_for_update(skip_locked=True)
+        result = await execute(
+            db,
+            delete(AccessCode)
+            .where(AccessCode.id.in_(expired.scalar_subquery()))
+            .execution_options(synchronize_session=False),
+        )
+        await commit(db)
+        deleted += result.rowcount
+        access_codes_swept.inc(result.rowcount)
+        if result.rowcount < batch_size:
+            return deleted
+        # Let requests run between batches.
+        await asyncio.sleep(0)
+
+
+async def sweep_access_codes():
+    """
+    Background task deleting expired access codes every ACCESS_CODE_SWEEP_INTERVAL_SECONDS.
+
+    Runs until cancelled. A failed sweep is logged and retried on the next round.
+    Returns at once when codes are not kept in the database.
     """
-    access_code = AccessCode(user_id=user_id, code=code)
-    db.add(access_code)
-    db.commit()
+    if not access_code_store.in_database:
+        return
+    while True:
+        await asyncio.sleep(ACCESS_CODE_SWEEP_INTERVAL_SECONDS)
+        started = time.perf_counter()
+        try:
+            async with session_scope() as db:
+                await purge_expired_access_codes(db, ACCESS_CODE_SWEEP_BATCH_SIZE)
+        except Exception:
+            logger.exception("Failed to sweep expired access codes")
+        finally:
+            access_code_sweep_seconds.observe(time.perf_counter() - started)
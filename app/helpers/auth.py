@@ -1,5 +1,13 @@
 # auth.py
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
@@ -7,18 +15,48 @@ from passlib.context import CryptContext
 from dotenv import load_dotenv
 import os
 
+from .cache import MISSING, TTLCache
+from .keys import JWT_ACTIVE_KID, JWT_ALGORITHM, JWT_KEYS_DIR, KeyRing
+from .metrics import counter, gauge, histogram
+from .revocation import revocation_list
+from .uuid import generate_uuid
+
 load_dotenv()
 
 # Configuration for JWT (JSON Web Token)
-# Secret key for JWT encoding/decoding. Replace with a secure key.
+# Secret key for JWT encoding/decoding with HS256. Replace with a secure key.
 SECRET_KEY = os.getenv("SECRET")
-ALGORITHM = "HS256"  # Algorithm used for JWT encoding/decoding.
-# The expiration time in minutes for the access token.
-ACCESS_TOKEN_EXPIRE_MINUTES = 43200
+# The expiration time in minutes for the access token. Access tokens are short-lived;
+# clients keep a session going with their refresh token.
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+# The expiration time in days for refresh tokens, renewed on every rotation.
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+# Seconds during which a rotated refresh token may be presented again, e.g. by
+# concurrent requests of the same client, and gets the same successor. Presenting
+# it later is treated as theft and revokes its whole family.
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", 10))
+# Key deriving the successor of a rotated refresh token. Defaults to the SECRET.
+REFRESH_TOKEN_SECRET = os.getenv("REFRESH_TOKEN_SECRET") or SECRET_KEY
+# Maximum number of verified tokens whose claims are cached, per worker process.
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))
+
+token_cache = TTLCache(JWT_CACHE_SIZE, ttl=0, name="jwt")
+
+# Keys signing and verifying tokens, see app/helpers/keys.py for the settings.
+key_ring = KeyRing(JWT_ALGORITHM, SECRET_KEY, JWT_KEYS_DIR, JWT_ACTIVE_KID)
 
 # Configuration for password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Configuration for the password hashing executor.
+# "thread" or "process". bcrypt releases the GIL, so threads already spread
+# hashing across cores; a process pool isolates it from the event loop entirely.
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+# Number of hashing workers. Defaults to one per CPU core.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+# Number of hashing jobs allowed to wait for a free worker before new ones are rejected.
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", 64))
+
 
 def create_access_token(data: dict) -> str:
     """
@@ -30,55 +68,101 @@ def create_access_token(data: dict) -> str:
     Returns:
         str: A JWT encoded as a string.
 
-    This function creates a JWT token by encoding the provided data along with an expiry time.
+    This function creates a JWT token by encoding the provided data along with an expiry time
+    and a unique `jti` claim, by which the token can be revoked.
     The token can be used for authentication and authorization purposes.
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "jti": str(generate_uuid())})
+    kid, key = key_ring.signing_key()
+    headers = {"kid": kid} if kid else None
+    encoded_jwt = jwt.encode(to_encode, key, algorithm=key_ring.algorithm, headers=headers)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> str:
+def verify_and_decode(token: str) -> dict:
     """
-    Extract data from token
+    Verifies a JWT token and returns its claims.
 
     Args:
-        token (str): The parsed in token from the request body
+        token (str): The JWT token to be verified.
 
     Returns:
-        str: The user id extracted from the existing token
+        dict: The claims of the token, such as `sub` and `exp`. Callers must not modify it,
+        since the same dictionary is returned for every use of the token.
 
-    This function creates a JWT token by encoding the provided data along with an expiry time.
-    The token can be used for authentication and authorization purposes.
+    Raises:
+        JWTError: If the signature is invalid, the token is expired or revoked, or it has
+        no subject.
+
+    The verification key is picked by the `kid` in the token header. Verified claims
+    are cached under the SHA-256 digest of the token until the token expires, so
+    repeated bearer tokens are only decoded and verified once per worker.
+    Invalid tokens are never cached. Revocation is checked on every call, against
+    the in-process revocation list.
     """
-    # Extract user ID from refresh token and generate a new access token
-    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    user_id = payload.get("sub")
-    return user_id
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is not MISSING:
+        if revocation_list.is_revoked(claims.get("jti")):
+            raise JWTError("Token has been revoked")
+        return claims
+
+    key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+    claims = jwt.decode(token, key, algorithms=[key_ring.algorithm])
+    if claims.get("sub") is None:
+        raise JWTError("Token has no subject")
+    if revocation_list.is_revoked(claims.get("jti")):
+        raise JWTError("Token has been revoked")
+
+    expires_in = claims.get("exp", 0) - time.time()
+    if expires_in > 0:
+        token_cache.set(digest, claims, ttl=expires_in)
+    return claims
 
 
-def verify_token(token: str) -> bool:
+def new_refresh_token() -> str:
+    """
+    Generates the opaque refresh token that starts a new token family.
+
+    Returns:
+        str: 256 random bits, URL-safe base64 encoded.
     """
-    Verifies a JWT token.
+    return secrets.token_urlsafe(32)
+
+
+def successor_refresh_token(token: str) -> str:
+    """
+    Derives the refresh token replacing a rotated one.
 
     Args:
-        token (str): The JWT token to be verified.
+        token (str): The refresh token being rotated.
 
     Returns:
-        bool: True if the token is valid, False otherwise.
+        str: HMAC-SHA256 of the token, URL-safe base64 encoded.
+
+    The successor is deterministic, so concurrent rotations of the same token agree
+    on its value and store it once, yet cannot be guessed without the key.
+    """
+    if not REFRESH_TOKEN_SECRET:
+        raise RuntimeError("REFRESH_TOKEN_SECRET or SECRET must be set to rotate refresh tokens")
+    digest = hmac.new(REFRESH_TOKEN_SECRET.encode(), token.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def hash_refresh_token(token: str) -> bytes:
+    """
+    Hashes a refresh token for storage and lookup.
+
+    Args:
+        token (str): The refresh token.
 
-    This function decodes the JWT token using the secret key and checks its validity.
-    It returns True if the token is valid and the payload (such as user_id) can be retrieved.
-    If the token is invalid or expired, it returns False.
+    Returns:
+        bytes: The SHA-256 digest of the token. A fast hash is enough, since refresh
+        tokens are random rather than chosen by users.
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        return user_id is not None
-    except JWTError:
-        return False
+    return hashlib.sha256(token.encode()).digest()
 
 
 def hash_password(password: str) -> str:
@@ -112,3 +196,199 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     It is used primarily for user authentication during login.
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashQueueFull(Exception):
+    """
+    Raised when the hashing executor has no room for another job.
+
+    Callers should answer with 503 Service Unavailable rather than wait, since
+    every queued job delays all the others.
+    """
+
+
+def _timed_call(fn, args):
+    """
+    Runs a hashing job inside a worker and reports when it started.
+
+    Args:
+        fn (callable): The hashing function to run.
+        args (tuple): Positional arguments for the function.
+
+    Returns:
+        tuple: The function result and the monotonic time the job started.
+    """
+    started = time.monotonic()
+    return fn(*args), started
+
+
+class HashExecutor:
+    """
+    Bounded worker pool for CPU-bound password hashing.
+
+    Attributes:
+        kind (str): "thread" or "process", the type of pool backing the executor.
+        workers (int): Number of workers in the pool.
+        queue_size (int): Number of jobs allowed to wait for a free worker.
+
+    The pool is created on first use. At most `workers + queue_size` jobs are in
+    flight at once; further submissions raise HashQueueFull immediately.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_size: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hash executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs submitted and not yet finished."""
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs in flight at once."""
+        return self.workers + self.queue_size
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="hash"
+                    )
+            return self._pool
+
+    async def run(self, fn, *args):
+        """
+        Runs a hashing function on the pool without blocking the event loop.
+
+        Args:
+            fn (callable): A module-level function, so it can be sent to a process pool.
+            *args: Positional arguments for the function.
+
+        Returns:
+            The return value of the function.
+
+        Raises:
+            HashQueueFull: If the executor already holds `capacity` jobs.
+        """
+        pool = self._get_pool()
+        with self._lock:
+            if self._pending >= self.capacity:
+                HASH_REJECTED.inc()
+                raise HashQueueFull("Password hashing queue is full")
+            self._pending += 1
+        submitted = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started = await loop.run_in_executor(pool, _timed_call, fn, args)
+            HASH_WAIT_SECONDS.observe(max(0.0, started - submitted))
+            HASH_RUN_SECONDS.observe(time.monotonic() - started)
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def warm(self, fn, *args):
+        """
+        Starts the workers of the pool by running a function once on each.
+
+        Args:
+            fn (callable): A module-level function loading what later jobs need.
+            *args: Positional arguments for the function.
+        """
+        await asyncio.gather(*(self.run(fn, *args) for _ in range(self.workers)))
+
+    def shutdown(self):
+        """Shuts the pool down, waiting for running jobs to finish."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+hash_executor = HashExecutor(HASH_EXECUTOR, HASH_WORKERS, HASH_QUEUE_SIZE)
+
+HASH_QUEUE_DEPTH = gauge(
+    "auth_hash_queue_depth",
+    "Password hashing jobs submitted and not yet finished.",
+    callback=lambda: hash_executor.pending,
+)
+HASH_WAIT_SECONDS = histogram(
+    "auth_hash_wait_seconds",
+    "Time hashing jobs spent waiting for a free worker.",
+)
+HASH_RUN_SECONDS = histogram(
+    "auth_hash_run_seconds",
+    "Time spent hashing or verifying a password.",
+)
+HASH_REJECTED = counter(
+    "auth_hash_rejected_total",
+    "Hashing jobs rejected because the queue was full.",
+)
+
+
+def load_hash_backend() -> str:
+    """
+    Loads and self-tests passlib's bcrypt backend, which it otherwise does on the first hash.
+
+    Returns:
+        str: The name of the backend.
+    """
+    return pwd_context.handler().get_backend()
+
+
+async def prewarm():
+    """
+    Loads the signing keys and starts the hashing workers, so the first login does not pay for it.
+
+    Raises:
+        ValueError: If the signing keys are misconfigured.
+    """
+    key_ring.load()
+    # Signs and verifies a throwaway token, loading whatever jose loads lazily.
+    kid, key = key_ring.signing_key()
+    token = jwt.encode({"sub": "prewarm"}, key, algorithm=key_ring.algorithm)
+    jwt.decode(token, key_ring.verification_key(kid), algorithms=[key_ring.algorithm])
+    await hash_executor.warm(load_hash_backend)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password using bcrypt on the hashing executor.
+
+    Args:
+        password (str): The plain text password to be hashed.
+
+    Returns:
+        str: The hashed password.
+
+    Raises:
+        HashQueueFull: If the hashing executor is saturated.
+    """
+    return await hash_executor.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies a password against a hashed password on the hashing executor.
+
+    Args:
+        plain_password (str): The plain text password to verify.
+        hashed_password (str): The hashed password to verify against.
+
+    Returns:
+        bool: True if the password matches, False otherwise.
+
+    Raises:
+        HashQueueFull: If the hashing executor is saturated.
+    """
+    return await hash_executor.run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,69 @@
+# bloom.py
+
+import hashlib
+import math
+import struct
+import threading
+
+
+class BloomFilter:
+    """
+    Set membership filter that never misses an added item but may report false positives.
+
+    Attributes:
+        capacity (int): Number of items the filter is sized for.
+        error_rate (float): False positive rate expected at capacity.
+        size (int): Number of bits in the filter.
+        hashes (int): Number of bits set per item.
+        count (int): Number of items added.
+
+    Each item sets `hashes` bits, one per 32-bit word of a single BLAKE2b digest,
+    which caps the filter at 16 hashes and 2**32 bits. Beyond its capacity the
+    filter keeps working but its false positive rate climbs, so it should then be
+    rebuilt larger.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.size = min(self.size, 2**32)
+        self.hashes = min(16, max(1, round(self.size / capacity * math.log(2))))
+        self.count = 0
+        self._words = struct.Struct(f"<{self.hashes}I")
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=4 * self.hashes).digest()
+        size = self.size
+        return [word % size for word in self._words.unpack(digest)]
+
+    def add(self, item: str):
+        """
+        Adds an item to the filter.
+
+        Args:
+            item (str): The item to add.
+        """
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the bit array, in bytes."""
+        return len(self._bits)
@@ -0,0 +1,106 @@
+# cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import counter
+
+# Returned by TTLCache.get when a key is absent or expired, so that None can be cached.
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time to live.
+
+    Attributes:
+        maxsize (int): Maximum number of entries; the least recently used one is evicted first.
+        ttl (float): Default time to live of an entry, in seconds.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that found nothing or an expired entry.
+
+    When a name is given, hits and misses are also exported as the
+    `<name>_cache_hits_total` and `<name>_cache_misses_total` metrics.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hit_counter = self._miss_counter = None
+        if name:
+            self._hit_counter = counter(
+                f"{name}_cache_hits_total", f"Lookups answered by the {name} cache."
+            )
+            self._miss_counter = counter(
+                f"{name}_cache_misses_total", f"Lookups the {name} cache could not answer."
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=MISSING):
+        """
+        Looks up a key, refreshing its position in the LRU order.
+
+        Args:
+            key: The cache key.
+            default: Value returned when the key is absent or expired.
+
+        Returns:
+            The cached value, or `default`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                hit = True
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                hit = False
+        if hit:
+            if self._hit_counter:
+                self._hit_counter.inc()
+            return entry[1]
+        if self._miss_counter:
+            self._miss_counter.inc()
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The cache key.
+            value: The value to cache. None is a valid value, e.g. for negative caching.
+            ttl (float, optional): Time to live in seconds, defaults to the cache TTL.
+        """
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """
+        Removes a key from the cache if present.
+
+        Args:
+            key: The cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
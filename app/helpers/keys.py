@@ -0,0 +1,188 @@
+# keys.py
+
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+from jose import JWTError, jwk
+from jose.exceptions import JOSEError
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Algorithm used to sign tokens. HS256 signs with the shared SECRET; RS256 and
+# ES256 sign with the private keys in JWT_KEYS_DIR and publish their public halves
+# at /.well-known/jwks.json, so other services can verify tokens offline.
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# Directory of keys named after their kid: <kid>.pem holds a private key, which can
+# sign, and <kid>.pub.pem a public key kept only to verify tokens it signed earlier.
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR")
+# kid of the key that signs new tokens. Defaults to the greatest kid with a private key.
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+# Seconds verifiers may cache the JWKS document.
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", 300))
+# Seconds between checks of JWT_KEYS_DIR for added, replaced or removed keys,
+# which are then loaded without restarting the worker.
+JWT_KEYS_RELOAD_SECONDS = float(os.getenv("JWT_KEYS_RELOAD_SECONDS", 5))
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class KeyRing:
+    """
+    The keys used to sign and verify tokens.
+
+    Attributes:
+        algorithm (str): The JWT algorithm, "HS256", "RS256" or "ES256".
+        keys_dir (str): Directory holding the asymmetric keys.
+        active_kid (str): kid of the signing key, or None to pick the greatest one.
+
+    Keys are read on first use, and again by `watch_keys_dir` when the directory
+    changes. Every key in the directory is accepted for verification and published
+    in the JWKS, but only the active key signs. To rotate: add the new key, wait
+    JWKS_MAX_AGE_SECONDS so verifiers fetch it, make it active, then remove the old
+    private key once the tokens it signed have expired, or replace it with its
+    public half to keep accepting them a while longer.
+    """
+
+    def __init__(self, algorithm: str, secret: str = None, keys_dir: str = None, active_kid: str = None):
+        self.algorithm = algorithm
+        self.secret = secret
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self._signing = None
+        self._verifying = None
+        self._jwks = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def load(self):
+        """
+        Reads the keys from the key directory, replacing any loaded before.
+
+        Raises:
+            ValueError: If an asymmetric algorithm is configured without usable keys.
+        """
+        if not self.is_asymmetric:
+            with self._lock:
+                self._signing = (None, self.secret)
+                self._verifying = {None: self.secret}
+                self._jwks = {"keys": []}
+            return
+
+        if not self.keys_dir:
+            raise ValueError(f"JWT_KEYS_DIR is required to sign with {self.algorithm}")
+
+        private_keys, verifying = {}, {}
+        for path in sorted(Path(self.keys_dir).glob("*.pem")):
+            is_public = path.name.endswith(".pub.pem")
+            kid = path.name[: -len(".pub.pem")] if is_public else path.stem
+            key = jwk.construct(path.read_text(), self.algorithm)
+            if is_public:
+                verifying.setdefault(kid, key)
+            else:
+                private_keys[kid] = key
+                verifying[kid] = key.public_key()
+
+        if not private_keys:
+            raise ValueError(f"No private signing keys found in {self.keys_dir}")
+        active_kid = self.active_kid or max(private_keys)
+        if active_kid not in private_keys:
+            raise ValueError(f"No private key for the active kid {active_kid}")
+
+        jwks = {"keys": []}
+        for kid, key in verifying.items():
+            entry = key.to_dict()
+            entry.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            jwks["keys"].append(entry)
+
+        with self._lock:
+            self._signing = (active_kid, private_keys[active_kid])
+            self._verifying = verifying
+            self._jwks = jwks
+
+    def _ensure_loaded(self):
+        if self._signing is None:
+            self.load()
+
+    def signing_key(self):
+        """
+        Returns the key new tokens are signed with.
+
+        Returns:
+            tuple: The kid to put in the token header (None for HS256) and the key.
+        """
+        self._ensure_loaded()
+        return self._signing
+
+    def verification_key(self, kid):
+        """
+        Returns the key that verifies tokens carrying the given kid.
+
+        Args:
+            kid (str): The kid from the token header, or None.
+
+        Returns:
+            The verification key.
+
+        Raises:
+            JWTError: If the kid is not a string, or no key with that kid is known.
+        """
+        self._ensure_loaded()
+        # The kid comes from the unverified header, which may hold any JSON value.
+        if kid is not None and not isinstance(kid, str):
+            raise JWTError("Invalid signing key id")
+        if not self.is_asymmetric:
+            return self.secret
+        try:
+            return self._verifying[kid]
+        except KeyError:
+            raise JWTError(f"Unknown signing key: {kid}")
+
+    def jwks(self) -> dict:
+        """
+        Returns the public keys as a JSON Web Key Set.
+
+        Returns:
+            dict: A JWKS document; empty when tokens are signed with the shared secret.
+        """
+        self._ensure_loaded()
+        return self._jwks
+
+
+def _keys_dir_state(keys_dir: str) -> list:
+    return sorted((path.name, path.stat().st_mtime_ns) for path in Path(keys_dir).glob("*.pem"))
+
+
+async def watch_keys_dir(key_ring: KeyRing, interval: float = JWT_KEYS_RELOAD_SECONDS):
+    """
+    Reloads the keys of a key ring whenever its key directory changes, until cancelled.
+
+    Args:
+        key_ring (KeyRing): The key ring to update, e.g. `auth.key_ring`.
+        interval (float): Seconds between checks of the keys' names and modification times.
+
+    Workers thus verify tokens signed with a key added to the directory, and
+    publish it, without being restarted. A directory that cannot be loaded, e.g.
+    with a key still being written, is logged and the keys left as they were, until
+    the directory changes again.
+    """
+    state = _keys_dir_state(key_ring.keys_dir)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            current = _keys_dir_state(key_ring.keys_dir)
+            if current == state:
+                continue
+            state = current
+            key_ring.load()
+            logger.info("Loaded the signing keys from %s", key_ring.keys_dir)
+        except (OSError, ValueError, JOSEError):
+            logger.exception("Failed to load the signing keys from %s", key_ring.keys_dir)
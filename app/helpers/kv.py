@@ -0,0 +1,311 @@
+# kv.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Store shared by the workers, e.g. redis://localhost:6379/0. When unset, each
+# worker keeps its own in-memory store, which is enough for a single worker.
+KV_URL = os.getenv("KV_URL")
+# Prefix of every key written to a shared store.
+KV_PREFIX = os.getenv("KV_PREFIX", "auth:")
+# Maximum number of keys held by the in-memory store.
+KV_MEMORY_MAX_KEYS = int(os.getenv("KV_MEMORY_MAX_KEYS", 100_000))
+
+
+class KeyValueStore:
+    """
+    Interface of the small key-value stores backing rate limits and other short-lived state.
+
+    Values are bytes and every key expires after a time to live. Each operation is
+    atomic, so several workers can share one store. `compare_and_set` is the
+    building block for read-modify-write updates; token buckets, whose keys may be
+    shared by every request, are updated by `take_tokens` in a single operation.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Returns the value of a key, or None if it is absent or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        """Stores a value for `ttl` seconds."""
+        raise NotImplementedError
+
+    async def pop(self, key: str) -> Optional[bytes]:
+        """Deletes a key and returns its value, so only one caller can get it."""
+        raise NotImplementedError
+
+    async def incr(self, key: str, ttl: float) -> int:
+        """
+        Increments a counter and returns its new value.
+
+        A counter created by the call expires after `ttl` seconds. Incrementing an
+        existing counter keeps its expiry.
+        """
+        raise NotImplementedError
+
+    async def compare_and_set(
+        self, key: str, expected: Optional[bytes], value: Optional[bytes], ttl: float
+    ) -> bool:
+        """
+        Stores a value only if the key still holds `expected`.
+
+        Args:
+            key (str): The key.
+            expected (bytes, optional): The value read before, None if the key was absent.
+            value (bytes, optional): The new value, or None to delete the key.
+            ttl (float): Time to live of the new value, in seconds.
+
+        Returns:
+            bool: True if the value was stored, False if another writer got there first.
+        """
+        raise NotImplementedError
+
+    async def take_tokens(
+        self, key: str, cost: float, rate: float, burst: float, now: float
+    ) -> float:
+        """
+        Takes tokens from the token bucket stored at a key, see `take_tokens`.
+
+        Args:
+            key (str): The key.
+            cost (float): Number of tokens taken.
+            rate (float): Tokens added back per second.
+            burst (float): Tokens held by a full bucket.
+            now (float): The current time, in seconds.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until the bucket
+            holds enough of them.
+        """
+        raise NotImplementedError
+
+
+def take_tokens(value: Optional[bytes], cost: float, rate: float, burst: float, now: float):
+    """
+    Refills a token bucket and takes tokens from it.
+
+    Args:
+        value (bytes, optional): The bucket, `<tokens>:<updated>`, or None for a full one.
+        cost (float): Number of tokens taken.
+        rate (float): Tokens added back per second.
+        burst (float): Tokens held by a full bucket.
+        now (float): The current time, in seconds.
+
+    Returns:
+        tuple: The seconds to wait, 0 if the tokens were taken, and the new value
+        with its time to live, or (None, None) when nothing is taken. An untouched
+        bucket expires once it would be full again, so an absent key is a full bucket.
+    """
+    tokens = burst
+    if value is not None:
+        stored_tokens, updated = value.split(b":")
+        elapsed = max(0.0, now - float(updated))
+        tokens = min(burst, float(stored_tokens) + elapsed * rate)
+    if tokens < cost:
+        return (cost - tokens) / rate, None, None
+    tokens -= cost
+    return 0.0, f"{tokens!r}:{now!r}".encode(), (burst - tokens) / rate + 1
+
+
+class MemoryKeyValueStore(KeyValueStore):
+    """
+    Key-value store held in the memory of the current process.
+
+    Attributes:
+        maxsize (int): Maximum number of keys; the oldest written key is evicted first.
+
+    It stands in for a shared store in tests and single-worker deployments.
+    """
+
+    def __init__(self, maxsize: int = KV_MEMORY_MAX_KEYS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def _set(self, key: str, value: bytes, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._set(key, value, self._clock() + ttl)
+
+    async def pop(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._get(key)
+            self._entries.pop(key, None)
+            return value
+
+    async def incr(self, key: str, ttl: float) -> int:
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                count, expires_at = 1, self._clock() + ttl
+            else:
+                count, expires_at = int(value) + 1, self._entries[key][0]
+            self._set(key, str(count).encode(), expires_at)
+            return count
+
+    async def compare_and_set(
+        self, key: str, expected: Optional[bytes], value: Optional[bytes], ttl: float
+    ) -> bool:
+        with self._lock:
+            if self._get(key) != expected:
+                return False
+            if value is None:
+                self._entries.pop(key, None)
+            else:
+                self._set(key, value, self._clock() + ttl)
+            return True
+
+    async def take_tokens(
+        self, key: str, cost: float, rate: float, burst: float, now: float
+    ) -> float:
+        with self._lock:
+            wait, value, ttl = take_tokens(self._get(key), cost, rate, burst, now)
+            if value is not None:
+                self._set(key, value, self._clock() + ttl)
+            return wait
+
+
+# The Lua version of `take_tokens`, run by Redis as one atomic command. Numbers are
+# returned as strings, since Redis truncates Lua numbers to integers.
+TAKE_TOKENS_SCRIPT = """
+local cost, rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens = burst
+local value = redis.call('GET', KEYS[1])
+if value then
+    local separator = string.find(value, ':', 1, true)
+    local stored = tonumber(string.sub(value, 1, separator - 1))
+    local updated = tonumber(string.sub(value, separator + 1))
+    tokens = math.min(burst, stored + math.max(0, now - updated) * rate)
+end
+if tokens < cost then
+    return tostring((cost - tokens) / rate)
+end
+tokens = tokens - cost
+local ttl = math.max(1, math.floor(((burst - tokens) / rate + 1) * 1000))
+redis.call('SET', KEYS[1], string.format('%.17g:%.17g', tokens, now), 'PX', ttl)
+return '0'
+"""
+
+
+class RedisKeyValueStore(KeyValueStore):
+    """
+    Key-value store shared by every worker through Redis.
+
+    Attributes:
+        prefix (str): Prefix added to every key.
+
+    Requires the `redis` package, which is only imported when this store is used.
+    Updates run in MULTI transactions, `compare_and_set` uses WATCH and
+    `take_tokens` a Lua script, so any server speaking the Redis protocol with
+    scripting, such as Valkey or KeyDB, works as well.
+    """
+
+    def __init__(self, url: str, prefix: str = KV_PREFIX):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("KV_URL points to Redis, but the redis package is not installed")
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._watch_error = redis.WatchError
+        # Sent with EVALSHA, and loaded again by the client if the server lost it.
+        self._take_tokens = self._redis.register_script(TAKE_TOKENS_SCRIPT)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._redis.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    async def pop(self, key: str) -> Optional[bytes]:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.get(self.prefix + key)
+            pipe.delete(self.prefix + key)
+            value, _ = await pipe.execute()
+        return value
+
+    async def incr(self, key: str, ttl: float) -> int:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            # Creates the counter with its expiry only if it does not exist yet.
+            pipe.set(self.prefix + key, 0, px=max(1, int(ttl * 1000)), nx=True)
+            pipe.incr(self.prefix + key)
+            _, count = await pipe.execute()
+        return count
+
+    async def compare_and_set(
+        self, key: str, expected: Optional[bytes], value: Optional[bytes], ttl: float
+    ) -> bool:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self.prefix + key)
+                if await pipe.get(self.prefix + key) != expected:
+                    return False
+                pipe.multi()
+                if value is None:
+                    pipe.delete(self.prefix + key)
+                else:
+                    pipe.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+                await pipe.execute()
+                return True
+            except self._watch_error:
+                return False
+
+    async def take_tokens(
+        self, key: str, cost: float, rate: float, burst: float, now: float
+    ) -> float:
+        wait = await self._take_tokens(
+            keys=[self.prefix + key], args=[repr(cost), repr(rate), repr(burst), repr(now)]
+        )
+        return float(wait)
+
+
+def open_store(url: Optional[str]) -> KeyValueStore:
+    """
+    Opens the key-value store at a URL.
+
+    Args:
+        url (str, optional): A redis:// or rediss:// URL, or None for an in-memory store.
+
+    Returns:
+        KeyValueStore: The store.
+
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    """
+    if not url or url.startswith("memory:"):
+        return MemoryKeyValueStore()
+    if url.startswith(("redis:", "rediss:", "unix:")):
+        return RedisKeyValueStore(url)
+    raise ValueError(f"Unsupported KV_URL: {url}")
+
+
+kv_store = open_store(KV_URL)
@@ -0,0 +1,184 @@
+# metrics.py
+
+import threading
+from bisect import bisect_left
+
+# Default histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Every metric created through this module, in registration order.
+REGISTRY = []
+
+
+class Counter:
+    """
+    A monotonically increasing value.
+
+    Attributes:
+        name (str): The exported metric name.
+        description (str): The help text shown next to the metric.
+        value (float): The current total.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Gauge:
+    """
+    A value that can go up and down.
+
+    Attributes:
+        name (str): The exported metric name.
+        description (str): The help text shown next to the metric.
+        callback (callable, optional): When set, the gauge reads its value from
+            this function at export time instead of storing one.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, callback=None):
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> float:
+        if self.callback is not None:
+            return float(self.callback())
+        return self._value
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets.
+
+    Attributes:
+        name (str): The exported metric name.
+        description (str): The help text shown next to the metric.
+        buckets (tuple): Upper bounds of the buckets, in ascending order.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{le="{bound}"}}', cumulative))
+        samples.append((f'{self.name}_bucket{{le="+Inf"}}', self.count))
+        samples.append((f"{self.name}_sum", self.sum))
+        samples.append((f"{self.name}_count", self.count))
+        return samples
+
+
+def counter(name: str, description: str) -> Counter:
+    """
+    Creates and registers a counter.
+
+    Args:
+        name (str): The exported metric name.
+        description (str): The help text shown next to the metric.
+
+    Returns:
+        Counter: The registered counter.
+    """
+    metric = Counter(name, description)
+    REGISTRY.append(metric)
+    return metric
+
+
+def gauge(name: str, description: str, callback=None) -> Gauge:
+    """
+    Creates and registers a gauge.
+
+    Args:
+        name (str): The exported metric name.
+        description (str): The help text shown next to the metric.
+        callback (callable, optional): Function returning the current value.
+
+    Returns:
+        Gauge: The registered gauge.
+    """
+    metric = Gauge(name, description, callback)
+    REGISTRY.append(metric)
+    return metric
+
+
+def histogram(name: str, description: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    """
+    Creates and registers a histogram.
+
+    Args:
+        name (str): The exported metric name.
+        description (str): The help text shown next to the metric.
+        buckets (tuple, optional): Upper bounds of the buckets, in seconds.
+
+    Returns:
+        Histogram: The registered histogram.
+    """
+    metric = Histogram(name, description, buckets)
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    """
+    Renders every registered metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics of this worker process, one sample per line.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for sample_name, value in metric.samples():
+            lines.append(f"{sample_name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,105 @@
+# ndjson.py
+
+import json
+
+from starlette.responses import StreamingResponse
+
+
+class NDJSONError(ValueError):
+    """Raised when a newline-delimited JSON body is malformed or too large."""
+
+
+def dumps(value) -> bytes:
+    """
+    Encodes one newline-delimited JSON line.
+
+    Args:
+        value: A JSON-serializable value.
+
+    Returns:
+        bytes: The compact JSON encoding followed by a newline.
+    """
+    return json.dumps(value, separators=(",", ":")).encode() + b"\n"
+
+
+async def split_lines(chunks, max_line_bytes: int = 4096):
+    """
+    Splits a body into lines as it arrives.
+
+    Args:
+        chunks: Async iterable of body chunks, such as `Request.stream()`.
+        max_line_bytes (int): Longest line accepted, bounding the memory held per line.
+
+    Yields:
+        bytes: Each line, without its newline, including empty ones.
+
+    Raises:
+        NDJSONError: If a line is too long.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > max_line_bytes:
+            raise NDJSONError(f"Line longer than {max_line_bytes} bytes")
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise NDJSONError(f"Line longer than {max_line_bytes} bytes")
+            yield line
+    if buffer:
+        yield buffer
+
+
+def loads(line: bytes):
+    """
+    Decodes one newline-delimited JSON line.
+
+    Args:
+        line (bytes): The line.
+
+    Returns:
+        The decoded value.
+
+    Raises:
+        NDJSONError: If the line is not valid JSON.
+    """
+    try:
+        return json.loads(line)
+    except ValueError:
+        raise NDJSONError("Line is not valid JSON")
+
+
+async def read_lines(chunks, max_line_bytes: int = 4096):
+    """
+    Parses a newline-delimited JSON body as it arrives.
+
+    Args:
+        chunks: Async iterable of body chunks, such as `Request.stream()`.
+        max_line_bytes (int): Longest line accepted, bounding the memory held per line.
+
+    Yields:
+        The decoded value of each non-empty line.
+
+    Raises:
+        NDJSONError: If a line is too long or is not valid JSON.
+    """
+    async for line in split_lines(chunks, max_line_bytes):
+        if line.strip():
+            yield loads(line)
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Newline-delimited JSON response streamed while the request body is still being read.
+
+    StreamingResponse watches for client disconnects by reading from `receive`, which
+    would swallow the request body its own body iterator consumes. This response
+    leaves `receive` to the iterator, where a disconnect surfaces as ClientDisconnect.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,214 @@
+# rate_limit.py
+
+import hashlib
+import json
+import math
+import os
+import time
+
+from dotenv import load_dotenv
+
+from .auth import hash_executor
+from .kv import KeyValueStore, kv_store
+from .metrics import counter
+
+load_dotenv()
+
+# Endpoints doing a password hash per request, which the middleware protects.
+RATE_LIMITED_PATHS = ("/login", "/signup")
+# Token buckets: requests per second added back to each bucket, and the burst a full
+# bucket allows. A rate of 0 disables the bucket.
+RATE_LIMIT_IP_RATE = float(os.getenv("RATE_LIMIT_IP_RATE", 5))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", 20))
+RATE_LIMIT_EMAIL_RATE = float(os.getenv("RATE_LIMIT_EMAIL_RATE", 1 / 6))
+RATE_LIMIT_EMAIL_BURST = float(os.getenv("RATE_LIMIT_EMAIL_BURST", 5))
+RATE_LIMIT_GLOBAL_RATE = float(os.getenv("RATE_LIMIT_GLOBAL_RATE", 100))
+RATE_LIMIT_GLOBAL_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_BURST", 200))
+# Requests are shed with 503 while this many hashing jobs are in flight, before their
+# body is read or the database is queried.
+RATE_LIMIT_SHED_QUEUE_DEPTH = int(
+    os.getenv("RATE_LIMIT_SHED_QUEUE_DEPTH", hash_executor.capacity)
+)
+# Largest body read to find the email of a request.
+RATE_LIMIT_MAX_BODY_BYTES = 16384
+
+LOAD_SHED = counter(
+    "auth_load_shed_total",
+    "Requests rejected because the password hashing queue was too deep.",
+)
+RATE_LIMITED = {
+    name: counter(
+        f"auth_rate_limited_{name}_total", f"Requests rejected by the {name} rate limit."
+    )
+    for name in ("ip", "email", "global")
+}
+
+
+class TokenBucket:
+    """
+    Token bucket rate limit, kept in a key-value store.
+
+    Attributes:
+        name (str): Name of the limit, used in store keys.
+        rate (float): Tokens added back per second.
+        burst (float): Tokens held by a full bucket.
+
+    A bucket is stored as its token count and the time it was last updated, and is
+    refilled lazily when it is read, by `take_tokens` in app/helpers/kv.py.
+    Untouched buckets expire once they would be full again, so an absent key is a
+    full bucket. Rejections write nothing.
+    """
+
+    def __init__(
+        self, store: KeyValueStore, name: str, rate: float, burst: float, clock=time.time
+    ):
+        self.store = store
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+
+    async def take(self, key: str, cost: float = 1.0) -> float:
+        """
+        Takes tokens from a bucket.
+
+        Args:
+            key (str): The bucket, e.g. a client address.
+            cost (float): Number of tokens taken.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until the bucket
+            holds enough of them.
+        """
+        if self.rate <= 0:
+            return 0.0
+        # One atomic operation of the store, so concurrent requests never make each
+        # other retry, however hot the bucket.
+        return await self.store.take_tokens(
+            f"rate:{self.name}:{key}", cost, self.rate, self.burst, self._clock()
+        )
+
+
+async def _send_error(send, status: int, detail: str, retry_after: float = None):
+    # Written directly, so a rejection allocates no Response object.
+    body = json.dumps({"detail": detail}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if retry_after is not None:
+        headers.append((b"retry-after", str(max(1, math.ceil(retry_after))).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _email_key(body: bytes):
+    # The email is hashed so that addresses are not written to a shared store.
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(email, str) or not email:
+        return None
+    return hashlib.blake2b(email.strip().lower().encode(), digest_size=16).hexdigest()
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware rate limiting the endpoints that hash passwords.
+
+    Args:
+        app: The ASGI application.
+        store (KeyValueStore, optional): Where the buckets are kept, `kv_store` by default.
+            Pass a shared store to apply the limits across workers.
+        paths (tuple): The paths whose POST requests are limited.
+
+    Each request is checked in order of cost, before the application spends any
+    CPU on it:
+
+    1. Shed with 503 if the password hashing queue is deeper than
+       RATE_LIMIT_SHED_QUEUE_DEPTH, without reading anything.
+    2. The bucket of the client address.
+    3. The bucket of the email in the JSON body, which is read and replayed to the
+       application, so stuffing one account from many addresses is limited too.
+    4. The global bucket.
+
+    Rejections answer 429 with Retry-After set to when the bucket has a token again.
+    Requests to other paths, such as /auth/verify, pass through untouched. The
+    client address is the ASGI `client`; behind a proxy, run uvicorn with
+    --proxy-headers so it is taken from X-Forwarded-For.
+    """
+
+    def __init__(self, app, store: KeyValueStore = None, paths: tuple = RATE_LIMITED_PATHS):
+        store = store or kv_store
+        self.app = app
+        self.paths = frozenset(paths)
+        self.ip_bucket = TokenBucket(store, "ip", RATE_LIMIT_IP_RATE, RATE_LIMIT_IP_BURST)
+        self.email_bucket = TokenBucket(
+            store, "email", RATE_LIMIT_EMAIL_RATE, RATE_LIMIT_EMAIL_BURST
+        )
+        self.global_bucket = TokenBucket(
+            store, "global", RATE_LIMIT_GLOBAL_RATE, RATE_LIMIT_GLOBAL_BURST
+        )
+
+    async def _reject(self, send, bucket: str, retry_after: float):
+        RATE_LIMITED[bucket].inc()
+        await _send_error(send, 429, "Too many requests", retry_after)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if hash_executor.pending >= RATE_LIMIT_SHED_QUEUE_DEPTH:
+            LOAD_SHED.inc()
+            await _send_error(send, 503, "Service busy, please retry", 1)
+            return
+
+        client = scope.get("client")
+        retry_after = await self.ip_bucket.take(client[0] if client else "unknown")
+        if retry_after:
+            await self._reject(send, "ip", retry_after)
+            return
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > RATE_LIMIT_MAX_BODY_BYTES:
+                await _send_error(send, 413, "Request body too large")
+                return
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        email_key = _email_key(body)
+        if email_key is not None:
+            retry_after = await self.email_bucket.take(email_key)
+            if retry_after:
+                await self._reject(send, "email", retry_after)
+                return
+
+        retry_after = await self.global_bucket.take("all")
+        if retry_after:
+            await self._reject(send, "global", retry_after)
+            return
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
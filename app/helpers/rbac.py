@@ -0,0 +1,245 @@
+# rbac.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+
+from .auth import verify_and_decode
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Permissions, in the order of their bit in the `perms` token claim. Issued tokens
+# carry these bits, so permissions may only be appended, never reordered or removed.
+PERMISSIONS = (
+    "users:read",
+    "users:write",
+    "users:import",
+    "users:export",
+    "staffs:read",
+    "staffs:write",
+    "tokens:revoke",
+    "tokens:introspect",
+)
+PERMISSION_BITS = {name: 1 << bit for bit, name in enumerate(PERMISSIONS)}
+
+# Permissions granted by each role. "User", the role of self-registered accounts,
+# grants none.
+DEFAULT_ROLE_PERMISSIONS = {
+    "Admin": PERMISSIONS,
+    "Staff": ("users:read", "staffs:read"),
+    "User": (),
+}
+# Optional JSON file replacing the default table, e.g. {"Admin": ["users:read"]}.
+RBAC_ROLES_FILE = os.getenv("RBAC_ROLES_FILE")
+# Seconds between checks of RBAC_ROLES_FILE for changes, which are then loaded.
+RBAC_RELOAD_SECONDS = float(os.getenv("RBAC_RELOAD_SECONDS", 5))
+# Maximum number of distinct role combinations whose masks are cached.
+RBAC_CACHE_SIZE = 1024
+
+
+def permission_mask(permissions) -> int:
+    """
+    Compiles permission names into a bitmask.
+
+    Args:
+        permissions: Iterable of permission names from PERMISSIONS.
+
+    Returns:
+        int: The mask with the bit of each permission set.
+
+    Raises:
+        ValueError: If a permission is unknown.
+    """
+    mask = 0
+    for name in permissions:
+        try:
+            mask |= PERMISSION_BITS[name]
+        except KeyError:
+            raise ValueError(f"Unknown permission: {name}")
+    return mask
+
+
+class RoleTable:
+    """
+    The role to permission table, compiled to bitmasks.
+
+    Attributes:
+        version (str): Digest of the compiled table, the same in every worker running it.
+
+    Issued tokens carry the mask of their roles and the version it was compiled with.
+    While the table is unchanged, `granted` returns that mask as is. Tokens issued
+    under another version are recompiled from their roles, so a change to the table
+    applies to tokens already issued. Compiled role combinations are cached, and the
+    cache is cleared whenever the table is loaded, e.g. by `watch_roles_file`.
+    """
+
+    def __init__(self, role_permissions: dict):
+        self._lock = threading.Lock()
+        self.load(role_permissions)
+
+    def load(self, role_permissions: dict):
+        """
+        Replaces the table, invalidating every compiled mask.
+
+        Args:
+            role_permissions (dict): Permission names granted by each role.
+
+        Raises:
+            ValueError: If a permission is unknown.
+        """
+        masks = {role: permission_mask(names) for role, names in role_permissions.items()}
+        digest = hashlib.sha256(json.dumps(masks, sort_keys=True).encode()).hexdigest()
+        with self._lock:
+            # One attribute, so readers never pair a cache with the wrong table.
+            self._state = ({}, masks)
+            self.version = digest[:12]
+
+    def compile(self, roles) -> int:
+        """
+        Returns the mask of the permissions granted by any of the roles.
+
+        Args:
+            roles: The role names. Unknown roles grant nothing.
+
+        Returns:
+            int: The permission mask.
+        """
+        # A mask compiled while the table is reloaded goes to the cache of the
+        # table it was compiled from, which is then discarded.
+        compiled, masks = self._state
+        key = tuple(roles)
+        mask = compiled.get(key)
+        if mask is None:
+            mask = 0
+            for role in key:
+                mask |= masks.get(role, 0)
+            with self._lock:
+                if len(compiled) >= RBAC_CACHE_SIZE:
+                    compiled.clear()
+                compiled[key] = mask
+        return mask
+
+    def claims_for(self, roles) -> dict:
+        """
+        Returns the authorization claims of a token issued to a user with the roles.
+
+        Args:
+            roles: The user's role names.
+
+        Returns:
+            dict: The `roles`, `perms` mask and `pv` table version claims.
+        """
+        return {"roles": list(roles), "perms": self.compile(roles), "pv": self.version}
+
+    def granted(self, claims: dict) -> int:
+        """
+        Returns the permission mask of a verified token.
+
+        Args:
+            claims (dict): The token claims.
+
+        Returns:
+            int: The permission mask.
+        """
+        if claims.get("pv") == self.version:
+            return claims.get("perms", 0)
+        return self.compile(claims.get("roles", ()))
+
+
+def _load_role_permissions(path: str = RBAC_ROLES_FILE) -> dict:
+    if path:
+        with open(path) as roles_file:
+            return json.load(roles_file)
+    return DEFAULT_ROLE_PERMISSIONS
+
+
+role_table = RoleTable(_load_role_permissions())
+
+
+async def watch_roles_file(table: RoleTable, path: str, interval: float = RBAC_RELOAD_SECONDS):
+    """
+    Loads a roles file into a role table whenever it changes, until cancelled.
+
+    Args:
+        table (RoleTable): The table to update, e.g. `role_table`.
+        path (str): The JSON roles file, e.g. RBAC_ROLES_FILE.
+        interval (float): Seconds between checks of the file's modification time.
+
+    A file that cannot be read or holds an unknown permission is logged and the
+    table left as it was, until the file changes again.
+    """
+    modified = os.stat(path).st_mtime_ns
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            current = os.stat(path).st_mtime_ns
+            if current == modified:
+                continue
+            modified = current
+            table.load(_load_role_permissions(path))
+            logger.info("Loaded the role table %s from %s", table.version, path)
+        except (OSError, ValueError):
+            logger.exception("Failed to load the roles file %s", path)
+
+
+bearer = HTTPBearer(auto_error=False)
+
+
+async def current_claims(credentials: HTTPAuthorizationCredentials = Depends(bearer)) -> dict:
+    """
+    Dependency returning the claims of the request's bearer token.
+
+    Raises:
+        HTTPException: 401 if the token is missing, invalid, expired or revoked.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        return verify_and_decode(credentials.credentials)
+    except JWTError:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        )
+
+
+def require_permission(*permissions: str):
+    """
+    Builds a dependency authorizing requests whose token grants every permission.
+
+    Args:
+        *permissions (str): Permission names from PERMISSIONS.
+
+    Returns:
+        The dependency, which returns the token claims.
+
+    Raises:
+        ValueError: If a permission is unknown, when the route is declared.
+
+    The required mask is compiled once, here, so each request costs one bitmask
+    test against its token, and no database access.
+
+    Example:
+        @router.get("/users", dependencies=[Depends(require_permission("users:read"))])
+    """
+    required = permission_mask(permissions)
+
+    async def dependency(claims: dict = Depends(current_claims)) -> dict:
+        if role_table.granted(claims) & required != required:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        return claims
+
+    return dependency
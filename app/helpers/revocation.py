@@ -0,0 +1,132 @@
+# revocation.py
+
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from .bloom import BloomFilter
+from .metrics import counter, gauge
+
+load_dotenv()
+
+# Configuration for the in-process revocation list.
+# Revoked tokens the Bloom filter is sized for. It is rebuilt larger on the next
+# full reload when more tokens are revoked.
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 1_000_000))
+# False positive rate of the Bloom filter at capacity. False positives only cost
+# a lookup in the exact set.
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+
+
+class RevocationList:
+    """
+    The revoked, unexpired tokens known to this worker, keyed by their `jti` claim.
+
+    Attributes:
+        capacity (int): Minimum number of tokens the Bloom filter is sized for.
+        error_rate (float): False positive rate of the Bloom filter at capacity.
+        watermark (datetime): Latest revocation time loaded from the database, or None.
+        false_positives (int): Bloom filter hits that were not revoked tokens.
+
+    Lookups go through a Bloom filter first, which answers most of them, the tokens
+    that were never revoked, from a few bit tests. Only its hits are checked against
+    the exact set of revoked tokens. Neither forgets tokens, so `replace` rebuilds
+    both from the database periodically, dropping expired ones.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.watermark = None
+        self.false_positives = 0
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, jti: str, expires_at: float):
+        """
+        Marks a token as revoked.
+
+        Args:
+            jti (str): The `jti` claim of the token.
+            expires_at (float): Unix time at which the token expires.
+        """
+        with self._lock:
+            if jti not in self._revoked:
+                self._bloom.add(jti)
+            self._revoked[jti] = expires_at
+
+    def update(self, entries, watermark=None):
+        """
+        Adds revoked tokens loaded since the last refresh.
+
+        Args:
+            entries: Iterable of (jti, expires_at) pairs.
+            watermark (datetime, optional): Latest revocation time among the entries.
+        """
+        for jti, expires_at in entries:
+            self.add(jti, expires_at)
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+
+    def replace(self, entries, watermark=None):
+        """
+        Replaces every revoked token, rebuilding the Bloom filter.
+
+        Args:
+            entries: Iterable of (jti, expires_at) pairs of all unexpired revoked tokens.
+            watermark (datetime, optional): Latest revocation time among the entries.
+
+        The filter is sized for twice the loaded tokens when they outgrow the capacity,
+        and swapped in at once, so lookups never see a partially built list.
+        """
+        revoked = dict(entries)
+        now = time.time()
+        bloom = BloomFilter(max(self.capacity, 2 * len(revoked)), self.error_rate)
+        for jti in revoked:
+            bloom.add(jti)
+        with self._lock:
+            # Keep tokens revoked by this worker while the entries were loaded.
+            for jti, expires_at in self._revoked.items():
+                if jti not in revoked and expires_at > now:
+                    revoked[jti] = expires_at
+                    bloom.add(jti)
+            self._bloom, self._revoked = bloom, revoked
+        self.watermark = watermark
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        Checks whether a token was revoked.
+
+        Args:
+            jti (str): The `jti` claim of the token, or None for tokens without one.
+
+        Returns:
+            bool: True if the token was revoked.
+        """
+        if jti is None or jti not in self._bloom:
+            return False
+        if jti in self._revoked:
+            return True
+        self.false_positives += 1
+        revocation_false_positives_total.inc()
+        return False
+
+
+revocation_false_positives_total = counter(
+    "auth_revocation_bloom_false_positives_total",
+    "Revocation checks the Bloom filter passed on to the exact set without a match.",
+)
+
+revocation_list = RevocationList(REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE)
+
+revoked_tokens = gauge(
+    "auth_revoked_tokens",
+    "Unexpired revoked tokens known to this worker.",
+    callback=lambda: len(revocation_list),
+)
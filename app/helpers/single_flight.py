@@ -0,0 +1,154 @@
+# single_flight.py
+
+import asyncio
+import threading
+
+from .metrics import counter
+
+
+class _Call:
+    """An in-flight call of a synchronous function, waited on by other threads."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one.
+
+    Attributes:
+        calls (int): Number of calls that ran their function.
+        collapsed (int): Number of calls that waited for another one's result instead.
+
+    The first caller for a key runs the function, and callers arriving with the same
+    key before it finishes get its result, or its exception, without running it
+    again. Nothing is remembered afterwards; caching results is left to the caller.
+    Coroutines use `do` and threads use `call`. The two never share a flight, and
+    coroutines only share flights with others running on the same event loop.
+
+    When a name is given, the counts are also exported as the
+    `<name>_single_flight_calls_total` and `<name>_single_flight_collapsed_total`
+    metrics.
+    """
+
+    def __init__(self, name: str = None):
+        self.calls = 0
+        self.collapsed = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._calls_counter = self._collapsed_counter = None
+        if name:
+            self._calls_counter = counter(
+                f"{name}_single_flight_calls_total", f"{name} lookups that ran a query."
+            )
+            self._collapsed_counter = counter(
+                f"{name}_single_flight_collapsed_total",
+                f"{name} lookups answered by a concurrent identical lookup.",
+            )
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _join(self, key, create):
+        """Returns the flight of a key and whether the caller leads it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = create()
+                self.calls += 1
+            else:
+                self.collapsed += 1
+        metric = self._calls_counter if leader else self._collapsed_counter
+        if metric:
+            metric.inc()
+        return flight, leader
+
+    def _leave(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def forget(self, key):
+        """
+        Lets calls with a key start a new flight instead of joining the one in progress.
+
+        Args:
+            key: The key of the calls, e.g. of a record that was just written, whose
+                in-flight read may have missed the write.
+        """
+        with self._lock:
+            for flight_key in [k for k in self._flights if k[1] == key]:
+                del self._flights[flight_key]
+
+    async def do(self, key, fn):
+        """
+        Awaits `fn()`, unless an identical call is already in flight.
+
+        Args:
+            key: Hashable identity of the call, such as ("email", "a@example.com").
+            fn (callable): Function returning the awaitable to run.
+
+        Returns:
+            The result of the call.
+
+        If the caller running the function is cancelled, for instance because its
+        client disconnected, the callers waiting for it start a new flight instead
+        of being cancelled too.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            future, leader = self._join((loop, key), loop.create_future)
+            if not leader:
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        # The leader was cancelled; retry in its place.
+                        continue
+                    raise
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self._leave((loop, key), future)
+                future.cancel()
+                raise
+            except BaseException as error:
+                self._leave((loop, key), future)
+                future.set_exception(error)
+                # Retrieved, so that an exception nobody else waited for is not logged.
+                future.exception()
+                raise
+            self._leave((loop, key), future)
+            future.set_result(result)
+            return result
+
+    def call(self, key, fn):
+        """
+        Calls `fn()` from a thread, unless an identical call is already in flight.
+
+        Args:
+            key: Hashable identity of the call.
+            fn (callable): The function to call.
+
+        Returns:
+            The result of the call.
+        """
+        flight, leader = self._join(("thread", key), _Call)
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            self._leave(("thread", key), flight)
+            flight.done.set()
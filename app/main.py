@@ -1,40 +1,61 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi.openapi.docs import get_swagger_ui_html
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+from app.config import database
+from app.config.database import DATABASE_REPLICA_CHECK_SECONDS, DB_POOL_PREWARM
+from app.config.settings import Settings
 from app.models.admin_model import Base
-from app.config.database import engine
+from app.helpers import auth
+from app.helpers.auth import HashQueueFull
+from app.helpers.keys import watch_keys_dir
+from app.helpers.rbac import RBAC_ROLES_FILE, role_table, watch_roles_file
+from app.helpers.rate_limit import RateLimitMiddleware
+from app.controllers.import_controller import shutdown_hash_pool
+from app.controllers.token_controller import load_revocations, refresh_revocations
+from app.helpers.access_code import sweep_access_codes
 
 # routers
 from app.routes.admin_routes import router as admin_router
-from app.routes.staff_routes import router as staff_routes
-
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-
-app = FastAPI()
+from app.routes.metrics_routes import router as metrics_router
+from app.routes.token_routes import router as token_router
+from app.routes.forward_auth import FORWARD_AUTH_METHODS, forward_auth
 
+logger = logging.getLogger(__name__)
 
-# setup seeds
-from app.seeds.seed_admin import user_seed_data
-# user_seed_data()
 
-# setup migrations
-
-# Mount the directory containing the YAML file as a static directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-@app.get("/", tags=["Base"])
 async def hello_world():
     """
     Base endpoint returning a Hello World message.
     This function responds to the root URL and is typically used to verify
     that the service is operational.
-    
+
     Returns:
         dict: A message saying "We're live"
     """
     return {"message": "We're live 🎉 🚀 😍"}
 
-@app.get("/docs/", include_in_schema=False)
+
+async def ready(request: Request):
+    """
+    Readiness probe.
+
+    Returns:
+        JSONResponse: 200 once startup has prewarmed the worker, 503 while it is
+        shutting down, so load balancers stop sending it requests.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True}
+
+
 async def custom_swagger_ui():
     return get_swagger_ui_html(
         openapi_url="/static/swagger.yaml",  # Path to your YAML file
@@ -44,21 +65,142 @@ async def custom_swagger_ui():
     )
 
 
-# Initialize the FastAPI app.
-# This object creates an ASGI application that can receive requests and
-# send responses.
-app = FastAPI()
+async def hash_queue_full_handler(request: Request, exc: HashQueueFull):
+    """
+    Answers requests that could not get a password hashing slot.
+
+    Returns:
+        JSONResponse: 503 with a Retry-After header, so clients back off instead of piling up.
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+async def prewarm_database():
+    """
+    Fills the database pools. A database that cannot be reached yet is logged
+    rather than fatal: sessions connect on demand once it is back.
+    """
+    try:
+        await database.prewarm_pools(DB_POOL_PREWARM)
+    except Exception:
+        logger.exception("Failed to prewarm the database pools")
+
+
+async def load_revocation_list():
+    """
+    Loads the revoked tokens before the worker serves requests, so a restarted
+    worker does not accept revoked tokens. If it fails, the background refresh
+    loads them on its next round.
+    """
+    try:
+        async with database.session_scope() as db:
+            await load_revocations(db, full=True)
+    except Exception:
+        logger.exception("Failed to load the revocation list")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepares a worker before it serves requests, and stops its background tasks and
+    password hashing workers after.
+
+    The engines are created here rather than at import. With prewarming enabled, the
+    database pools are filled, the signing keys loaded and the password hashing
+    workers started concurrently, so the first requests see no cold-start latency.
+    Misconfigured signing keys stop the worker here instead of failing every login.
+    """
+    settings = app.state.settings
+    await run_in_threadpool(database.init_engines)
+    if settings.create_tables:
+        await run_in_threadpool(Base.metadata.create_all, bind=database.engine)
+    if settings.prewarm:
+        await asyncio.gather(prewarm_database(), auth.prewarm())
+    await load_revocation_list()
+
+    tasks = []
+    if settings.background_tasks:
+        # Keeps the revoked tokens up to date, see app/helpers/revocation.py.
+        tasks.append(asyncio.create_task(refresh_revocations()))
+        # Deletes expired access codes, see app/helpers/access_code.py.
+        tasks.append(asyncio.create_task(sweep_access_codes()))
+        # Applies edits of the roles file, see app/helpers/rbac.py.
+        if RBAC_ROLES_FILE:
+            tasks.append(asyncio.create_task(watch_roles_file(role_table, RBAC_ROLES_FILE)))
+        # Applies keys added to or removed from JWT_KEYS_DIR, see app/helpers/keys.py.
+        if auth.key_ring.is_asymmetric and auth.key_ring.keys_dir:
+            tasks.append(asyncio.create_task(watch_keys_dir(auth.key_ring)))
+        # Checks the health and lag of the read replicas, see app/config/replicas.py.
+        if database.replicas is not None:
+            tasks.append(
+                asyncio.create_task(database.replicas.monitor(DATABASE_REPLICA_CHECK_SECONDS))
+            )
+
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        for task in tasks:
+            task.cancel()
+        # A task may still hold a connection until its cancellation is handled.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Stop the password hashing workers, which a reloaded or rebuilt
+        # application would otherwise leave running.
+        await run_in_threadpool(auth.hash_executor.shutdown)
+        await run_in_threadpool(shutdown_hash_pool)
+        await database.dispose_engines()
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Builds the application.
+
+    Args:
+        settings (Settings, optional): Startup options; by default from the environment.
+
+    Returns:
+        FastAPI: The application. Building it opens no connection, which is left
+        to its lifespan.
+    """
+    # Initialize the FastAPI app.
+    # This object creates an ASGI application that can receive requests and
+    # send responses.
+    app = FastAPI(lifespan=lifespan)
+    app.state.settings = settings or Settings()
+    app.state.ready = False
+
+    # Mount the directory containing the YAML file as a static directory
+    app.mount(
+        "/static", StaticFiles(directory=app.state.settings.static_directory), name="static"
+    )
+    app.add_api_route("/", hello_world, methods=["GET"], tags=["Base"])
+    app.add_api_route("/ready", ready, methods=["GET"], tags=["Base"])
+    app.add_api_route("/docs/", custom_swagger_ui, methods=["GET"], include_in_schema=False)
+
+    # Include routers.
+    # Routers in FastAPI are used to manage different endpoints. In this case, the user routes are included.
+    # This modular approach allows for easy maintenance and scaling of the
+    # application as routes are logically separated.
+    app.include_router(admin_router)
+    app.include_router(metrics_router)
+    app.include_router(token_router)
+    # The forward auth check bypasses FastAPI's request handling, see app/routes/forward_auth.py.
+    app.add_route(
+        "/auth/verify", forward_auth, methods=FORWARD_AUTH_METHODS, include_in_schema=False
+    )
+    # Rate limit /login and /signup before they reach bcrypt, see app/helpers/rate_limit.py.
+    app.add_middleware(RateLimitMiddleware)
+    app.add_exception_handler(HashQueueFull, hash_queue_full_handler)
+    return app
 
-# Create database tables.
-# It connects to the database using the engine from the database configuration and ensures all tables are created before the application starts.
-# It's crucial for initial setup and ensuring the database schema is ready.
-Base.metadata.create_all(bind=engine)
 
-# Include routers.
-# Routers in FastAPI are used to manage different endpoints. In this case, the user routes are included.
-# This modular approach allows for easy maintenance and scaling of the
-# application as routes are logically separated.
-app.include_router(admin_router)
+# The application served by `uvicorn app.main:app`.
+app = create_app()
 
 # Main entry point of the application when run as a standalone script.
 # The condition `if __name__ == "__main__"` makes sure the server is only run when this script is executed directly,
@@ -67,4 +209,4 @@ app.include_router(admin_router)
 # (host "0.0.0.0") and on port 8000, which are common default settings for web applications.
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -1,30 +1,86 @@
-from sqlalchemy import Column, String, DateTime
+import enum
+
+from sqlalchemy import JSON, Column, Enum, Index, String, DateTime, Uuid
 from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import ARRAY
 from app.helpers.uuid import generate_uuid
 from app.config.database import Base
 
 
+class AccountStatus(str, enum.Enum):
+    """
+    Verification state of an account.
+
+    Attributes:
+        PENDING: The account was created and its access code has not been used yet.
+        VERIFIED: The account was verified with its access code.
+    """
+
+    PENDING = "pending"
+    VERIFIED = "verified"
+
+
+# Role of accounts created through the public signup and of imported rows without
+# roles. It grants no permission; Admin is only given to provisioned accounts,
+# such as those of app/seeds/seed_admin.py.
+DEFAULT_USER_ROLE = "User"
+
+
+# Roles column shared by the users and staffs tables: a Postgres array, stored as
+# JSON on SQLite, which has no array type, so the tables can be created there.
+roles_type = ARRAY(String).with_variant(JSON(), "sqlite")
+
+# Native Postgres enum shared by the users and staffs tables, stored by value.
+account_status_enum = Enum(
+    AccountStatus,
+    name="account_status",
+    values_callable=lambda statuses: [status.value for status in statuses],
+)
+
+
 class User(Base):
     """
     User model representing the 'users' table in the database.
 
     Attributes:
-        id (String): Unique identifier for the user, generated using UUID.
-        email (String): Email address of the user, must be unique.
+        id (Uuid): Unique time-ordered identifier for the user.
+        email (String): Email address of the user, must be unique ignoring case.
         username (String): Username of the user, must be unique.
         hashed_password (String): Hashed password for the user.
+        account_status (AccountStatus): Whether the account is pending or verified.
         roles (ARRAY): List of roles assigned to the user.
         created_at (DateTime): Timestamp indicating when the user record was created.
         updated_at (DateTime): Timestamp indicating when the user record was last updated.
     """
 
     __tablename__ = "users"
-    id = Column(String, primary_key=True, default=generate_uuid)
-    email = Column(String, unique=True, nullable=False)
+    id = Column(Uuid, primary_key=True, default=generate_uuid)
+    email = Column(String, nullable=False)
     username = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    account_status = Column(String, nullable=False, default="pending")
-    roles = Column(ARRAY(String), default=lambda: ["Admin"])
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    account_status = Column(
+        account_status_enum, nullable=False, default=AccountStatus.PENDING
+    )
+    roles = Column(roles_type, default=lambda: [DEFAULT_USER_ROLE])
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Emails are looked up and kept unique by their lowercase form.
+        Index("ux_users_email_lower", func.lower(email), unique=True),
+        # Pending accounts are a small, frequently scanned subset of users.
+        Index(
+            "ix_users_pending_created_at",
+            created_at,
+            postgresql_where=account_status == AccountStatus.PENDING,
+            sqlite_where=account_status == AccountStatus.PENDING,
+        ),
+        # Exports and listings walk users in creation order, resuming after a
+        # (created_at, id) pair, optionally for one status.
+        Index("ix_users_created_at_id", created_at, id),
+        Index("ix_users_status_created_at_id", account_status, created_at, id),
+        # Listings filtered by role match `roles @> ARRAY[...]`.
+        Index("ix_users_roles", roles, postgresql_using="gin"),
+    )
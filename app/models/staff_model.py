@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, Index, String, DateTime, Uuid
 from sqlalchemy import func
-from sqlalchemy.dialects.postgresql import ARRAY
 from app.helpers.uuid import generate_uuid
 from app.config.database import Base
+from app.models.admin_model import AccountStatus, account_status_enum, roles_type
 
 
 class Staff(Base):
@@ -10,21 +10,33 @@ class Staff(Base):
     Staff model representing the 'staffs' table in the database.
 
     Attributes:
-        id (String): Unique identifier for the user, generated using UUID.
+        id (Uuid): Unique time-ordered identifier for the user.
         email (String): Email address of the user, must be unique.
         username (String): Username of the user, must be unique.
         hashed_password (String): Hashed password for the user.
+        account_status (AccountStatus): Whether the account is pending or verified.
         roles (ARRAY): List of roles assigned to the user.
         created_at (DateTime): Timestamp indicating when the user record was created.
         updated_at (DateTime): Timestamp indicating when the user record was last updated.
     """
 
     __tablename__ = "staffs"
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(Uuid, primary_key=True, default=generate_uuid)
     email = Column(String, unique=True, nullable=False)
     username = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    account_status = Column(String, nullable=False, default="pending")
-    roles = Column(ARRAY(String), default=lambda: ["Staff"])
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    account_status = Column(
+        account_status_enum, nullable=False, default=AccountStatus.PENDING
+    )
+    roles = Column(roles_type, default=lambda: ["Staff"])
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Listings walk staff in creation order, like users.
+        Index("ix_staffs_created_at_id", created_at, id),
+        Index("ix_staffs_status_created_at_id", account_status, created_at, id),
+        Index("ix_staffs_roles", roles, postgresql_using="gin"),
+    )
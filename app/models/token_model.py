@@ -0,0 +1,59 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, LargeBinary, Uuid
+from sqlalchemy import func
+from app.helpers.uuid import generate_uuid
+from app.config.database import Base
+
+
+class RevokedToken(Base):
+    """
+    RevokedToken model representing the 'revoked_tokens' table in the database.
+
+    Attributes:
+        jti (Uuid): The `jti` claim of the revoked token.
+        expires_at (DateTime): When the token expires; the row is useless afterwards.
+        revoked_at (DateTime): Timestamp indicating when the token was revoked.
+    """
+
+    __tablename__ = "revoked_tokens"
+    jti = Column(Uuid, primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # Workers poll for the tokens revoked since their last refresh.
+        Index("ix_revoked_tokens_revoked_at", revoked_at),
+    )
+
+
+class RefreshToken(Base):
+    """
+    RefreshToken model representing the 'refresh_tokens' table in the database.
+
+    Attributes:
+        id (Uuid): Unique time-ordered identifier for the refresh token record.
+        token_hash (LargeBinary): SHA-256 digest of the opaque token, which is never stored.
+        family_id (Uuid): Shared by a login's refresh token and all its rotated successors.
+        user_id (Uuid): Foreign key reference to the user the token was issued to.
+        created_at (DateTime): Timestamp indicating when the token was issued.
+        expires_at (DateTime): When the token stops being accepted.
+        used_at (DateTime): When the token was rotated, or None while it is current.
+        revoked_at (DateTime): When its family was revoked, or None.
+    """
+
+    __tablename__ = "refresh_tokens"
+    id = Column(Uuid, primary_key=True, default=generate_uuid)
+    token_hash = Column(LargeBinary, nullable=False)
+    family_id = Column(Uuid, nullable=False)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True))
+    revoked_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # Tokens are looked up by their hash, and successors are inserted with
+        # ON CONFLICT on it.
+        Index("ux_refresh_tokens_token_hash", token_hash, unique=True),
+        # Reuse of a rotated token revokes its whole family.
+        Index("ix_refresh_tokens_family_id", family_id),
+    )
@@ -1,10 +1,12 @@
 # app/routes/user_routes.py
 
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from ..schemas.admin_schema import UserLogin, Token
 from ..controllers.admin_controller import login_user
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from app.config.database import get_db
 from ..schemas.admin_schema import (
@@ -13,13 +15,29 @@ from ..schemas.admin_schema import (
     UserOut,
     UserVerify,
     UserExistQuery,
+    UsersExistQuery,
+    AccountPage,
 )
 from ..controllers.admin_controller import (
     create_user,
-    refresh_access_token,
     verify_user_account,
     check_user_exists,
+    check_users_exist,
+    stream_users_exist,
 )
+from ..controllers.export_controller import export_statement, stream_export
+from ..controllers.import_controller import stream_import
+from ..controllers.listing_controller import (
+    LIST_DEFAULT_LIMIT,
+    LIST_MAX_LIMIT,
+    account_statement,
+    list_accounts,
+)
+from ..helpers.ndjson import NDJSONStreamingResponse, read_lines
+from ..helpers.rbac import require_permission
+from ..controllers.token_controller import refresh_access_token
+from ..models.admin_model import AccountStatus, User
+from ..models.staff_model import Staff
 
 # Initialize the API router from FastAPI.
 # This router will handle all endpoints related to user operations.
@@ -44,14 +62,14 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     Raises:
         HTTPException: An exception with status code 400 if the email is already registered.
     """
-    result = create_user(db, user)
+    result = await create_user(db, user)
     if result is None:
         raise HTTPException(status_code=400, detail="Email already registered")
     return result
 
 
 @router.post("/verify-account")
-def verify_account(user_verify: UserVerify, db: Session = Depends(get_db)):
+async def verify_account(user_verify: UserVerify, db: Session = Depends(get_db)):
     """
     Endpoint for verifying a user's account.
 
@@ -64,7 +82,7 @@ def verify_account(user_verify: UserVerify, db: Session = Depends(get_db)):
     Returns:
         dict: A message indicating success or failure of the verification.
     """
-    if verify_user_account(db, user_verify):
+    if await verify_user_account(db, user_verify):
         return {"message": "Account successfully verified."}
     else:
         raise HTTPException(
@@ -73,7 +91,7 @@ def verify_account(user_verify: UserVerify, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(user_login: UserLogin, db: Session = Depends(get_db)):
+async def login(user_login: UserLogin, db: Session = Depends(get_db)):
     """
     Endpoint for user login.
 
@@ -84,7 +102,7 @@ def login(user_login: UserLogin, db: Session = Depends(get_db)):
     Returns:
         Token: The JWT token for the authenticated user.
     """
-    return login_user(db, user_login)
+    return await login_user(db, user_login)
 
 
 @router.get("/check-user-exists", response_model=dict)
@@ -104,20 +122,221 @@ async def check_user_exists_route(
     Returns:
         dict: A dictionary containing a 'valid_account' key with a boolean value.
     """
-    query = UserExistQuery(user_id=str(user_id))
-    return {"valid_account": check_user_exists(db, query)}
+    query = UserExistQuery(user_id=user_id, email=email)
+    return {"valid_account": await check_user_exists(db, query)}
+
+
+@router.post("/users/exists", response_model=dict)
+async def users_exist(query: UsersExistQuery, db: Session = Depends(get_db)):
+    """
+    Endpoint to check whether many users exist, by IDs and/or emails.
+
+    All keys are resolved by a single query.
+
+    Args:
+        query (UsersExistQuery): The IDs and emails to check, at most USERS_EXIST_MAX_KEYS.
+        db (Session): Database session.
+
+    Returns:
+        dict: 'ids' and 'emails' maps from each given key to whether a user has it.
+    """
+    return await check_users_exist(db, query)
+
+
+@router.post("/users/exists/stream")
+async def users_exist_stream(request: Request):
+    """
+    Endpoint to check whether many users exist, streaming newline-delimited JSON both ways.
+
+    The request body holds one {"id": ...} or {"email": ...} object per line. Each
+    key is answered with a {"id" or "email": ..., "exists": bool} line, in order,
+    while the rest of the body is still being read.
+
+    Args:
+        request (Request): The request, whose body is read as it arrives.
+
+    Returns:
+        NDJSONStreamingResponse: The results, one line per key.
+    """
+    return NDJSONStreamingResponse(stream_users_exist(read_lines(request.stream())))
+
+
+@router.post("/users/import", dependencies=[Depends(require_permission("users:import"))])
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(
+        None, pattern="^(csv|jsonl)$", description="csv or jsonl, by default from Content-Type"
+    ),
+):
+    """
+    Endpoint importing users in bulk from a CSV or JSONL body, for tenant migrations.
+
+    Each row has an email, a username, and either a plaintext `password` or an
+    existing bcrypt `hashed_password`, plus optional `roles` and `account_status`.
+    The body is imported in chunks while it is being read, so it is never held in
+    memory whole. Requires the users:import permission.
+
+    Args:
+        request (Request): The request, whose body is read as it arrives.
+        format (str, optional): The body format. Defaults to csv for a text/csv
+            Content-Type and to jsonl otherwise.
+
+    Returns:
+        NDJSONStreamingResponse: A line per rejected row, a progress line per chunk,
+        and a final line with the totals.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if content_type.startswith("text/csv") else "jsonl"
+    return NDJSONStreamingResponse(stream_import(request.stream(), format))
+
+
+async def _list(
+    db: Session,
+    model,
+    account_status: Optional[AccountStatus],
+    role: Optional[List[str]],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime],
+    after: Optional[str],
+    limit: int,
+) -> dict:
+    try:
+        statement = account_statement(
+            model, account_status, role, created_after, created_before, after
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return await list_accounts(db, statement, limit)
+
+
+@router.get(
+    "/users",
+    response_model=AccountPage,
+    dependencies=[Depends(require_permission("users:read"))],
+)
+async def list_users(
+    account_status: Optional[AccountStatus] = Query(None, description="The users' status"),
+    role: Optional[List[str]] = Query(None, description="Roles the users all have"),
+    created_after: Optional[datetime] = Query(None, description="Earliest creation time"),
+    created_before: Optional[datetime] = Query(None, description="End of the creation window"),
+    after: Optional[str] = Query(None, description="The `next` cursor of the previous page"),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """
+    Endpoint listing users for admin dashboards, oldest first.
+
+    Pages are sought from the `next` cursor of the previous one rather than
+    skipped with an offset, so every page takes the same time however deep it is.
+    Requires the users:read permission.
+
+    Args:
+        account_status (AccountStatus, optional): Only users with this status.
+        role (List[str], optional): Only users with every one of these roles.
+        created_after (datetime, optional): Only users created at or after this time.
+        created_before (datetime, optional): Only users created before this time.
+        after (str, optional): The cursor of the page to read; the first page if omitted.
+        limit (int): The page size, at most LIST_MAX_LIMIT.
+        db (Session): Database session.
+
+    Returns:
+        AccountPage: The users of the page and the cursor of the next one.
+
+    Raises:
+        HTTPException: An exception with status code 400 if the cursor is malformed.
+    """
+    return await _list(
+        db, User, account_status, role, created_after, created_before, after, limit
+    )
+
+
+@router.get(
+    "/staffs",
+    response_model=AccountPage,
+    dependencies=[Depends(require_permission("staffs:read"))],
+)
+async def list_staffs(
+    account_status: Optional[AccountStatus] = Query(None, description="The staff's status"),
+    role: Optional[List[str]] = Query(None, description="Roles the staff all have"),
+    created_after: Optional[datetime] = Query(None, description="Earliest creation time"),
+    created_before: Optional[datetime] = Query(None, description="End of the creation window"),
+    after: Optional[str] = Query(None, description="The `next` cursor of the previous page"),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """
+    Endpoint listing staff accounts for admin dashboards, oldest first.
+
+    Works like GET /users on the staffs table. Requires the staffs:read permission.
+
+    Returns:
+        AccountPage: The staff of the page and the cursor of the next one.
+    """
+    return await _list(
+        db, Staff, account_status, role, created_after, created_before, after, limit
+    )
+
+
+@router.get("/users/export", dependencies=[Depends(require_permission("users:export"))])
+async def export_users(
+    format: str = Query("jsonl", pattern="^(csv|jsonl)$", description="csv or jsonl"),
+    account_status: Optional[AccountStatus] = Query(None, description="The users' status"),
+    role: Optional[str] = Query(None, description="A role the users have"),
+    created_after: Optional[datetime] = Query(None, description="Earliest creation time"),
+    created_before: Optional[datetime] = Query(None, description="End of the creation window"),
+    after: Optional[str] = Query(None, description="The created_at,id of the last row received"),
+):
+    """
+    Endpoint exporting users as a stream, in creation order.
+
+    Rows are read from a server-side cursor and sent a batch at a time, so exports
+    of any size use constant memory. Each row carries the user's id, email,
+    username, account status, roles and creation time, but never its password
+    hash. Requires the users:export permission.
+
+    An interrupted export is resumed by passing the `created_at` and `id` of the
+    last row received, joined by a comma, as `after`, with the same filters.
+
+    Args:
+        format (str): jsonl for one JSON object per line, or csv with a header row,
+            in the format accepted by /users/import.
+        account_status (AccountStatus, optional): Only users with this status.
+        role (str, optional): Only users with this role.
+        created_after (datetime, optional): Only users created at or after this time.
+        created_before (datetime, optional): Only users created before this time.
+        after (str, optional): The cursor of the last row already received.
+
+    Returns:
+        StreamingResponse: The exported users.
+
+    Raises:
+        HTTPException: An exception with status code 400 if the cursor is malformed.
+    """
+    try:
+        statement = export_statement(
+            account_status, role, created_after, created_before, after
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(stream_export(statement, format), media_type=media_type)
 
 
-@router.post("/refresh-token", response_model=dict)
-def refresh_token(refresh_token: RefreshToken):
+@router.post("/refresh-token", response_model=Token)
+async def refresh_token(refresh_token: RefreshToken, db: Session = Depends(get_db)):
     """
     Endpoint for refreshing an access token.
 
+    The refresh token is rotated: the response carries its successor, which must be
+    used for the next refresh.
+
     Args:
         refresh_token (str): The refresh token provided in the request body.
+        db (Session): The database session dependency.
 
     Returns:
-        dict: Contains the new access token.
+        Token: The new access token and refresh token.
     """
     token = refresh_token.refresh_token
-    return refresh_access_token(token)
+    return await refresh_access_token(db, token)
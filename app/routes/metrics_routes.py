@@ -0,0 +1,24 @@
+# app/routes/metrics_routes.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..helpers.metrics import render
+
+# Initialize the API router from FastAPI.
+# This router exposes the in-process metrics of the worker it runs in.
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Endpoint exporting the service metrics.
+
+    Each worker process keeps its own metrics, so a scrape reflects the worker
+    that served it.
+
+    Returns:
+        str: The metrics in the Prometheus text exposition format.
+    """
+    return render()
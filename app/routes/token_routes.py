@@ -0,0 +1,83 @@
+# app/routes/token_routes.py
+
+import hashlib
+import json
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.orm import Session
+
+from app.config.database import get_db
+from ..controllers.token_controller import introspect_tokens, revoke_token
+from ..helpers import auth
+from ..helpers.keys import JWKS_MAX_AGE_SECONDS
+from ..helpers.rbac import require_permission
+from ..schemas.token_schema import TokenIntrospect, TokenIntrospectionOut, TokenRevoke
+
+# Initialize the API router from FastAPI.
+# This router handles the endpoints managing access tokens, and publishes the keys
+# other services use to verify them.
+router = APIRouter()
+
+
+@router.get("/.well-known/jwks.json", tags=["Tokens"])
+async def jwks(request: Request):
+    """
+    Endpoint publishing the token verification keys as a JSON Web Key Set.
+
+    Verifiers may cache the document for JWKS_MAX_AGE_SECONDS and revalidate it
+    with If-None-Match, which is answered with 304 while the keys are unchanged.
+
+    Returns:
+        Response: The JWKS document, or 304 Not Modified.
+    """
+    body = json.dumps(auth.key_ring.jwks(), separators=(",", ":"), sort_keys=True)
+    etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+    headers = {
+        "Cache-Control": f"public, max-age={JWKS_MAX_AGE_SECONDS}",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/tokens/revoke", tags=["Tokens"])
+async def revoke(body: TokenRevoke, db: Session = Depends(get_db)):
+    """
+    Endpoint for revoking an access token, e.g. on logout.
+
+    Any holder of a token may revoke it. As in RFC 7009, invalid or already revoked
+    tokens are not an error, since they cannot be used either way.
+
+    Args:
+        body (TokenRevoke): The token to revoke, received from the request body.
+        db (Session): The database session dependency.
+
+    Returns:
+        dict: Whether the token was revoked by this request.
+    """
+    return {"revoked": await revoke_token(db, body.token)}
+
+
+@router.post(
+    "/tokens/introspect",
+    response_model=TokenIntrospectionOut,
+    tags=["Tokens"],
+    dependencies=[Depends(require_permission("tokens:introspect"))],
+)
+async def introspect(body: TokenIntrospect, db: Session = Depends(get_db)):
+    """
+    Endpoint for checking many access tokens in one request, e.g. from a gateway.
+
+    As in RFC 7662, callers authenticate, here with a bearer token granting the
+    `tokens:introspect` permission, so account states are not disclosed to anyone.
+
+    Args:
+        body (TokenIntrospect): The tokens to check, at most INTROSPECT_MAX_TOKENS.
+        db (Session): The database session dependency.
+
+    Returns:
+        TokenIntrospectionOut: Validity, subject, roles, account status and expiry of
+        each token, in the order given.
+    """
+    return {"tokens": await introspect_tokens(db, body.tokens)}
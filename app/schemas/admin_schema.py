@@ -1,3 +1,7 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
 from pydantic import BaseModel, EmailStr
 
 
@@ -26,12 +30,12 @@ class UserOut(BaseModel):
     It is typically used when returning user details in response to various API requests.
 
     Attributes:
-        id (str): The unique identifier of the user, typically a UUID.
+        id (UUID): The unique identifier of the user.
         email (EmailStr): The email address of the user.
         username (str): The username of the user.
     """
 
-    id: str
+    id: UUID
     email: EmailStr
     username: str
     account_status: str
@@ -42,14 +46,16 @@ class Token(BaseModel):
     Schema for JWT access token.
 
     This schema defines the structure of a JWT access token, which is used for authentication
-    and authorization within the application.
+    and authorization within the application, and of the refresh token used to renew it.
 
     Attributes:
-        access_token (str): The actual JWT token.
+        access_token (str): The actual JWT token, valid for a few minutes.
+        refresh_token (str): Opaque token exchanged for new tokens at /refresh-token.
         token_type (str): The type of token, typically 'bearer'.
     """
 
     access_token: str
+    refresh_token: str = None
     token_type: str = "bearer"
 
 
@@ -99,8 +105,23 @@ class UserExistQuery(BaseModel):
 
     Attributes:
         user_id (str, optional): The unique identifier of the user.
+        email (str, optional): The email address of the user.
+    """
+    user_id: Optional[str] = None
+    email: Optional[str] = None
+
+
+class UsersExistQuery(BaseModel):
+    """
+    Schema for checking whether many users exist.
+
+    Attributes:
+        ids (List[str]): User IDs to check.
+        emails (List[str]): Email addresses to check, ignoring case.
     """
-    user_id: str = None
+
+    ids: List[str] = []
+    emails: List[str] = []
 
 
 class RefreshToken(BaseModel):
@@ -108,7 +129,41 @@ class RefreshToken(BaseModel):
     Schema for request token body
 
     Attributes:
-        refresh_token (str): The unique identifier of the user.
+        refresh_token (str): The refresh token returned by /login or /refresh-token.
     """
 
     refresh_token: str
+
+
+class AccountOut(BaseModel):
+    """
+    Schema for an account in an admin listing.
+
+    Attributes:
+        id (UUID): The unique identifier of the account.
+        email (str): The email address of the account.
+        username (str): The username of the account.
+        account_status (str): Whether the account is pending or verified.
+        roles (List[str]): The roles of the account.
+        created_at (datetime): When the account was created.
+    """
+
+    id: UUID
+    email: str
+    username: str
+    account_status: str
+    roles: List[str]
+    created_at: datetime
+
+
+class AccountPage(BaseModel):
+    """
+    Schema for a page of an admin listing.
+
+    Attributes:
+        items (List[AccountOut]): The accounts of the page, oldest first.
+        next (str, optional): The cursor of the next page, None on the last page.
+    """
+
+    items: List[AccountOut]
+    next: Optional[str] = None
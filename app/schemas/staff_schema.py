@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from pydantic import BaseModel, EmailStr
 
 
@@ -13,12 +15,12 @@ class UserOut(BaseModel):
     It is typically used when returning user details in response to various API requests.
 
     Attributes:
-        id (str): The unique identifier of the user, typically a UUID
+        id (UUID): The unique identifier of the user.
         username (st): Generate random string username
         email (EmailStr): The email address of the user.
     """
 
-    id: str
+    id: UUID
     email: EmailStr
     username: str
     account_status: str
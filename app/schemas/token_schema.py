@@ -0,0 +1,55 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class TokenRevoke(BaseModel):
+    """
+    Schema for token revocation requests.
+
+    Attributes:
+        token (str): The access token to revoke.
+    """
+
+    token: str
+
+
+class TokenIntrospect(BaseModel):
+    """
+    Schema for batch token introspection requests.
+
+    Attributes:
+        tokens (List[str]): The access tokens to check.
+    """
+
+    tokens: List[str]
+
+
+class TokenIntrospection(BaseModel):
+    """
+    Schema for the state of one introspected token.
+
+    Attributes:
+        active (bool): Whether the token is valid and its account exists.
+        sub (str, optional): The user ID the token was issued to.
+        roles (List[str], optional): The roles of the user.
+        account_status (str, optional): Whether the account is pending or verified.
+        exp (int, optional): Unix time at which the token expires.
+    """
+
+    active: bool
+    sub: str = None
+    roles: List[str] = None
+    account_status: str = None
+    exp: int = None
+
+
+class TokenIntrospectionOut(BaseModel):
+    """
+    Schema for batch token introspection responses.
+
+    Attributes:
+        tokens (List[TokenIntrospection]): The state of each token, in request order.
+    """
+
+    tokens: List[TokenIntrospection]
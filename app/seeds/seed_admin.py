@@ -1,34 +1,49 @@
-from sqlalchemy.orm import sessionmaker
-from app.config.database import Base, engine
-from app.models.admin_model import User 
+import asyncio
+import os
+import secrets
+
+from dotenv import load_dotenv
+
+from app.config.database import session_scope
+from app.controllers.import_controller import import_users
+
+load_dotenv()
+
+# Password of the seeded accounts. A random one is generated and printed if unset.
+SEED_ADMIN_PASSWORD = os.getenv("SEED_ADMIN_PASSWORD")
+
+SEED_USERS = [
+    {"email": "john.doe@example.com", "username": "johndoe", "roles": ["Admin"]},
+    {"email": "jane.doe@example.com", "username": "janedoe", "roles": ["Admin"]},
+]
+
+
+async def _seed(password: str) -> dict:
+    async def records():
+        for number, user in enumerate(SEED_USERS, start=1):
+            yield number, {**user, "password": password}
+
+    counts = {}
+    async with session_scope() as db:
+        async for event in import_users(db, records()):
+            counts = event.get("done", counts)
+    return counts
 
-# Create a Session
-Session = sessionmaker(bind=engine)
-session = Session()
 
 def user_seed_data():
-    # Create dummy data for users
-    user_data = [
-        {
-            "email": "john.doe@example.com",
-            "username": "johndoe",
-            "hashed_password": "hashedpassword1",
-            "roles": ["Admin"]
-        },
-        {
-            "email": "jane.doe@example.com",
-            "username": "janedoe",
-            "hashed_password": "hashedpassword2",
-            "roles": ["Admin"]
-        },
-    ]
-
-    # Create and add user instances to the session
-    for user in user_data:
-        new_user = User(**user)
-        session.add(new_user)
-    
-    # Commit the session to save the users to the database
-    session.commit()
-
-    print("Data seeded successfully!")
\ No newline at end of file
+    """
+    Seeds the admin accounts of a development database.
+
+    The accounts are created through the bulk import, so their passwords are real
+    bcrypt hashes, and accounts that already exist are left as they are. The
+    database session is only opened when this function runs.
+    """
+    password = SEED_ADMIN_PASSWORD or secrets.token_urlsafe(12)
+    counts = asyncio.run(_seed(password))
+    print(f"Seeded {counts['imported']} of {len(SEED_USERS)} users")
+    if not SEED_ADMIN_PASSWORD and counts["imported"]:
+        print(f"Their password is {password}")
+
+
+if __name__ == "__main__":
+    user_seed_data()
@@ -0,0 +1,164 @@
+"""
+Load benchmark of the /auth/verify forward auth endpoint.
+
+In the default `asgi` mode the endpoint is called in process, without a network
+or server in between, next to the same check written as a regular FastAPI route
+with an HTTPBearer dependency. This isolates the cost of the application itself.
+In `http` mode a running server is loaded over keep-alive connections, which also
+includes the server and the network.
+
+Usage:
+    SECRET=... python -m benchmarks.forward_auth_load --requests 100000 --tokens 100
+    SECRET=... python -m benchmarks.forward_auth_load --mode http \\
+        --url http://127.0.0.1:8080/auth/verify --concurrency 32 --requests 100000
+
+Both modes report latency percentiles and throughput. The target is a p99 below
+one millisecond. In `http` mode the client should run on other cores than the
+server, since httpx itself spends hundreds of microseconds per request.
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+
+from fastapi import Depends, FastAPI, HTTPException, Response
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+
+from app.helpers import auth
+from app.routes.forward_auth import forward_auth
+
+
+def build_app() -> FastAPI:
+    """Returns an app serving the forward auth check both ways."""
+    app = FastAPI()
+    app.add_route("/auth/verify", forward_auth, methods=["GET"])
+    bearer = HTTPBearer()
+
+    def current_claims(credentials: HTTPAuthorizationCredentials = Depends(bearer)) -> dict:
+        try:
+            return auth.verify_and_decode(credentials.credentials)
+        except JWTError:
+            raise HTTPException(status_code=401)
+
+    @app.get("/auth/verify-dependency", status_code=204)
+    async def verify_dependency(claims: dict = Depends(current_claims)):
+        return Response(
+            status_code=204,
+            headers={
+                "X-User-Id": claims["sub"],
+                "X-User-Roles": ",".join(claims.get("roles", ())),
+            },
+        )
+
+    return app
+
+
+def report(name: str, latencies: list, elapsed: float):
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6
+
+    print(
+        f"{name:<24} {len(latencies) / elapsed:>9,.0f} req/s"
+        f"   p50 {percentile(0.50):>7.1f} us   p99 {percentile(0.99):>7.1f} us"
+        f"   p99.9 {percentile(0.999):>7.1f} us   max {latencies[-1] * 1e6:>8.1f} us"
+    )
+
+
+async def run_asgi(app, path: str, tokens: list, requests: int):
+    cycle = itertools.cycle(tokens)
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"authorization", b"Bearer " + next(cycle).encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("127.0.0.1", 8080),
+        }
+        call_started = time.perf_counter()
+        await app(scope, receive, send)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    if set(statuses) != {204}:
+        raise RuntimeError(f"Unexpected statuses from {path}: {set(statuses)}")
+    return latencies, elapsed
+
+
+async def run_http(url: str, tokens: list, requests: int, concurrency: int):
+    import httpx
+
+    cycle = itertools.cycle(tokens)
+    remaining = itertools.count()
+    latencies = []
+
+    async def worker(client):
+        while next(remaining) < requests:
+            headers = {"Authorization": f"Bearer {next(cycle)}"}
+            call_started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - call_started)
+            if response.status_code != 204:
+                raise RuntimeError(f"Unexpected status {response.status_code}")
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/auth/verify")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--tokens", type=int, default=100, help="Distinct bearer tokens in rotation."
+    )
+    args = parser.parse_args()
+
+    if not auth.key_ring.is_asymmetric and auth.key_ring.secret is None:
+        auth.key_ring = auth.KeyRing("HS256", "benchmark-secret")
+    tokens = [
+        auth.create_access_token(data={"sub": f"user-{i}", "roles": ["Admin"]})
+        for i in range(args.tokens)
+    ]
+
+    if args.mode == "http":
+        latencies, elapsed = asyncio.run(
+            run_http(args.url, tokens, args.requests, args.concurrency)
+        )
+        report(args.url, latencies, elapsed)
+        return
+
+    app = build_app()
+    for path in ("/auth/verify", "/auth/verify-dependency"):
+        latencies, elapsed = asyncio.run(run_asgi(app, path, tokens, args.requests))
+        report(path, latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Import time of the application, measured with python -X importtime.
+
+Imports the application module in fresh interpreters, as a new worker does at cold
+start, and reports the import time of each run and the modules taking the most of
+it. With --budget-ms, exits with status 1 when the fastest run exceeds the budget,
+so CI fails when import time regresses.
+
+Usage:
+    python -m benchmarks.import_time --repeat 5 --top 20
+    python -m benchmarks.import_time --budget-ms 2500
+
+Importing needs no database: the engines are created by the application's lifespan.
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_times(statement: str) -> list:
+    """
+    Runs a statement in a fresh interpreter with -X importtime.
+
+    Args:
+        statement (str): Python code, e.g. "import app.main".
+
+    Returns:
+        list: (module, self microseconds, cumulative microseconds, depth) per
+        imported module, in the order the interpreter reports them.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{process.stderr}")
+    return [
+        (match[4], int(match[1]), int(match[2]), len(match[3]) // 2)
+        for match in map(LINE.match, process.stderr.splitlines())
+        if match
+    ]
+
+
+def measure(module: str = "app.main") -> tuple:
+    """
+    Measures the import of a module in a fresh interpreter.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        tuple: The total import time in milliseconds, leaving out the modules the
+        interpreter imports at startup, and the (module, self, cumulative) times.
+    """
+    startup = {name for name, *_ in import_times("pass")}
+    modules = [entry for entry in import_times(f"import {module}") if entry[0] not in startup]
+    total = sum(cumulative for name, _, cumulative, depth in modules if depth == 0)
+    return total / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list.")
+    parser.add_argument(
+        "--budget-ms", type=float, help="Fail when the fastest import takes longer."
+    )
+    args = parser.parse_args()
+
+    # The first run may compile bytecode, which deployed images ship already.
+    measure(args.module)
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    totals = [total for total, _ in runs]
+    fastest, modules = min(runs, key=lambda run: run[0])
+
+    print(f"{'self ms':>9} {'cumul. ms':>9}  module")
+    for name, self_us, cumulative_us, _ in sorted(modules, key=lambda entry: -entry[1])[: args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {name}")
+    print(
+        f"import {args.module}: min {fastest:.0f} ms   median {statistics.median(totals):.0f} ms"
+        f"   max {max(totals):.0f} ms over {args.repeat} runs"
+    )
+    if args.budget_ms is not None and fastest > args.budget_ms:
+        print(f"over the budget of {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
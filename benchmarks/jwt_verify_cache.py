@@ -0,0 +1,59 @@
+"""
+Benchmark of repeated bearer token verification.
+
+Compares decoding and verifying the same token on every call, as each request
+did before the claims cache, with `verify_and_decode`, which verifies a token
+once and serves its claims from the cache until it expires.
+
+Usage:
+    SECRET=... python -m benchmarks.jwt_verify_cache --calls 100000 --tokens 100
+
+Set JWT_ALGORITHM=RS256 or ES256 and JWT_KEYS_DIR to measure asymmetric keys.
+"""
+
+import argparse
+import itertools
+import time
+
+from jose import jwt
+
+from app.helpers import auth
+
+
+def measure(verify, tokens: list, calls: int) -> float:
+    """Returns the mean cost of one call in microseconds."""
+    cycle = itertools.cycle(tokens)
+    started = time.perf_counter()
+    for _ in range(calls):
+        verify(next(cycle))
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def uncached(token: str) -> dict:
+    key = auth.key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+    return jwt.decode(token, key, algorithms=[auth.key_ring.algorithm])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument(
+        "--tokens", type=int, default=100, help="Distinct bearer tokens in rotation."
+    )
+    args = parser.parse_args()
+
+    if not auth.key_ring.is_asymmetric and auth.key_ring.secret is None:
+        auth.key_ring = auth.KeyRing("HS256", "benchmark-secret")
+    tokens = [auth.create_access_token(data={"sub": f"user-{i}"}) for i in range(args.tokens)]
+
+    decode_us = measure(uncached, tokens, args.calls)
+    auth.token_cache.clear()
+    cached_us = measure(auth.verify_and_decode, tokens, args.calls)
+
+    print(f"decode every call   {decode_us:>8.2f} us/call")
+    print(f"verify_and_decode   {cached_us:>8.2f} us/call")
+    print(f"speedup             {decode_us / cached_us:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
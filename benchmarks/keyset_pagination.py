@@ -0,0 +1,133 @@
+"""
+Page latency of the admin user listing, by keyset versus by OFFSET, at increasing depths.
+
+Seeds the users table with a large number of accounts, then reads one page at
+several depths into the listing, both by seeking past a (created_at, id) cursor,
+as GET /users does, and by skipping rows with OFFSET. Finally it walks the whole
+listing page by page through the cursors, reporting the page latency percentiles.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.keyset_pagination \\
+        --rows 5000000 --limit 50 --status verified
+
+The database must be migrated. Seeded accounts use the @page-bench.example.com
+domain, are reused by later runs, and are deleted at the end unless --keep is given.
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import func, select, text
+
+from app.config.database import SessionLocal, engine
+from app.controllers.listing_controller import account_statement, encode_cursor
+from app.models.admin_model import AccountStatus, User
+
+EMAIL_DOMAIN = "@page-bench.example.com"
+DEPTHS = (0.0, 0.1, 0.5, 0.9, 0.99)
+
+
+def seed(rows: int, batch: int = 1_000_000):
+    """Inserts the missing benchmark accounts, one in a hundred pending and one in a thousand Staff."""
+    with engine.connect() as connection:
+        existing = connection.execute(
+            select(func.count()).where(User.email.like(f"%{EMAIL_DOMAIN}"))
+        ).scalar()
+    for start in range(existing, rows, batch):
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"""
+                    INSERT INTO users (id, email, username, hashed_password, account_status, roles, created_at)
+                    SELECT gen_random_uuid(), 'bench' || i || '{EMAIL_DOMAIN}', 'page-bench-' || i, 'x',
+                           (CASE WHEN i % 100 = 0 THEN 'pending' ELSE 'verified' END)::account_status,
+                           (CASE WHEN i % 1000 = 0 THEN ARRAY['Staff'] ELSE ARRAY['Admin'] END),
+                           timestamptz '2020-01-01' + i * interval '10 milliseconds'
+                    FROM generate_series(:start, :stop) AS i
+                    """
+                ),
+                {"start": start + 1, "stop": min(start + batch, rows)},
+            )
+        print(f"seeded {min(start + batch, rows):,} accounts")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE users"))
+
+
+def timed(db, statement) -> tuple:
+    started = time.perf_counter()
+    rows = db.execute(statement).all()
+    return (time.perf_counter() - started) * 1000, rows
+
+
+def compare_depths(db, filters: dict, total: int, limit: int, repeat: int):
+    print(f"{'depth':>7} {'offset':>11} {'keyset ms':>10} {'OFFSET ms':>10}")
+    for depth in DEPTHS:
+        offset = int(total * depth)
+        # The cursor of the row before the page, found once and not timed.
+        previous = db.execute(
+            account_statement(User, **filters).offset(max(offset - 1, 0)).limit(1)
+        ).first()
+        after = encode_cursor(previous.created_at, previous.id) if offset else None
+        keyset = account_statement(User, after=after, **filters).limit(limit)
+        skipped = account_statement(User, **filters).offset(offset).limit(limit)
+        keyset_ms = statistics.median(timed(db, keyset)[0] for _ in range(repeat))
+        offset_ms = statistics.median(timed(db, skipped)[0] for _ in range(repeat))
+        print(f"{depth:>7.0%} {offset:>11,} {keyset_ms:>10.2f} {offset_ms:>10.2f}")
+
+
+def walk(db, filters: dict, limit: int):
+    latencies, after, count = [], None, 0
+    started = time.perf_counter()
+    while True:
+        elapsed, rows = timed(db, account_statement(User, after=after, **filters).limit(limit))
+        latencies.append(elapsed)
+        count += len(rows)
+        if len(rows) < limit:
+            break
+        after = encode_cursor(rows[-1].created_at, rows[-1].id)
+    total = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"walked {count:,} accounts in {len(latencies):,} pages, {total:.1f} s"
+        f"   page p50 {latencies[len(latencies) // 2]:.2f} ms"
+        f"   p99 {latencies[int(len(latencies) * 0.99)]:.2f} ms"
+        f"   max {latencies[-1]:.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--status", choices=[status.value for status in AccountStatus])
+    parser.add_argument("--role")
+    parser.add_argument("--no-walk", action="store_true", help="Skip the full walk.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded accounts.")
+    args = parser.parse_args()
+
+    filters = {
+        "account_status": AccountStatus(args.status) if args.status else None,
+        "roles": [args.role] if args.role else None,
+    }
+    seed(args.rows)
+    try:
+        with SessionLocal() as db:
+            total = db.execute(
+                select(func.count()).select_from(account_statement(User, **filters).subquery())
+            ).scalar()
+            print(f"{total:,} matching accounts, pages of {args.limit}")
+            compare_depths(db, filters, total, args.limit, args.repeat)
+            if not args.no_walk:
+                walk(db, filters, args.limit)
+    finally:
+        if not args.keep:
+            with engine.begin() as connection:
+                connection.execute(
+                    text(f"DELETE FROM users WHERE email LIKE '%{EMAIL_DOMAIN}'")
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Load test comparing the async (asyncpg) and sync (psycopg2) database paths.
+
+The script starts the service twice with uvicorn, once with DATABASE_ASYNC=true
+and once with DATABASE_ASYNC=false, and drives `/login` and `/check-user-exists`
+with a fixed number of concurrent clients for a fixed duration. It reports the
+throughput and latency percentiles of each endpoint under each path.
+
+Usage:
+    DATABASE_URL=postgresql://... SECRET=... python -m benchmarks.load_db_paths \\
+        --concurrency 64 --duration 20
+
+The database must be reachable and migrated. A benchmark user is signed up on
+the first run and reused afterwards.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BENCH_USER = {
+    "email": "loadtest@example.com",
+    "username": "loadtest",
+    "password": "loadtest-password",
+}
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+async def drive(client: httpx.AsyncClient, send, concurrency: int, duration: float):
+    """Calls `send` from `concurrency` workers for `duration` seconds and collects latencies."""
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = await send(client)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def summarize(name: str, latencies: list, errors: int, duration: float) -> str:
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    return (
+        f"{name:<28} {len(latencies) / duration:>10.1f} req/s"
+        f"   p50 {quantiles[49] * 1000:>7.1f} ms"
+        f"   p99 {quantiles[98] * 1000:>7.1f} ms"
+        f"   errors {errors}"
+    )
+
+
+async def run_against(base_url: str, concurrency: int, duration: float, label: str):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await wait_until_ready(client)
+        signup = await client.post("/signup", json=BENCH_USER)
+        if signup.status_code == 200:
+            user_id = signup.json()["id"]
+        else:
+            user_id = None
+
+        async def login(c):
+            return await c.post(
+                "/login",
+                json={"email": BENCH_USER["email"], "password": BENCH_USER["password"]},
+            )
+
+        async def check_exists(c):
+            if user_id:
+                return await c.get("/check-user-exists", params={"user_id": user_id})
+            return await c.get("/check-user-exists", params={"email": BENCH_USER["email"]})
+
+        results = []
+        for name, send in (("/login", login), ("/check-user-exists", check_exists)):
+            latencies, errors = await drive(client, send, concurrency, duration)
+            results.append(summarize(f"{label} {name}", latencies, errors, duration))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    report = []
+    for async_enabled in ("true", "false"):
+        label = "async" if async_enabled == "true" else "sync"
+        env = dict(os.environ, DATABASE_ASYNC=async_enabled)
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--port", str(args.port),
+                "--workers", str(args.workers),
+                "--log-level", "warning",
+            ],
+            env=env,
+        )
+        try:
+            report.extend(
+                asyncio.run(
+                    run_against(
+                        f"http://127.0.0.1:{args.port}",
+                        args.concurrency,
+                        args.duration,
+                        label,
+                    )
+                )
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    print("\n".join(report))
+
+
+if __name__ == "__main__":
+    main()
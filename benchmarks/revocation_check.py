@@ -0,0 +1,75 @@
+"""
+Cost of checking token revocation with a large revocation list.
+
+Fills the in-process revocation list with random revoked `jti`s, then measures
+`verify_and_decode` on valid tokens with an empty and with a full list, as well as
+the revocation check alone for tokens that were and were not revoked. It also
+reports the memory of the Bloom filter and its observed false positive rate.
+
+Usage:
+    python -m benchmarks.revocation_check --revoked 1000000 --calls 200000
+
+Every check is answered in process; the database is only read by the periodic
+refresh, which this benchmark does not exercise.
+"""
+
+import argparse
+import itertools
+import time
+import uuid
+
+from app.helpers import auth
+from app.helpers.revocation import REVOCATION_BLOOM_ERROR_RATE, RevocationList
+
+
+def measure(check, items: list, calls: int) -> float:
+    """Returns the mean cost of one call in microseconds."""
+    cycle = itertools.cycle(items)
+    started = time.perf_counter()
+    for _ in range(calls):
+        check(next(cycle))
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--revoked", type=int, default=1_000_000)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument(
+        "--tokens", type=int, default=1000, help="Distinct valid tokens in rotation."
+    )
+    args = parser.parse_args()
+
+    if not auth.key_ring.is_asymmetric and auth.key_ring.secret is None:
+        auth.key_ring = auth.KeyRing("HS256", "benchmark-secret")
+    tokens = [auth.create_access_token(data={"sub": f"user-{i}"}) for i in range(args.tokens)]
+
+    auth.revocation_list = RevocationList(args.revoked, REVOCATION_BLOOM_ERROR_RATE)
+    empty_us = measure(auth.verify_and_decode, tokens, args.calls)
+
+    started = time.perf_counter()
+    expires_at = time.time() + 3600
+    revoked = [str(uuid.uuid4()) for _ in range(args.revoked)]
+    full = RevocationList(args.revoked, REVOCATION_BLOOM_ERROR_RATE)
+    full.replace((jti, expires_at) for jti in revoked)
+    load_s = time.perf_counter() - started
+    auth.revocation_list = full
+
+    full_us = measure(auth.verify_and_decode, tokens, args.calls)
+    unknown = [str(uuid.uuid4()) for _ in range(min(args.calls, 100_000))]
+    miss_us = measure(full.is_revoked, unknown, args.calls)
+    hit_us = measure(full.is_revoked, revoked[: len(unknown)], args.calls)
+    false_positives = full.false_positives / args.calls
+
+    print(f"revoked tokens                  {args.revoked:>12,}")
+    print(f"load and build                  {load_s:>12.2f} s")
+    print(f"bloom filter                    {full._bloom.nbytes / 2**20:>12.2f} MiB")
+    print(f"verify_and_decode, empty list   {empty_us:>12.2f} us/call")
+    print(f"verify_and_decode, full list    {full_us:>12.2f} us/call")
+    print(f"is_revoked, not revoked         {miss_us:>12.2f} us/call")
+    print(f"is_revoked, revoked             {hit_us:>12.2f} us/call")
+    print(f"bloom false positive rate       {false_positives:>12.5f}")
+
+
+if __name__ == "__main__":
+    main()
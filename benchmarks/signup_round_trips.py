@@ -0,0 +1,103 @@
+"""
+Benchmark of the database work done by a signup.
+
+Compares the previous signup sequence (SELECT on email, INSERT user, COMMIT,
+refresh, INSERT access code, COMMIT) with `insert_user_with_access_code`, which
+writes the user and its access code in one statement and one commit. Password
+hashing is left out so only database latency is measured.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.signup_round_trips --signups 1000
+
+Rows created by the benchmark use the @signup-bench.example.com domain and are
+deleted at the end.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete, event, select
+
+from app.config.database import SessionLocal, engine
+from app.controllers.admin_controller import insert_user_with_access_code
+from app.helpers.access_code import AccessCode, code_expiry, generate_code
+from app.models.admin_model import User
+
+EMAIL_DOMAIN = "@signup-bench.example.com"
+HASHED_PASSWORD = "$2b$12$benchmarkbenchmarkbenchmarkbenchmarkbenchmarkbenchma"
+
+
+class RoundTripCounter:
+    """Counts statements and commits sent on the sync engine."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_round_trip)
+        event.listen(engine, "commit", self._on_round_trip)
+
+    def _on_round_trip(self, *args, **kwargs):
+        self.count += 1
+
+
+def legacy_signup(db, email: str, username: str):
+    """The signup sequence as it was before the single-statement insert."""
+    if db.query(User).filter(User.email == email).first():
+        return None
+    new_user = User(email=email, username=username, hashed_password=HASHED_PASSWORD)
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    db.add(
+        AccessCode(user_id=new_user.id, code=generate_code(), expires_at=code_expiry())
+    )
+    db.commit()
+    return new_user
+
+
+async def single_statement_signup(db, email: str, username: str):
+    return await insert_user_with_access_code(
+        db, email, username, HASHED_PASSWORD, generate_code()
+    )
+
+
+def cleanup(db):
+    users = select(User.id).where(User.email.like(f"%{EMAIL_DOMAIN}"))
+    db.execute(delete(AccessCode).where(AccessCode.user_id.in_(users)))
+    db.execute(delete(User).where(User.email.like(f"%{EMAIL_DOMAIN}")))
+    db.commit()
+
+
+async def run(name: str, signup, signups: int, counter: RoundTripCounter) -> str:
+    db = SessionLocal()
+    try:
+        counter.count = 0
+        started = time.perf_counter()
+        for _ in range(signups):
+            suffix = uuid.uuid4().hex[:12]
+            result = signup(db, f"{suffix}{EMAIL_DOMAIN}", f"bench-{suffix}")
+            if asyncio.iscoroutine(result):
+                await result
+        elapsed = time.perf_counter() - started
+        return (
+            f"{name:<18} {elapsed / signups * 1000:>8.3f} ms/signup"
+            f"   {counter.count / signups:>5.1f} round trips/signup"
+        )
+    finally:
+        cleanup(db)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--signups", type=int, default=1000)
+    args = parser.parse_args()
+
+    counter = RoundTripCounter()
+    print(asyncio.run(run("legacy", legacy_signup, args.signups, counter)))
+    print(asyncio.run(run("single statement", single_statement_signup, args.signups, counter)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Insert throughput of random hex string keys versus time-ordered UUID keys.
+
+Loads the same number of rows into two scratch tables, one keyed by the previous
+scheme (uuid4 hex in a VARCHAR primary key) and one by `generate_uuid` (UUIDv7 in a
+native UUID primary key). It reports the insert rate as the tables grow and the
+final size of each primary key index.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.uuid_insert_throughput \\
+        --rows 10000000 --batch 10000
+
+The scratch tables are dropped at the end of the run.
+"""
+
+import argparse
+import time
+import uuid
+
+import psycopg2
+from psycopg2.extras import execute_values
+from sqlalchemy.engine import make_url
+
+from app.config.database import SQLALCHEMY_DATABASE_URL
+from app.helpers.uuid import generate_uuid
+
+SCHEMES = {
+    "uuid4 hex varchar": (
+        "bench_ids_hex",
+        "id varchar PRIMARY KEY",
+        lambda: uuid.uuid4().hex,
+    ),
+    "uuid7 native uuid": (
+        "bench_ids_uuid7",
+        "id uuid PRIMARY KEY",
+        lambda: str(generate_uuid()),
+    ),
+}
+
+
+def connect():
+    url = make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql")
+    return psycopg2.connect(url.render_as_string(hide_password=False))
+
+
+def load(connection, name: str, rows: int, batch: int, report_every: int) -> list:
+    table, column, next_id = SCHEMES[name]
+    lines = []
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TABLE {table} ({column}, payload integer NOT NULL)")
+        connection.commit()
+
+        started = segment_started = time.perf_counter()
+        for offset in range(0, rows, batch):
+            values = [(next_id(), i) for i in range(offset, min(offset + batch, rows))]
+            execute_values(cursor, f"INSERT INTO {table} (id, payload) VALUES %s", values)
+            connection.commit()
+            loaded = offset + len(values)
+            if loaded % report_every == 0 or loaded == rows:
+                now = time.perf_counter()
+                segment_rows = loaded % report_every or report_every
+                lines.append(
+                    f"{name:<18} {loaded:>11,} rows"
+                    f"   {segment_rows / (now - segment_started):>10,.0f} rows/s"
+                )
+                segment_started = now
+        elapsed = time.perf_counter() - started
+
+        cursor.execute(f"SELECT pg_relation_size('{table}_pkey')")
+        index_bytes = cursor.fetchone()[0]
+        cursor.execute(f"DROP TABLE {table}")
+        connection.commit()
+
+    lines.append(
+        f"{name:<18} total {rows / elapsed:>10,.0f} rows/s"
+        f"   primary key index {index_bytes / 2**20:,.1f} MiB"
+    )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--report-every", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    connection = connect()
+    try:
+        for name in SCHEMES:
+            print("\n".join(load(connection, name, args.rows, args.batch, args.report_every)))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+#!/bin/bash
+
+# Generate a token signing key pair in JWT_KEYS_DIR, named after a timestamp kid.
+# Usage: JWT_KEYS_DIR=keys ./commands/generate-jwt-key.bash [RS256|ES256]
+# The newest kid signs new tokens unless JWT_ACTIVE_KID pins another one.
+
+set -e
+
+ALGORITHM=${1:-${JWT_ALGORITHM:-RS256}}
+KEYS_DIR=${JWT_KEYS_DIR:-keys}
+KID=$(date -u +%Y%m%d%H%M%S)
+
+mkdir -p "$KEYS_DIR"
+case "$ALGORITHM" in
+    RS256) openssl genpkey -algorithm RSA -pkeyopt rsa_keygen_bits:2048 -out "$KEYS_DIR/$KID.pem" ;;
+    ES256) openssl genpkey -algorithm EC -pkeyopt ec_paramgen_curve:P-256 -out "$KEYS_DIR/$KID.pem" ;;
+    *) echo "Unsupported algorithm: $ALGORITHM" >&2; exit 1 ;;
+esac
+chmod 600 "$KEYS_DIR/$KID.pem"
+
+echo "Created $KEYS_DIR/$KID.pem"
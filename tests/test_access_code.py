@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import Column, MetaData, Table, Uuid, create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.helpers import access_code
+from app.helpers.access_code import (
+    AccessCode,
+    AccessCodeStore,
+    MemoryAccessCodeStore,
+    SqlAccessCodeStore,
+    purge_expired_access_codes,
+)
+from app.helpers.uuid import generate_uuid
+from app.models.admin_model import User  # noqa: F401, registers the users table
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(bind=engine)
+
+# The access_codes table alone, with a bare users table for its foreign key, since
+# SQLite cannot create the roles ARRAY column of the real one.
+metadata = MetaData()
+Table("users", metadata, Column("id", Uuid, primary_key=True))
+AccessCode.__table__.to_metadata(metadata)
+
+
+def setup_module(module):
+    metadata.create_all(bind=engine)
+
+
+def teardown_module(module):
+    metadata.drop_all(bind=engine)
+
+
+def test_purge_deletes_only_expired_codes_in_batches():
+    """
+    Test that the sweeper deletes every expired code across several batches, and
+    keeps the codes that can still be used.
+    """
+    now = datetime.now(timezone.utc)
+    with TestingSessionLocal() as db:
+        db.execute(
+            insert(AccessCode),
+            [
+                {
+                    "id": generate_uuid(),
+                    "user_id": generate_uuid(),
+                    "code": "123456",
+                    "expires_at": now + timedelta(hours=1 if i % 3 == 0 else -1),
+                }
+                for i in range(9)
+            ],
+        )
+        db.commit()
+
+        assert asyncio.run(purge_expired_access_codes(db, batch_size=4)) == 6
+        assert db.execute(select(func.count()).select_from(AccessCode)).scalar() == 3
+        assert asyncio.run(purge_expired_access_codes(db, batch_size=4)) == 0
+
+
+def check_store(store, db=None):
+    """Runs the consume-once and attempt counting checks shared by every store."""
+
+    async def scenario():
+        first, second = generate_uuid(), generate_uuid()
+        await store.save(db, first, "111111")
+        await store.save(db, second, "222222")
+
+        assert not await store.consume(db, first, "222222")
+        assert await store.consume(db, first, "111111")
+        assert not await store.consume(db, first, "111111")
+
+        for _ in range(access_code.ACCESS_CODE_MAX_ATTEMPTS):
+            assert not await store.consume(db, second, "000000")
+        assert not await store.consume(db, second, "222222")
+
+    asyncio.run(scenario())
+
+
+def test_memory_store_consumes_codes_once_and_counts_attempts():
+    """
+    Test that a code is accepted once, and not at all after too many wrong attempts.
+    """
+    check_store(MemoryAccessCodeStore())
+
+
+def test_sql_store_consumes_codes_once_and_counts_attempts():
+    """
+    Test the same behavior for codes kept in the access_codes table.
+    """
+    with TestingSessionLocal() as db:
+        check_store(SqlAccessCodeStore(), db)
+
+
+def test_incomplete_store_cannot_be_created():
+    """
+    Test that a store missing an operation fails when it is created, not when a
+    user first verifies an account.
+    """
+
+    class SaveOnlyStore(AccessCodeStore):
+        async def save(self, db, user_id, code):
+            pass
+
+    with pytest.raises(TypeError):
+        SaveOnlyStore()
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from jose import JWTError
+
+from app.helpers import auth
+from app.helpers.auth import (
+    HashExecutor,
+    HashQueueFull,
+    hash_password_async,
+    verify_password_async,
+)
+
+
+def test_hash_and_verify_password_async():
+    """
+    Test that hashing on the executor produces a hash the async verifier accepts.
+    """
+
+    async def scenario():
+        hashed = await hash_password_async("s3cret")
+        assert await verify_password_async("s3cret", hashed)
+        assert not await verify_password_async("wrong", hashed)
+
+    asyncio.run(scenario())
+
+
+def test_hash_executor_rejects_when_full():
+    """
+    Test that the executor refuses jobs beyond its workers plus queue size
+    instead of queueing them without bound.
+    """
+    executor = HashExecutor("thread", workers=1, queue_size=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def block():
+            asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+
+        running = [asyncio.create_task(executor.run(block)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(HashQueueFull):
+            await executor.run(block)
+        release.set()
+        await asyncio.gather(*running)
+        assert executor.pending == 0
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+
+def test_verify_and_decode_caches_valid_tokens(monkeypatch):
+    """
+    Test that a valid token is verified once and then served from the claims
+    cache, and that tampered tokens are rejected and not cached.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    auth.token_cache.clear()
+    token = auth.create_access_token(data={"sub": "user-1"})
+
+    assert auth.verify_and_decode(token)["sub"] == "user-1"
+    hits = auth.token_cache.hits
+    assert auth.verify_and_decode(token)["sub"] == "user-1"
+    assert auth.token_cache.hits == hits + 1
+
+    header, payload, signature = token.split(".")
+    with pytest.raises(JWTError):
+        auth.verify_and_decode(f"{header}.{payload}.{signature[::-1]}")
+    assert len(auth.token_cache) == 1
@@ -0,0 +1,46 @@
+from app.helpers.cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_ttl():
+    """
+    Test that entries expire after the cache TTL or their own TTL, and that
+    expired lookups count as misses.
+    """
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("user", "found")
+    cache.set("unknown", None, ttl=5)
+
+    assert cache.get("user") == "found"
+    assert cache.get("unknown") is None
+
+    clock.now = 10
+    assert cache.get("unknown") is MISSING
+    assert cache.get("user") == "found"
+
+    clock.now = 61
+    assert cache.get("user") is MISSING
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    """
+    Test that a full cache evicts the entry that was used least recently.
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
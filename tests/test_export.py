@@ -0,0 +1,46 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.controllers.export_controller import format_records
+from app.helpers import auth
+from app.helpers.rbac import role_table
+from app.models.admin_model import User
+from app.routes.admin_routes import router as admin_router
+
+RECORD = {
+    "id": "0192a3b4-c5d6-7e8f-9012-3456789abcde",
+    "email": "jane@example.com",
+    "username": "jane, \"j\"",
+    "account_status": "verified",
+    "roles": ["Admin", "Staff"],
+    "created_at": "2026-10-19T09:14:41.802613+00:00",
+}
+
+
+def test_csv_rows_use_the_import_format():
+    """
+    Test that CSV exports start with a header, quote fields as needed and join
+    roles with semicolons, as imports expect.
+    """
+    assert format_records([RECORD], "csv", header=True).decode().splitlines() == [
+        "id,email,username,account_status,roles,created_at",
+        f'{RECORD["id"]},jane@example.com,"jane, ""j""",verified,Admin;Staff,{RECORD["created_at"]}',
+    ]
+    assert format_records([RECORD, RECORD], "jsonl").count(b"\n") == 2
+
+
+def test_export_requires_the_export_permission(monkeypatch):
+    """
+    Test that /users/export refuses tokens without users:export with 403,
+    including those of self-registered and Staff accounts.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    app = FastAPI()
+    app.include_router(admin_router)
+
+    with TestClient(app) as client:
+        assert client.get("/users/export").status_code == 401
+        for roles in (User.roles.default.arg(None), ["Staff"]):
+            token = auth.create_access_token(data={"sub": "u", **role_table.claims_for(roles)})
+            response = client.get("/users/export", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 403
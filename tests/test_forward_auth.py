@@ -0,0 +1,55 @@
+from jose import jwt
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.helpers import auth
+from app.routes.forward_auth import FORWARD_AUTH_METHODS, forward_auth
+
+client = TestClient(
+    Starlette(routes=[Route("/auth/verify", forward_auth, methods=FORWARD_AUTH_METHODS)])
+)
+
+
+def test_forward_auth_accepts_valid_tokens(monkeypatch):
+    """
+    Test that a valid bearer token is answered with 204 and the user headers,
+    for the methods proxies forward.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    token = auth.create_access_token(data={"sub": "user-1", "roles": ["Admin", "Staff"]})
+
+    for method in ("GET", "POST"):
+        response = client.request(
+            method, "/auth/verify", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 204
+        assert response.headers["X-User-Id"] == "user-1"
+        assert response.headers["X-User-Roles"] == "Admin,Staff"
+
+
+def test_forward_auth_rejects_missing_and_invalid_tokens(monkeypatch):
+    """
+    Test that requests without a bearer token, or with an invalid one, get 401.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+
+    response = client.get("/auth/verify")
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+    response = client.get("/auth/verify", headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
+    assert "invalid_token" in response.headers["WWW-Authenticate"]
+
+
+def test_forward_auth_rejects_non_string_kids(monkeypatch):
+    """
+    Test that a token whose unverified header has a list or object as kid gets
+    401 rather than a server error.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    for kid in (["a"], {"a": 1}):
+        token = jwt.encode({"sub": "user-1"}, "test-secret", headers={"kid": kid})
+        response = client.get("/auth/verify", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.controllers import import_controller
+from app.controllers.import_controller import UserImport, read_records
+from app.helpers import auth
+from app.helpers.ndjson import NDJSONError
+from app.helpers.rbac import role_table
+from app.models.admin_model import User
+from app.routes.admin_routes import router as admin_router
+
+HASH = "$2b$12$" + "a" * 53
+
+
+def records(body: bytes, format: str) -> list:
+    """Parses a body delivered in small chunks, as a slow client would send it."""
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    async def collect():
+        return [record async for record in read_records(chunks(), format)]
+
+    return asyncio.run(collect())
+
+
+def test_csv_rows_keep_line_numbers_across_quoted_newlines():
+    """
+    Test that CSV rows are split on unquoted newlines only, with semicolon separated
+    roles and empty fields left out.
+    """
+    body = (
+        b"email,username,password,roles\n"
+        b'a@example.com,"multi\nline",secret,admin;staff\n'
+        b"\n"
+        b"b@example.com,b,secret,\n"
+    )
+    assert records(body, "csv") == [
+        (2, {"email": "a@example.com", "username": "multi\nline", "password": "secret", "roles": ["admin", "staff"]}),
+        (5, {"email": "b@example.com", "username": "b", "password": "secret"}),
+    ]
+
+
+def test_jsonl_reports_malformed_lines_and_keeps_going():
+    """
+    Test that a line that is not a JSON object is reported with its number, and the
+    lines after it are still read.
+    """
+    body = b'{"email": "a@example.com"}\n[1, 2]\n{oops\n{"email": "b@example.com"}\n'
+    result = records(body, "jsonl")
+    assert [number for number, _ in result] == [1, 2, 3, 4]
+    assert isinstance(result[1][1], NDJSONError)
+    assert isinstance(result[2][1], NDJSONError)
+    assert result[3][1] == {"email": "b@example.com"}
+
+
+def test_user_import_requires_one_password_and_a_valid_email():
+    """
+    Test that a row needs exactly one of a plaintext password and a bcrypt hash, and
+    that its email domain is normalized.
+    """
+    user = UserImport(email="Jane@Example.COM", username="jane", hashed_password=HASH)
+    assert user.email == "Jane@example.com"
+
+    for fields in [
+        {"password": "secret", "hashed_password": HASH},
+        {},
+        {"hashed_password": "not-a-hash"},
+        {"email": "a..b@example.com", "password": "secret"},
+        {"email": "jane@localhost", "password": "secret"},
+    ]:
+        with pytest.raises(ValidationError):
+            UserImport.model_validate({"email": "jane@example.com", "username": "jane", **fields})
+
+
+def test_passwords_are_hashed_in_spawned_workers(monkeypatch):
+    """
+    Test that the hashing pool starts its workers with spawn rather than fork, so
+    they inherit no locks or connections from the serving process, and hashes with them.
+    """
+    monkeypatch.setattr(import_controller, "_hash_pool", None)
+    monkeypatch.setattr(import_controller, "IMPORT_HASH_WORKERS", 2)
+    users = [
+        UserImport(email=f"user{index}@example.com", username=f"user{index}", password="secret")
+        for index in range(3)
+    ]
+    try:
+        asyncio.run(import_controller._hash_chunk(users))
+        pool = import_controller._hash_pool
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        import_controller._hash_pool.shutdown()
+
+    assert all(user.password is None for user in users)
+    assert all(auth.verify_password("secret", user.hashed_password) for user in users)
+
+
+def test_import_requires_the_import_permission(monkeypatch):
+    """
+    Test that /users/import refuses tokens without users:import with 403, before
+    reading any row, including those of self-registered and Staff accounts.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    app = FastAPI()
+    app.include_router(admin_router)
+    body = b'{"email": "x@example.com", "username": "x", "password": "pw"}\n'
+
+    with TestClient(app) as client:
+        assert client.post("/users/import", content=body).status_code == 401
+        for roles in (User.roles.default.arg(None), ["Staff"]):
+            token = auth.create_access_token(data={"sub": "u", **role_table.claims_for(roles)})
+            response = client.post(
+                "/users/import", content=body, headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response.status_code == 403
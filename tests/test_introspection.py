@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.config.replicas import RoutingSession
+from app.controllers import token_controller
+from app.controllers.admin_controller import user_cache
+from app.helpers import auth
+from app.helpers.rbac import role_table
+from app.helpers.revocation import RevocationList
+from app.helpers.uuid import generate_uuid
+from app.models.admin_model import AccountStatus, User
+from app.routes.token_routes import router as token_router
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(class_=RoutingSession, bind=engine)
+
+# The users table alone.
+tables = [User.__table__]
+
+
+def setup_module(module):
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+
+def teardown_module(module):
+    Base.metadata.drop_all(bind=engine, tables=tables)
+
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(100, 0.01))
+    user_cache.clear()
+
+
+def create_users(*statuses) -> list:
+    """Inserts a user per account status, returning their ids."""
+    user_ids = [generate_uuid() for _ in statuses]
+    with TestingSessionLocal() as db:
+        db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": f"{user_id}@example.com",
+                    "username": str(user_id),
+                    "hashed_password": "hash",
+                    "account_status": status,
+                }
+                for user_id, status in zip(user_ids, statuses)
+            ],
+        )
+        db.commit()
+    return user_ids
+
+
+def token_for(user_id) -> str:
+    return auth.create_access_token(data={"sub": str(user_id)})
+
+
+def introspect(tokens: list) -> list:
+    with TestingSessionLocal() as db:
+        return asyncio.run(token_controller.introspect_tokens(db, tokens))
+
+
+def test_tokens_are_answered_in_request_order(monkeypatch):
+    """
+    Test that each token gets its own answer in the order given, and that
+    malformed, expired and revoked tokens, and tokens of unknown accounts, are
+    inactive.
+    """
+    pending, verified = create_users(AccountStatus.PENDING, AccountStatus.VERIFIED)
+    revoked = token_for(verified)
+    claims = auth.verify_and_decode(revoked)
+    auth.revocation_list.add(claims["jti"], claims["exp"])
+    expire_minutes = auth.ACCESS_TOKEN_EXPIRE_MINUTES
+    monkeypatch.setattr(auth, "ACCESS_TOKEN_EXPIRE_MINUTES", -1)
+    expired = token_for(verified)
+    monkeypatch.setattr(auth, "ACCESS_TOKEN_EXPIRE_MINUTES", expire_minutes)
+
+    tokens = [
+        token_for(verified),
+        "not-a-token",
+        expired,
+        token_for(pending),
+        revoked,
+        token_for(generate_uuid()),
+        token_for(verified),
+    ]
+    results = introspect(tokens)
+
+    assert [result.active for result in results] == [True, False, False, True, False, False, True]
+    assert [result.sub for result in results] == [
+        str(verified), None, None, str(pending), None, None, str(verified)
+    ]
+    assert results[0].account_status == "verified"
+    assert results[3].account_status == "pending"
+    assert results[3].roles == User.roles.default.arg(None)
+    assert results[0].exp == auth.verify_and_decode(tokens[0])["exp"]
+
+
+def test_too_many_tokens_are_refused(monkeypatch):
+    """
+    Test that a request with more than INTROSPECT_MAX_TOKENS tokens is refused with
+    413, before any token is checked.
+    """
+    monkeypatch.setattr(token_controller, "INTROSPECT_MAX_TOKENS", 2)
+
+    with pytest.raises(HTTPException) as error:
+        introspect(["a", "b", "c"])
+    assert error.value.status_code == 413
+    assert len(introspect(["a", "b"])) == 2
+
+
+def test_uncached_accounts_are_loaded_with_one_query():
+    """
+    Test that the accounts of many tokens are loaded with a single IN query, and
+    then answered from the user cache.
+    """
+    user_ids = create_users(*[AccountStatus.VERIFIED] * 5)
+    tokens = [token_for(user_id) for user_id in user_ids + user_ids[:2]]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert all(result.active for result in introspect(tokens))
+        assert len(statements) == 1
+        assert " IN (" in statements[0]
+
+        assert all(result.active for result in introspect(tokens))
+        assert len(statements) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_introspection_requires_the_introspect_permission(monkeypatch):
+    """
+    Test that /tokens/introspect refuses anonymous callers with 401 and tokens
+    without tokens:introspect with 403, before looking up any account.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    app = FastAPI()
+    app.include_router(token_router)
+    body = {"tokens": ["not-a-token"]}
+
+    with TestClient(app) as client:
+        assert client.post("/tokens/introspect", json=body).status_code == 401
+        for roles in (User.roles.default.arg(None), ["Staff"]):
+            token = auth.create_access_token(data={"sub": "u", **role_table.claims_for(roles)})
+            response = client.post(
+                "/tokens/introspect", json=body, headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response.status_code == 403
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import JWTError, jwt
+
+from app.helpers.keys import KeyRing, watch_keys_dir
+
+
+def write_key(keys_dir, kid, public_only=False):
+    """Writes a P-256 key pair, or only its public half, named after the kid."""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    if public_only:
+        pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        (keys_dir / f"{kid}.pub.pem").write_bytes(pem)
+    else:
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        (keys_dir / f"{kid}.pem").write_bytes(pem)
+
+
+def sign(key_ring, claims):
+    kid, key = key_ring.signing_key()
+    return jwt.encode(claims, key, algorithm=key_ring.algorithm, headers={"kid": kid})
+
+
+def verify(key_ring, token):
+    key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+    return jwt.decode(token, key, algorithms=[key_ring.algorithm])
+
+
+def test_key_rotation(tmp_path):
+    """
+    Test that the newest key signs, that tokens signed by an older key still
+    verify after rotation, and that the JWKS publishes every key.
+    """
+    write_key(tmp_path, "2024-01")
+    old_ring = KeyRing("ES256", keys_dir=str(tmp_path))
+    old_token = sign(old_ring, {"sub": "user-1"})
+
+    write_key(tmp_path, "2024-02")
+    ring = KeyRing("ES256", keys_dir=str(tmp_path))
+    assert ring.signing_key()[0] == "2024-02"
+    assert jwt.get_unverified_header(sign(ring, {"sub": "user-2"}))["kid"] == "2024-02"
+    assert verify(ring, old_token)["sub"] == "user-1"
+
+    jwks = ring.jwks()
+    assert sorted(key["kid"] for key in jwks["keys"]) == ["2024-01", "2024-02"]
+    assert all("d" not in key for key in jwks["keys"])
+
+
+def test_public_only_and_unknown_keys(tmp_path):
+    """
+    Test that a public-only key verifies but never signs, and that tokens with
+    an unknown or non-string kid are rejected.
+    """
+    write_key(tmp_path, "2024-01")
+    write_key(tmp_path, "2025-01", public_only=True)
+    ring = KeyRing("ES256", keys_dir=str(tmp_path))
+
+    assert ring.signing_key()[0] == "2024-01"
+    assert len(ring.jwks()["keys"]) == 2
+
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    write_key(other_dir, "2099-01")
+    foreign = sign(KeyRing("ES256", keys_dir=str(other_dir)), {"sub": "user-1"})
+    with pytest.raises(JWTError):
+        verify(ring, foreign)
+
+    # The kid of an unverified header may be any JSON value.
+    for kid in (["2024-01"], {"kid": "2024-01"}, 2024):
+        with pytest.raises(JWTError):
+            ring.verification_key(kid)
+
+
+def test_keys_added_to_the_directory_are_loaded(tmp_path):
+    """
+    Test that a running worker verifies tokens of a key added to its directory and
+    publishes it, and keeps its keys when the directory holds a broken key.
+    """
+    write_key(tmp_path, "2024-01")
+    ring = KeyRing("ES256", keys_dir=str(tmp_path), active_kid="2024-01")
+    ring.load()
+
+    async def scenario():
+        watcher = asyncio.create_task(watch_keys_dir(ring, interval=0.01))
+        await asyncio.sleep(0.02)
+        write_key(tmp_path, "2024-02")
+        await asyncio.sleep(0.05)
+        # Signed by a worker already using the new key.
+        rotated = KeyRing("ES256", keys_dir=str(tmp_path), active_kid="2024-02")
+        claims = verify(ring, sign(rotated, {"sub": "user-1"}))
+        (tmp_path / "2024-03.pem").write_text("not a key")
+        await asyncio.sleep(0.05)
+        watcher.cancel()
+        return claims
+
+    assert asyncio.run(scenario())["sub"] == "user-1"
+    assert sorted(key["kid"] for key in ring.jwks()["keys"]) == ["2024-01", "2024-02"]
+    assert ring.signing_key()[0] == "2024-01"
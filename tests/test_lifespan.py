@@ -0,0 +1,27 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config.settings import Settings
+from app.controllers import import_controller
+from app.helpers import auth
+from app.main import create_app
+
+
+def test_shutdown_stops_the_hashing_workers(tmp_path):
+    """
+    Test that stopping an application shuts down the pools hashing passwords for
+    logins and for imports, so rebuilt applications do not leak workers.
+    """
+    app = create_app(
+        Settings(prewarm=False, background_tasks=False, static_directory=str(tmp_path))
+    )
+
+    with TestClient(app):
+        login_pool = auth.hash_executor._get_pool()
+        import_pool = import_controller._get_hash_pool()
+
+    assert auth.hash_executor._pool is None
+    assert import_controller._hash_pool is None
+    for pool in (login_pool, import_pool):
+        with pytest.raises(RuntimeError):
+            pool.submit(len, "")
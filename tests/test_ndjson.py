@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.helpers.ndjson import NDJSONError, dumps, read_lines
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(chunks, **kwargs):
+    async def scenario():
+        return [item async for item in read_lines(chunks, **kwargs)]
+
+    return asyncio.run(scenario())
+
+
+def test_read_lines_across_chunks():
+    """
+    Test that lines split across chunks, blank lines and a missing final newline
+    are handled.
+    """
+    body = dumps({"id": "a"}) + b"\n" + dumps({"email": "b@example.com"}) + b'{"id": "c"}'
+    chunks = chunked(*(body[i:i + 5] for i in range(0, len(body), 5)))
+    assert collect(chunks) == [{"id": "a"}, {"email": "b@example.com"}, {"id": "c"}]
+
+
+def test_read_lines_rejects_long_and_invalid_lines():
+    """
+    Test that a line longer than the limit is rejected before it is complete, and
+    that invalid JSON is rejected.
+    """
+    with pytest.raises(NDJSONError):
+        collect(chunked(b'{"id": "', b"x" * 100), max_line_bytes=64)
+    with pytest.raises(NDJSONError):
+        collect(chunked(b"{not json}\n"))
@@ -0,0 +1,192 @@
+import os
+import uuid
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+if not TEST_DATABASE_URL.startswith("postgresql"):
+    pytest.skip(
+        "Query plan tests need a Postgres TEST_DATABASE_URL", allow_module_level=True
+    )
+
+from sqlalchemy import (
+    String, Uuid, any_, cast, create_engine, delete, func, literal, or_, select, text
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.config.database import Base
+from app.controllers.export_controller import export_statement
+from app.controllers.listing_controller import account_statement, encode_cursor
+from app.helpers.access_code import AccessCode
+from app.models.admin_model import AccountStatus, User
+from app.models.staff_model import Staff  # noqa: F401, registers the staffs table
+from app.models import token_model  # noqa: F401, registers the token tables
+
+# Number of users and access codes seeded before the plans are checked.
+SEED_ROWS = int(os.getenv("QUERY_PLAN_SEED_ROWS", 1_000_000))
+
+engine = create_engine(TEST_DATABASE_URL)
+
+
+def setup_module(module):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        # One account in a hundred is still pending, like a steady-state table, and
+        # one in ten thousand has the rare Auditor role.
+        connection.execute(
+            text(
+                """
+                INSERT INTO users (id, email, username, hashed_password, account_status, roles, created_at)
+                SELECT md5(i::text)::uuid, 'user' || i || '@example.com', 'user' || i, 'x',
+                       (CASE WHEN i % 100 = 0 THEN 'pending' ELSE 'verified' END)::account_status,
+                       (CASE WHEN i % 10000 = 0 THEN ARRAY['Admin', 'Auditor'] ELSE ARRAY['Admin'] END),
+                       now() - i * interval '1 second'
+                FROM generate_series(1, :rows) AS i
+                """
+            ),
+            {"rows": SEED_ROWS},
+        )
+        connection.execute(
+            text(
+                """
+                INSERT INTO access_codes (id, user_id, code, expires_at)
+                SELECT md5('code' || i)::uuid, md5(i::text)::uuid, lpad((i % 1000000)::text, 6, '0'),
+                       now() + (i % 100 - 1) * interval '1 hour'
+                FROM generate_series(1, :rows) AS i
+                """
+            ),
+            {"rows": SEED_ROWS},
+        )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE users"))
+        connection.execute(text("ANALYZE access_codes"))
+
+
+def teardown_module(module):
+    Base.metadata.drop_all(bind=engine)
+
+
+def indexes_used(statement) -> set:
+    """
+    Returns the names of the indexes in the query plan of a statement.
+
+    The statement is explained without ANALYZE, so DML is planned but not executed.
+    """
+    sql = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+
+    names = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Index Name" in node:
+            names.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return names
+
+
+def test_login_lookup_uses_lower_email_index():
+    """
+    Test that the case-insensitive email lookup used by login and the existence
+    check is served by the unique lower(email) index.
+    """
+    statement = select(User).where(func.lower(User.email) == "user500000@example.com")
+    assert "ux_users_email_lower" in indexes_used(statement)
+
+
+def test_access_code_lookup_uses_composite_index():
+    """
+    Test that consuming an access code by user and code uses the composite index.
+    """
+    statement = delete(AccessCode).where(
+        AccessCode.user_id == uuid.UUID("c4ca4238a0b923820dcc509a6f75849b"),
+        AccessCode.code == "000001",
+    )
+    assert "ix_access_codes_user_id_code" in indexes_used(statement)
+
+
+def test_access_code_sweep_uses_expiry_index():
+    """
+    Test that a sweeper batch finds the expired codes, one in a hundred, through
+    the expires_at index instead of scanning the table.
+    """
+    expired = (
+        select(AccessCode.id)
+        .where(AccessCode.expires_at <= func.now())
+        .order_by(AccessCode.expires_at)
+        .limit(1000)
+        .with_for_update(skip_locked=True)
+    )
+    statement = delete(AccessCode).where(AccessCode.id.in_(expired.scalar_subquery()))
+    assert "ix_access_codes_expires_at" in indexes_used(statement)
+
+
+def test_pending_accounts_use_partial_index():
+    """
+    Test that listing pending accounts by age reads the partial index instead of
+    scanning every user.
+    """
+    statement = (
+        select(User.id)
+        .where(User.account_status == AccountStatus.PENDING)
+        .order_by(User.created_at)
+        .limit(100)
+    )
+    assert "ix_users_pending_created_at" in indexes_used(statement)
+
+
+def test_bulk_existence_check_uses_key_indexes():
+    """
+    Test that the bulk existence check, matching ids and emails against array
+    parameters, is served by the primary key and the lower(email) index.
+    """
+    ids = [uuid.UUID("c4ca4238a0b923820dcc509a6f75849b"), uuid.uuid4()]
+    emails = ["user2@example.com", "nobody@example.com"]
+    statement = select(User.id, func.lower(User.email)).where(
+        or_(
+            User.id == any_(cast(literal(ids, ARRAY(Uuid)), ARRAY(Uuid))),
+            func.lower(User.email) == any_(cast(literal(emails, ARRAY(String)), ARRAY(String))),
+        )
+    )
+    assert {"users_pkey", "ux_users_email_lower"} <= indexes_used(statement)
+
+
+def test_resumed_export_uses_keyset_index():
+    """
+    Test that an export resumed from a cursor seeks the (created_at, id) index to
+    its position instead of sorting the table.
+    """
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(User.created_at, User.id).where(User.username == f"user{SEED_ROWS // 2}")
+        ).one()
+    statement = export_statement(after=encode_cursor(row.created_at, row.id)).limit(1000)
+    assert "ix_users_created_at_id" in indexes_used(statement)
+
+
+def test_deep_listing_page_seeks_keyset_index():
+    """
+    Test that a page deep into the verified users starts an index scan at its
+    cursor, rather than reading and discarding the pages before it.
+    """
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(User.created_at, User.id).where(User.username == f"user{SEED_ROWS // 2}")
+        ).one()
+    statement = account_statement(
+        User,
+        account_status=AccountStatus.VERIFIED,
+        after=encode_cursor(row.created_at, row.id),
+    ).limit(51)
+    assert indexes_used(statement) & {"ix_users_created_at_id", "ix_users_status_created_at_id"}
+
+
+def test_rare_role_listing_uses_gin_index():
+    """
+    Test that listing the users of a rare role finds them through the GIN index on
+    roles instead of filtering every user.
+    """
+    statement = account_statement(User, roles=["Auditor"]).limit(51)
+    assert "ix_users_roles" in indexes_used(statement)
@@ -0,0 +1,126 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.helpers import rate_limit
+from app.helpers.kv import MemoryKeyValueStore
+from app.helpers.rate_limit import RateLimitMiddleware, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def echo(request: Request):
+    return JSONResponse(await request.json())
+
+
+def build_client() -> TestClient:
+    app = Starlette(
+        routes=[Route("/login", echo, methods=["POST"]), Route("/other", echo, methods=["POST"])]
+    )
+    return TestClient(RateLimitMiddleware(app, store=MemoryKeyValueStore()))
+
+
+def test_memory_store_operations_are_atomic_and_expire():
+    """
+    Test consume-once pops, counters keeping their expiry, and compare-and-set.
+    """
+    clock = FakeClock()
+    store = MemoryKeyValueStore(clock=clock)
+
+    async def scenario():
+        await store.set("code", b"123456", ttl=60)
+        assert await store.pop("code") == b"123456"
+        assert await store.pop("code") is None
+
+        assert await store.incr("attempts", ttl=10) == 1
+        clock.now += 5
+        assert await store.incr("attempts", ttl=10) == 2
+        clock.now += 6
+        assert await store.incr("attempts", ttl=10) == 1
+
+        assert await store.compare_and_set("bucket", None, b"a", ttl=10)
+        assert not await store.compare_and_set("bucket", None, b"b", ttl=10)
+        assert await store.compare_and_set("bucket", b"a", b"b", ttl=10)
+        assert await store.get("bucket") == b"b"
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_refills_at_its_rate():
+    """
+    Test that a bucket allows its burst, then reports when the next token is due.
+    """
+    clock = FakeClock()
+    bucket = TokenBucket(MemoryKeyValueStore(), "test", rate=2, burst=3, clock=clock)
+
+    async def scenario():
+        assert [await bucket.take("client") for _ in range(3)] == [0, 0, 0]
+        assert await bucket.take("client") == 0.5
+        assert await bucket.take("other") == 0
+        clock.now += 0.5
+        assert await bucket.take("client") == 0
+        assert await bucket.take("client") > 0
+
+    asyncio.run(scenario())
+
+
+def test_contention_does_not_exhaust_a_bucket():
+    """
+    Test that a bucket shared by many concurrent requests lets exactly its burst
+    through, even when every optimistic update of the store would lose a race.
+    """
+
+    class ContendedStore(MemoryKeyValueStore):
+        async def compare_and_set(self, key, expected, value, ttl):
+            return False
+
+    bucket = TokenBucket(ContendedStore(), "global", rate=1, burst=100, clock=FakeClock())
+
+    async def scenario():
+        return await asyncio.gather(*(bucket.take("all") for _ in range(150)))
+
+    assert asyncio.run(scenario()).count(0) == 100
+
+
+def test_middleware_limits_each_email_and_replays_the_body(monkeypatch):
+    """
+    Test that the body reaches the endpoint, that an email is limited regardless
+    of the casing used, and that other paths are not limited.
+    """
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_EMAIL_BURST", 2)
+    client = build_client()
+
+    for email in ("a@example.com", "A@example.com"):
+        response = client.post("/login", json={"email": email, "password": "pw"})
+        assert response.status_code == 200
+        assert response.json()["email"] == email
+
+    response = client.post("/login", json={"email": "a@EXAMPLE.com", "password": "pw"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    assert client.post("/login", json={"email": "b@example.com"}).status_code == 200
+    for _ in range(5):
+        assert client.post("/other", json={"email": "a@example.com"}).status_code == 200
+
+
+def test_middleware_sheds_load_when_the_hash_queue_is_deep(monkeypatch):
+    """
+    Test that requests are answered with 503 while the hashing queue is too deep.
+    """
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_SHED_QUEUE_DEPTH", 0)
+    client = build_client()
+
+    response = client.post("/login", json={"email": "a@example.com"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.helpers import auth, rbac
+from app.helpers.rbac import RoleTable, permission_mask, require_permission, watch_roles_file
+from app.models.admin_model import User
+from app.routes.admin_routes import router as admin_router
+
+app = FastAPI()
+
+
+@app.get("/users", dependencies=[Depends(require_permission("users:read"))])
+async def read_users():
+    return []
+
+
+@app.post("/users", dependencies=[Depends(require_permission("users:read", "users:write"))])
+async def write_users():
+    return []
+
+
+client = TestClient(app)
+
+
+def test_role_table_compiles_roles_into_masks():
+    """
+    Test that a user's mask is the union of its roles' permissions, and that unknown
+    roles grant nothing.
+    """
+    table = RoleTable({"Reader": ["users:read"], "Writer": ["users:write"]})
+
+    assert table.compile(["Reader"]) == permission_mask(["users:read"])
+    assert table.compile(["Reader", "Writer", "Ghost"]) == permission_mask(
+        ["users:read", "users:write"]
+    )
+    assert table.compile([]) == 0
+
+
+def test_role_table_reload_invalidates_compiled_masks():
+    """
+    Test that loading a new table changes its version, and that tokens issued under
+    the previous version are recompiled from their roles.
+    """
+    table = RoleTable({"Reader": ["users:read"]})
+    claims = table.claims_for(["Reader"])
+    assert table.granted(claims) == permission_mask(["users:read"])
+
+    version = table.version
+    table.load({"Reader": ["users:read", "users:export"]})
+
+    assert table.version != version
+    assert table.granted(claims) == permission_mask(["users:read", "users:export"])
+
+
+def test_roles_file_edits_are_loaded(tmp_path):
+    """
+    Test that editing the roles file reloads the table, and that a broken edit
+    keeps the table as it was.
+    """
+    path = tmp_path / "roles.json"
+    path.write_text(json.dumps({"Reader": ["users:read"]}))
+    table = RoleTable({"Reader": ["users:read"]})
+    claims = table.claims_for(["Reader"])
+
+    def edit(content: str, mtime_ns: int):
+        path.write_text(content)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    async def scenario():
+        watcher = asyncio.create_task(watch_roles_file(table, str(path), interval=0.01))
+        await asyncio.sleep(0.02)
+        edit(json.dumps({"Reader": ["users:read", "users:export"]}), 2_000_000_000_000_000_000)
+        await asyncio.sleep(0.05)
+        reloaded = table.granted(claims)
+        edit("{not json", 3_000_000_000_000_000_000)
+        await asyncio.sleep(0.05)
+        watcher.cancel()
+        return reloaded
+
+    assert asyncio.run(scenario()) == permission_mask(["users:read", "users:export"])
+    assert table.granted(claims) == permission_mask(["users:read", "users:export"])
+
+
+def test_require_permission_authorizes_from_claims(monkeypatch):
+    """
+    Test that requests are rejected with 401 without a valid token, with 403 without
+    every required permission, and are let through otherwise.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    staff = auth.create_access_token(
+        data={"sub": "staff-1", **rbac.role_table.claims_for(["Staff"])}
+    )
+    admin = auth.create_access_token(
+        data={"sub": "admin-1", **rbac.role_table.claims_for(["Admin"])}
+    )
+
+    assert client.get("/users").status_code == 401
+    assert client.get("/users", headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert client.get("/users", headers={"Authorization": f"Bearer {staff}"}).status_code == 200
+    assert client.post("/users", headers={"Authorization": f"Bearer {staff}"}).status_code == 403
+    assert client.post("/users", headers={"Authorization": f"Bearer {admin}"}).status_code == 200
+
+
+def signup_token() -> str:
+    """Returns the access token a login issues to an account created by /signup."""
+    roles = User.roles.default.arg(None)
+    return auth.create_access_token(data={"sub": "user-1", **rbac.role_table.claims_for(roles)})
+
+
+def test_signup_role_grants_no_permission(monkeypatch):
+    """
+    Test that the token of a freshly signed up account is refused with 403 by the
+    permission-gated admin endpoints.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    admin_app = FastAPI()
+    admin_app.include_router(admin_router)
+    headers = {"Authorization": f"Bearer {signup_token()}"}
+
+    assert rbac.role_table.compile(User.roles.default.arg(None)) == 0
+    with TestClient(admin_app) as admin_client:
+        assert admin_client.get("/users", headers=headers).status_code == 403
+        assert admin_client.get("/users/export", headers=headers).status_code == 403
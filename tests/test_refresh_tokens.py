@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.config.replicas import Replica, ReplicaSet, RoutingSession
+from app.controllers import token_controller
+from app.helpers import auth
+from app.helpers.uuid import generate_uuid
+from app.models.admin_model import User
+from app.models.token_model import RefreshToken
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(class_=RoutingSession, bind=engine)
+
+# The users and refresh_tokens tables alone.
+tables = [User.__table__, RefreshToken.__table__]
+
+
+def setup_module(module):
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+
+def teardown_module(module):
+    Base.metadata.drop_all(bind=engine, tables=tables)
+
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    monkeypatch.setattr(auth, "REFRESH_TOKEN_SECRET", "test-refresh-secret")
+
+
+def login() -> tuple:
+    """Creates a user and issues its tokens, returning the user's id and refresh token."""
+    user_id = generate_uuid()
+    with TestingSessionLocal() as db:
+        db.execute(
+            insert(User).values(
+                id=user_id,
+                email=f"{user_id}@example.com",
+                username=str(user_id),
+                hashed_password="hash",
+                roles=["Staff"],
+            )
+        )
+        db.commit()
+        tokens = asyncio.run(token_controller.issue_tokens(db, user_id, ["Staff"]))
+    return user_id, tokens.refresh_token
+
+
+def refresh(token: str, session_factory=TestingSessionLocal):
+    with session_factory() as db:
+        return asyncio.run(token_controller.refresh_access_token(db, token))
+
+
+def family_of(token: str) -> list:
+    """Returns the (used, revoked) state of every token in the family of a token."""
+    with TestingSessionLocal() as db:
+        family_id = db.scalar(
+            select(RefreshToken.family_id).where(
+                RefreshToken.token_hash == auth.hash_refresh_token(token)
+            )
+        )
+        rows = db.execute(
+            select(RefreshToken.used_at, RefreshToken.revoked_at)
+            .where(RefreshToken.family_id == family_id)
+            .order_by(RefreshToken.id)
+        )
+        return [(used_at is not None, revoked_at is not None) for used_at, revoked_at in rows]
+
+
+def test_refresh_rotates_to_the_derived_successor():
+    """
+    Test that a refresh returns an access token for the user with its roles and
+    the successor derived from the refresh token, which rotates in turn.
+    """
+    user_id, token = login()
+
+    tokens = refresh(token)
+
+    assert tokens.refresh_token == auth.successor_refresh_token(token)
+    claims = auth.verify_and_decode(tokens.access_token)
+    assert claims["sub"] == str(user_id)
+    assert claims["roles"] == ["Staff"]
+
+    again = refresh(tokens.refresh_token)
+    assert again.refresh_token == auth.successor_refresh_token(tokens.refresh_token)
+    assert family_of(token) == [(True, False), (True, False), (False, False)]
+
+
+def test_reuse_within_the_grace_window_gets_the_same_successor():
+    """
+    Test that presenting a rotated token again within the grace window, as
+    concurrent refreshes of one client do, returns the same successor without
+    storing another token.
+    """
+    _, token = login()
+
+    first = refresh(token)
+    second = refresh(token)
+
+    assert second.refresh_token == first.refresh_token
+    assert family_of(token) == [(True, False), (False, False)]
+
+
+def test_reuse_after_the_grace_window_revokes_the_family(monkeypatch):
+    """
+    Test that presenting a rotated token after the grace window is refused and
+    revokes its family, so the successor is refused too.
+    """
+    monkeypatch.setattr(token_controller, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 10)
+    _, token = login()
+    successor = refresh(token).refresh_token
+    with TestingSessionLocal() as db:
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.token_hash == auth.hash_refresh_token(token))
+            .values(used_at=datetime.now(timezone.utc) - timedelta(seconds=11))
+        )
+        db.commit()
+
+    for reused in (token, successor):
+        with pytest.raises(HTTPException) as error:
+            refresh(reused)
+        assert error.value.status_code == 401
+    assert family_of(token) == [(True, True), (False, True)]
+
+
+def test_unknown_expired_and_revoked_tokens_are_refused():
+    """
+    Test that unknown, expired and revoked refresh tokens are refused without
+    storing a successor.
+    """
+    _, expired = login()
+    with TestingSessionLocal() as db:
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.token_hash == auth.hash_refresh_token(expired))
+            .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+        )
+        db.commit()
+    _, revoked = login()
+    with TestingSessionLocal() as db:
+        assert asyncio.run(token_controller.revoke_refresh_token(db, revoked))
+        count = db.scalar(select(func.count()).select_from(RefreshToken))
+
+    for token in (auth.new_refresh_token(), expired, revoked):
+        with pytest.raises(HTTPException):
+            refresh(token)
+    with TestingSessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(RefreshToken)) == count
+
+
+def test_refresh_reads_the_token_on_the_primary():
+    """
+    Test that a session with a healthy read replica refreshes against the primary,
+    here the only database holding the tokens.
+    """
+    replica = Replica(
+        "empty",
+        create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        ),
+    )
+    RoutedSessionLocal = sessionmaker(
+        class_=RoutingSession, bind=engine, replicas=ReplicaSet([replica])
+    )
+    _, token = login()
+
+    tokens = refresh(token, RoutedSessionLocal)
+
+    assert tokens.refresh_token == auth.successor_refresh_token(token)
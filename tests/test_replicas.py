@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select, text, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app.config.replicas import Replica, ReplicaSet, RoutingSession, is_read
+from app.controllers import admin_controller, token_controller
+from app.helpers.access_code import insert_access_code_from
+from app.models.admin_model import User
+
+
+def sqlite_engine():
+    return create_engine("sqlite://", poolclass=StaticPool)
+
+
+def test_is_read_tells_reads_from_writes():
+    """
+    Test that plain and locking SELECTs and data-modifying CTEs are classified
+    correctly, including the INSERT ... RETURNING CTE of a signup.
+    """
+    assert is_read(select(User.id).where(User.email == "a@example.com"))
+    assert is_read(select(User.id).where(User.id.in_(select(User.id).limit(1).scalar_subquery())))
+    assert not is_read(select(User.id).with_for_update())
+    assert not is_read(update(User).values(username="a"))
+    assert not is_read(text("SELECT 1"))
+
+    new_user = postgresql.insert(User).values(email="a@example.com").returning(User.id).cte("new_user")
+    new_code = insert_access_code_from(new_user, "123456").cte("new_code")
+    assert not is_read(select(new_user))
+    assert not is_read(select(new_user).add_cte(new_code))
+
+
+def test_round_robin_skips_unhealthy_replicas():
+    """
+    Test that sessions are given the healthy replicas in turn, and none when all
+    replicas are down.
+    """
+    first, second = Replica("first", sqlite_engine()), Replica("second", sqlite_engine())
+    replicas = ReplicaSet([first, second])
+    assert {replicas.choose(False), replicas.choose(False)} == {first.engine, second.engine}
+
+    second.healthy = False
+    assert [replicas.choose(False) for _ in range(3)] == [first.engine] * 3
+
+    first.healthy = False
+    assert replicas.choose(False) is None
+
+
+def test_least_connections_prefers_the_idlest_replica(tmp_path):
+    """
+    Test that the least_connections policy picks the replica with the fewest
+    connections checked out.
+    """
+    busy = Replica("busy", create_engine(f"sqlite:///{tmp_path}/busy.db", poolclass=QueuePool))
+    idle = Replica("idle", create_engine(f"sqlite:///{tmp_path}/idle.db", poolclass=QueuePool))
+    replicas = ReplicaSet([busy, idle], policy="least_connections")
+    with busy.engine.connect():
+        assert [replicas.choose(False) for _ in range(3)] == [idle.engine] * 3
+
+
+def test_session_reads_from_replica_until_its_first_write():
+    """
+    Test that a routing session reads from its replica, runs writes and locking
+    reads on the primary, and stays on the primary after a write.
+    """
+    primary = sqlite_engine()
+    replica = Replica("replica", sqlite_engine())
+    db = RoutingSession(bind=primary, replicas=ReplicaSet([replica]))
+
+    assert db.get_bind(clause=select(User.id)) is replica.engine
+    assert db.get_bind(clause=select(User.id).execution_options(use_primary=True)) is primary
+    assert db.reads_replica
+
+    assert db.get_bind(clause=select(User.id).with_for_update()) is primary
+    assert not db.reads_replica
+    assert db.get_bind(clause=select(User.id)) is primary
+
+
+def test_unreachable_replica_is_taken_out_of_rotation():
+    """
+    Test that a replica failing its health check stops receiving reads, and that
+    sessions then read from the primary.
+    """
+    primary = sqlite_engine()
+    replica = Replica("down", create_engine("sqlite:////nonexistent/directory/replica.db"))
+    replicas = ReplicaSet([replica])
+
+    asyncio.run(replicas.check(timeout=5))
+
+    assert not replica.healthy
+    db = RoutingSession(bind=primary, replicas=replicas)
+    assert db.get_bind(clause=select(User.id)) is primary
+
+
+def test_refresh_token_state_is_read_on_the_primary(monkeypatch):
+    """
+    Test that refreshing and revoking a refresh token look it up on the primary,
+    which has the tokens of logins and the revocations a replica may not have yet.
+    """
+    primary = sqlite_engine()
+    replica = Replica("replica", sqlite_engine())
+    binds = []
+
+    class NoRows:
+        def first(self):
+            return None
+
+        def scalar(self):
+            return None
+
+    async def execute(db, statement, params=None):
+        binds.append(db.get_bind(clause=statement))
+        return NoRows()
+
+    monkeypatch.setattr(token_controller, "execute", execute)
+
+    db = RoutingSession(bind=primary, replicas=ReplicaSet([replica]))
+    with pytest.raises(HTTPException):
+        asyncio.run(token_controller.refresh_access_token(db, "refresh-token"))
+    db = RoutingSession(bind=primary, replicas=ReplicaSet([replica]))
+    assert not asyncio.run(token_controller.revoke_refresh_token(db, "refresh-token"))
+
+    assert binds == [primary, primary]
+
+
+def test_sessions_on_the_primary_do_not_share_replica_lookups(monkeypatch):
+    """
+    Test that a user lookup of a session pinned to the primary runs its own query
+    instead of waiting for a concurrent lookup of the same user on a replica.
+    """
+    primary = sqlite_engine()
+    replica = Replica("replica", sqlite_engine())
+    binds = []
+
+    class NoRows:
+        def first(self):
+            return None
+
+    async def execute(db, statement, params=None):
+        binds.append(db.get_bind(clause=statement))
+        await asyncio.sleep(0.01)
+        return NoRows()
+
+    monkeypatch.setattr(admin_controller, "execute", execute)
+
+    async def lookups():
+        on_replica = RoutingSession(bind=primary, replicas=ReplicaSet([replica]))
+        pinned = RoutingSession(bind=primary, replicas=ReplicaSet([replica]))
+        pinned.pinned = True
+        return await asyncio.gather(
+            admin_controller.get_user_by_email(on_replica, "pinned@example.com"),
+            admin_controller.get_user_by_email(pinned, "pinned@example.com"),
+        )
+
+    assert asyncio.run(lookups()) == [None, None]
+    assert binds.count(replica.engine) == 1
+    # The pinned session's query, and the replica session's retry on the primary.
+    assert binds.count(primary) == 2
+
+
+def test_invalidating_a_user_detaches_its_lookups_in_flight(monkeypatch):
+    """
+    Test that a lookup starting after a user was written does not join one that
+    was already running and may have missed the write, on a replica or the primary.
+    """
+    primary = sqlite_engine()
+    replica = Replica("replica", sqlite_engine())
+    release = asyncio.Event()
+
+    class NoRows:
+        def first(self):
+            return None
+
+    async def execute(db, statement, params=None):
+        await release.wait()
+        return NoRows()
+
+    monkeypatch.setattr(admin_controller, "execute", execute)
+
+    async def lookups():
+        on_replica = RoutingSession(bind=primary, replicas=ReplicaSet([replica]))
+        pinned = RoutingSession(bind=primary, replicas=ReplicaSet([replica]))
+        pinned.pinned = True
+        tasks = [
+            asyncio.create_task(admin_controller.get_user_by_email(db, "New@example.com"))
+            for db in (on_replica, pinned)
+        ]
+        await asyncio.sleep(0.01)
+        assert len(admin_controller.user_lookups) == 2
+        admin_controller.invalidate_user(email="new@example.com")
+        assert len(admin_controller.user_lookups) == 0
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(lookups()) == [None, None]
@@ -0,0 +1,56 @@
+import time
+import uuid
+
+import pytest
+from jose import JWTError
+
+from app.helpers import auth
+from app.helpers.bloom import BloomFilter
+from app.helpers.revocation import RevocationList
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """
+    Test that every added item is found and that the false positive rate stays
+    near the configured rate at capacity.
+    """
+    bloom = BloomFilter(10_000, error_rate=0.01)
+    added = [str(uuid.uuid4()) for _ in range(10_000)]
+    for item in added:
+        bloom.add(item)
+
+    assert all(item in bloom for item in added)
+    false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10_000))
+    assert false_positives < 300
+
+
+def test_revocation_list_replace():
+    """
+    Test that a full reload keeps tokens revoked locally in the meantime and
+    drops expired ones.
+    """
+    now = time.time()
+    revoked = RevocationList(100, 0.01)
+    revoked.add("local", expires_at=now + 60)
+    revoked.add("expired", expires_at=now - 1)
+    revoked.replace([("loaded", now + 60)])
+
+    assert revoked.is_revoked("local")
+    assert revoked.is_revoked("loaded")
+    assert not revoked.is_revoked("expired")
+    assert not revoked.is_revoked(None)
+
+
+def test_verify_and_decode_rejects_revoked_tokens(monkeypatch):
+    """
+    Test that revoking a token rejects it even when its claims are cached.
+    """
+    monkeypatch.setattr(auth, "key_ring", auth.KeyRing("HS256", "test-secret"))
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(100, 0.01))
+    auth.token_cache.clear()
+    token = auth.create_access_token(data={"sub": "user-1"})
+    claims = auth.verify_and_decode(token)
+
+    auth.revocation_list.add(claims["jti"], claims["exp"])
+    with pytest.raises(JWTError):
+        auth.verify_and_decode(token)
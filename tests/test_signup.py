@@ -0,0 +1,132 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.config.replicas import RoutingSession
+from app.controllers import admin_controller
+from app.helpers.access_code import AccessCode, SqlAccessCodeStore
+from app.models.admin_model import AccountStatus, User
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(class_=RoutingSession, bind=engine)
+
+# The users and access_codes tables alone.
+tables = [User.__table__, AccessCode.__table__]
+
+
+def setup_module(module):
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+
+def teardown_module(module):
+    Base.metadata.drop_all(bind=engine, tables=tables)
+
+
+def signup(email: str, username: str, code: str = "123456"):
+    with TestingSessionLocal() as db:
+        return asyncio.run(
+            admin_controller.insert_user_with_access_code(
+                db, email=email, username=username, hashed_password="hash", code=code
+            )
+        )
+
+
+def codes_of(email: str) -> list:
+    with TestingSessionLocal() as db:
+        return db.scalars(
+            select(AccessCode.code)
+            .join(User, User.id == AccessCode.user_id)
+            .where(func.lower(User.email) == email.lower())
+        ).all()
+
+
+def test_signup_creates_the_user_and_its_access_code(monkeypatch):
+    """
+    Test that a signup returns the new pending user and saves its access code.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+
+    user = signup("jane@example.com", "jane", code="654321")
+
+    assert user.email == "jane@example.com"
+    assert user.username == "jane"
+    assert user.account_status == AccountStatus.PENDING
+    assert codes_of("jane@example.com") == ["654321"]
+
+
+def test_duplicate_email_in_another_case_is_refused(monkeypatch):
+    """
+    Test that an email registered in another case is refused, and that no access
+    code is saved for the refused signup.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+
+    assert signup("John@example.com", "john", code="111111") is not None
+    assert signup("jOHN@EXAMPLE.com", "john2", code="222222") is None
+
+    assert codes_of("john@example.com") == ["111111"]
+    with TestingSessionLocal() as db:
+        assert db.scalar(select(func.count()).where(User.username == "john2")) == 0
+
+
+def test_signup_drops_a_cached_unknown_email(monkeypatch):
+    """
+    Test that an email looked up as unknown before its signup is found right after.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+    with TestingSessionLocal() as db:
+        assert asyncio.run(admin_controller.get_user_by_email(db, "late@example.com")) is None
+
+    user = signup("Late@example.com", "late")
+
+    with TestingSessionLocal() as db:
+        found = asyncio.run(admin_controller.get_user_by_email(db, "late@example.com"))
+    assert found is not None and found.id == user.id
+
+
+def test_postgres_signup_is_one_statement(monkeypatch):
+    """
+    Test that on Postgres, with codes in the database, the user and its code are
+    written by one statement: a user INSERT ... ON CONFLICT DO NOTHING RETURNING CTE
+    feeding the access code INSERT, so a duplicate email writes neither.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+    statements = []
+
+    class Result:
+        def first(self):
+            return None
+
+    async def execute(db, statement, params=None):
+        statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return Result()
+
+    async def commit(db):
+        pass
+
+    class PostgresSession:
+        def get_bind(self):
+            return SimpleNamespace(dialect=postgresql.dialect())
+
+    monkeypatch.setattr(admin_controller, "execute", execute)
+    monkeypatch.setattr(admin_controller, "commit", commit)
+    user = asyncio.run(
+        admin_controller.insert_user_with_access_code(
+            PostgresSession(), "jane@example.com", "jane", "hash", "123456"
+        )
+    )
+
+    assert user is None
+    assert len(statements) == 1
+    statement = " ".join(statements[0].split())
+    assert "WITH new_user AS (INSERT INTO users" in statement
+    assert "ON CONFLICT (lower(email)) DO NOTHING RETURNING" in statement
+    assert "new_code AS (INSERT INTO access_codes" in statement
+    assert "FROM new_user" in statement
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.helpers.single_flight import SingleFlight
+
+
+def test_concurrent_coroutines_share_one_call():
+    """
+    Test that identical concurrent calls run once and all get the result, while
+    other keys and later calls run on their own.
+    """
+    flights = SingleFlight()
+    runs = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def lookup(key):
+            runs.append(key)
+            await release.wait()
+            return key.upper()
+
+        tasks = [
+            asyncio.ensure_future(flights.do(key, lambda key=key: lookup(key)))
+            for key in ["a"] * 10 + ["b"]
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*tasks) == ["A"] * 10 + ["B"]
+        assert await flights.do("a", lambda: lookup("a")) == "A"
+
+    asyncio.run(scenario())
+    assert runs == ["a", "b", "a"]
+    assert (flights.calls, flights.collapsed) == (3, 9)
+    assert len(flights) == 0
+
+
+def test_waiters_get_the_exception_and_survive_a_cancelled_leader():
+    """
+    Test that an exception reaches every waiter, and that waiters retry the call
+    when the caller running it is cancelled.
+    """
+    flights = SingleFlight()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise LookupError("down")
+
+        tasks = [asyncio.ensure_future(flights.do("k", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, LookupError) for result in results)
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        leader = asyncio.ensure_future(flights.do("k", slow))
+        await asyncio.sleep(0)
+
+        async def fast():
+            return "ok"
+
+        waiter = asyncio.ensure_future(flights.do("k", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await waiter == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_threads_share_one_call():
+    """
+    Test that identical calls from several threads run once.
+    """
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def lookup():
+        runs.append(1)
+        started.set()
+        release.wait()
+        return "user"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flights.call, "k", lookup)
+        started.wait()
+        waiters = [pool.submit(flights.call, "k", lookup) for _ in range(4)]
+        while flights.collapsed < 4:
+            time.sleep(0.001)
+        release.set()
+        assert [f.result() for f in [leader] + waiters] == ["user"] * 5
+    assert runs == [1]
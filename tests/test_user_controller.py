@@ -125,10 +125,11 @@ def test_refresh_access_token():
     client.post("/signup", json=user_data)
     login_data = {"email": "refresh@example.com", "password": "refreshpassword"}
     login_response = client.post("/login", json=login_data)
-    refresh_token = login_response.json()["access_token"]
+    refresh_token = login_response.json()["refresh_token"]
 
     # Test the refresh token endpoint
     response = client.post("/refresh-token", json={"refresh_token": refresh_token})
     assert response.status_code == 200
     assert "access_token" in response.json()
+    assert response.json()["refresh_token"] != refresh_token
     assert response.json()["token_type"] == "bearer"
\ No newline at end of file
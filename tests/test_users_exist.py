@@ -0,0 +1,164 @@
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base, get_db
+from app.config.replicas import RoutingSession
+from app.controllers import admin_controller
+from app.helpers.uuid import generate_uuid
+from app.models.admin_model import User
+from app.routes.admin_routes import router as admin_router
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(class_=RoutingSession, bind=engine)
+
+# The users table alone.
+tables = [User.__table__]
+
+JANE, JOHN = generate_uuid(), generate_uuid()
+
+
+def setup_module(module):
+    Base.metadata.create_all(bind=engine, tables=tables)
+    with TestingSessionLocal() as db:
+        db.execute(
+            insert(User).values(hashed_password="hash"),
+            [
+                {"id": JANE, "email": "Jane@example.com", "username": "jane"},
+                {"id": JOHN, "email": "john@example.com", "username": "john"},
+            ],
+        )
+        db.commit()
+
+
+def teardown_module(module):
+    Base.metadata.drop_all(bind=engine, tables=tables)
+
+
+async def override_get_db():
+    with TestingSessionLocal() as db:
+        yield db
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(
+        admin_controller, "session_scope", asynccontextmanager(override_get_db)
+    )
+    app = FastAPI()
+    app.include_router(admin_router)
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def statements():
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def stream_lines(client, body: str) -> list:
+    response = client.post(
+        "/users/exists/stream", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_keys_are_mapped_to_whether_a_user_has_them(client, statements):
+    """
+    Test that each given id and email is mapped to whether a user has it, with
+    emails matched ignoring case and invalid ids reported as unknown, in one query.
+    """
+    unknown = str(generate_uuid())
+    response = client.post(
+        "/users/exists",
+        json={
+            "ids": [str(JANE), unknown, "not-a-uuid"],
+            "emails": ["JANE@example.com", "john@EXAMPLE.com", "nobody@example.com"],
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "ids": {str(JANE): True, unknown: False, "not-a-uuid": False},
+        "emails": {
+            "JANE@example.com": True,
+            "john@EXAMPLE.com": True,
+            "nobody@example.com": False,
+        },
+    }
+    assert len(statements) == 1
+
+
+def test_too_many_keys_are_refused(client, monkeypatch):
+    """
+    Test that more than USERS_EXIST_MAX_KEYS ids and emails are refused with 413.
+    """
+    monkeypatch.setattr(admin_controller, "USERS_EXIST_MAX_KEYS", 2)
+
+    body = {"ids": [str(JANE)], "emails": ["jane@example.com", "john@example.com"]}
+    assert client.post("/users/exists", json=body).status_code == 413
+    body["emails"].pop()
+    assert client.post("/users/exists", json=body).status_code == 200
+
+
+def test_stream_answers_keys_in_batches(client, monkeypatch, statements):
+    """
+    Test that streamed keys are answered in request order, USERS_EXIST_BATCH_SIZE
+    per query, with an error line for each line that is not a key.
+    """
+    monkeypatch.setattr(admin_controller, "USERS_EXIST_BATCH_SIZE", 2)
+    body = "\n".join(
+        json.dumps(line)
+        for line in [
+            {"id": str(JANE)},
+            {"email": "JOHN@example.com"},
+            {"name": "jane"},
+            {"id": "not-a-uuid"},
+            {"email": "nobody@example.com"},
+        ]
+    )
+
+    assert stream_lines(client, body) == [
+        {"id": str(JANE), "exists": True},
+        {"email": "JOHN@example.com", "exists": True},
+        {"line": 3, "error": "Expected an id or an email"},
+        {"id": "not-a-uuid", "exists": False},
+        {"email": "nobody@example.com", "exists": False},
+    ]
+    # The second batch holds no valid key, so it runs no query.
+    assert len(statements) == 2
+
+
+def test_stream_ends_with_an_error_line(client, monkeypatch):
+    """
+    Test that a malformed line, or a key over USERS_EXIST_STREAM_MAX_KEYS, ends the
+    stream with an error line after the answers to the keys before it.
+    """
+    lines = stream_lines(client, '{"id": "%s"}\n{"email": \n{"id": "%s"}' % (JANE, JOHN))
+    assert lines[0] == {"id": str(JANE), "exists": True}
+    assert list(lines[1]) == ["error"]
+    assert len(lines) == 2
+
+    monkeypatch.setattr(admin_controller, "USERS_EXIST_STREAM_MAX_KEYS", 1)
+    lines = stream_lines(client, '{"id": "%s"}\n{"id": "%s"}' % (JANE, JOHN))
+    assert lines == [
+        {"id": str(JANE), "exists": True},
+        {"error": "At most 1 keys per request"},
+    ]
@@ -0,0 +1,25 @@
+from app.helpers.uuid import generate_uuid, parse_uuid
+
+
+def test_generate_uuid_is_time_ordered_v7():
+    """
+    Test that generated ids are version 7 UUIDs that sort in creation order,
+    including ids generated within the same millisecond.
+    """
+    ids = [generate_uuid() for _ in range(10000)]
+
+    assert all(value.version == 7 for value in ids)
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_parse_uuid():
+    """
+    Test that client-supplied ids parse with or without hyphens, and that
+    invalid values are rejected without raising.
+    """
+    value = generate_uuid()
+
+    assert parse_uuid(str(value)) == value
+    assert parse_uuid(value.hex) == value
+    assert parse_uuid("None") is None
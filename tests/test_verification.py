@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.config.replicas import RoutingSession
+from app.controllers import admin_controller
+from app.helpers.access_code import AccessCode, SqlAccessCodeStore
+from app.helpers.uuid import generate_uuid
+from app.models.admin_model import AccountStatus, User
+from app.schemas.admin_schema import UserVerify
+
+engine = create_engine(
+    "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(class_=RoutingSession, bind=engine)
+
+# The users and access_codes tables alone.
+tables = [User.__table__, AccessCode.__table__]
+
+
+def setup_module(module):
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+
+def teardown_module(module):
+    Base.metadata.drop_all(bind=engine, tables=tables)
+
+
+def create_user(code: str, expires_in: timedelta = timedelta(hours=1)):
+    """Inserts a pending user with an access code, returning the user's id."""
+    user_id = generate_uuid()
+    with TestingSessionLocal() as db:
+        db.execute(
+            insert(User).values(
+                id=user_id,
+                email=f"{user_id}@example.com",
+                username=str(user_id),
+                hashed_password="hash",
+            )
+        )
+        db.execute(
+            insert(AccessCode).values(
+                user_id=user_id, code=code, expires_at=datetime.now(timezone.utc) + expires_in
+            )
+        )
+        db.commit()
+    return user_id
+
+
+def verify(user_id, code: str) -> bool:
+    with TestingSessionLocal() as db:
+        return asyncio.run(
+            admin_controller.verify_user_account(
+                db, UserVerify(user_id=str(user_id), code=code)
+            )
+        )
+
+
+def state_of(user_id) -> tuple:
+    with TestingSessionLocal() as db:
+        status = db.scalar(select(User.account_status).where(User.id == user_id))
+        attempts = db.scalars(
+            select(AccessCode.attempts).where(AccessCode.user_id == user_id)
+        ).all()
+    return status, attempts
+
+
+def test_code_verifies_the_account_once(monkeypatch):
+    """
+    Test that a valid code verifies the account and is used up, so verifying with
+    it again fails.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+    user_id = create_user("123456")
+
+    assert verify(user_id, "123456")
+    assert state_of(user_id) == (AccountStatus.VERIFIED, [])
+    assert not verify(user_id, "123456")
+
+
+def test_wrong_code_counts_an_attempt(monkeypatch):
+    """
+    Test that a wrong code leaves the account pending and counts an attempt against
+    the user's code, which still verifies the account afterwards.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+    user_id = create_user("123456")
+
+    assert not verify(user_id, "654321")
+    assert state_of(user_id) == (AccountStatus.PENDING, [1])
+    assert verify(user_id, "123456")
+
+
+def test_expired_code_is_refused(monkeypatch):
+    """
+    Test that an expired code does not verify the account.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+    user_id = create_user("123456", expires_in=timedelta(seconds=-1))
+
+    assert not verify(user_id, "123456")
+    assert state_of(user_id)[0] == AccountStatus.PENDING
+
+
+def test_unknown_or_malformed_user_is_refused(monkeypatch):
+    """
+    Test that a code of another user, or a user id that is not a UUID, verifies nothing.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+    user_id = create_user("123456")
+
+    assert not verify(generate_uuid(), "123456")
+    assert not verify("not-a-uuid", "123456")
+    assert state_of(user_id) == (AccountStatus.PENDING, [0])
+
+
+def test_postgres_verification_is_one_statement(monkeypatch):
+    """
+    Test that on Postgres, with codes in the database, a code is consumed and the
+    user verified by one statement: a DELETE ... RETURNING CTE feeding the UPDATE,
+    so a code can only verify its account once.
+    """
+    monkeypatch.setattr(admin_controller, "access_code_store", SqlAccessCodeStore())
+    statements = []
+
+    class Result:
+        def first(self):
+            return SimpleNamespace(id=user_id, email="jane@example.com")
+
+    async def execute(db, statement, params=None):
+        statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return Result()
+
+    async def commit(db):
+        pass
+
+    class PostgresSession:
+        def get_bind(self):
+            return SimpleNamespace(dialect=postgresql.dialect())
+
+    monkeypatch.setattr(admin_controller, "execute", execute)
+    monkeypatch.setattr(admin_controller, "commit", commit)
+    user_id = generate_uuid()
+    assert asyncio.run(
+        admin_controller.verify_user_account(
+            PostgresSession(), UserVerify(user_id=str(user_id), code="123456")
+        )
+    )
+
+    assert len(statements) == 1
+    statement = " ".join(statements[0].split())
+    assert statement.startswith("WITH consumed AS (DELETE FROM access_codes")
+    assert "RETURNING access_codes.user_id) UPDATE users SET account_status" in statement
+    assert "WHERE users.id = consumed.user_id" in statement